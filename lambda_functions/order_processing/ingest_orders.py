@@ -0,0 +1,9 @@
+"""Lambda entry point for the order ingestion queue.
+
+SQS batches go through the shared adapter, which stores them with grouped
+transactions and reports failed messages as ``batchItemFailures``.
+"""
+
+from ecommerce_platform.lambda_queue import handle_order_batch as lambda_handler
+
+__all__ = ["lambda_handler"]
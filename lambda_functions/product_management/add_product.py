@@ -1,32 +1,9 @@
-import json
-from pathlib import Path
-import sys
+"""Lambda entry point for ``POST /products``.
 
-ROOT = Path(__file__).resolve().parents[2]
-sys.path.append(str(ROOT / "src"))
+API Gateway proxy events go through the shared adapter, so this function
+behaves exactly like the same route on the HTTP server.
+"""
 
-from ecommerce_platform.config import load_settings
-from ecommerce_platform.db import init_db
-from ecommerce_platform.services import EcommerceService, ValidationError
+from ecommerce_platform.lambda_proxy import handle_event as lambda_handler
 
-
-def lambda_handler(event, context):
-    settings = load_settings()
-    db = init_db(settings)
-    service = EcommerceService(settings=settings, db=db)
-
-    try:
-        product = service.create_product(
-            name=event["name"],
-            description=event["description"],
-            category=event["category"],
-            price_cents=int(event["price_cents"]),
-            currency=event.get("currency", "USD"),
-        )
-    except ValidationError as exc:
-        return {"statusCode": 400, "body": json.dumps({"error": str(exc)})}
-
-    return {
-        "statusCode": 200,
-        "body": json.dumps({"product_id": str(product.id)}),
-    }
+__all__ = ["lambda_handler"]
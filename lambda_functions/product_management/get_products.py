@@ -1,35 +1,9 @@
-import json
-from pathlib import Path
-import sys
+"""Lambda entry point for ``GET /products``.
 
-ROOT = Path(__file__).resolve().parents[2]
-sys.path.append(str(ROOT / "src"))
+API Gateway proxy events go through the shared adapter, so this function
+behaves exactly like the same route on the HTTP server.
+"""
 
-from ecommerce_platform.config import load_settings
-from ecommerce_platform.db import init_db
-from ecommerce_platform.services import EcommerceService
+from ecommerce_platform.lambda_proxy import handle_event as lambda_handler
 
-
-def lambda_handler(event, context):
-    settings = load_settings()
-    db = init_db(settings)
-    service = EcommerceService(settings=settings, db=db)
-
-    products = service.list_products()
-    return {
-        "statusCode": 200,
-        "body": json.dumps(
-            [
-                {
-                    "id": str(product.id),
-                    "name": product.name,
-                    "description": product.description,
-                    "category": product.category,
-                    "price_cents": product.price_cents,
-                    "currency": product.currency,
-                    "created_at": product.created_at.isoformat(),
-                }
-                for product in products
-            ]
-        ),
-    }
+__all__ = ["lambda_handler"]
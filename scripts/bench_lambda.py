@@ -0,0 +1,151 @@
+"""Cold vs warm invocation latency of the Lambda entry points.
+
+A cold invocation starts from an empty ``lambda_runtime`` (settings, database
+and service are built); warm invocations reuse them, as a long-lived Lambda
+container does. Each handler runs against a throwaway seeded SQLite file.
+``PASSWORD_ITERATIONS`` defaults to 1000 here so PBKDF2 does not drown out
+the signup and login numbers, and rate limiting is off; export
+``PASSWORD_ITERATIONS`` / ``RATE_LIMITS`` to measure them.
+
+    python scripts/bench_lambda.py --cold 20 --warm 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from ecommerce_platform import lambda_runtime
+from ecommerce_platform.auth import hash_password
+from ecommerce_platform.lambda_proxy import proxy_event
+
+Event = Callable[[int], Dict[str, Any]]
+
+
+def _load_handler(relative: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    path = ROOT / "lambda_functions" / relative
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module: ModuleType = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+def _seed() -> Tuple[str, str]:
+    service = lambda_runtime.get_service()
+    password_hash, salt = hash_password(
+        "password123", iterations=service.settings.password_iterations
+    )
+    user = service.create_user("bench@example.com", "bench", password_hash, salt)
+    product = service.create_product("Bench Mug", "Ceramic", "kitchen", 1200, "USD")
+    service.create_order(user.id, [(product.id, 1)])
+    return str(user.id), str(product.id)
+
+
+def _cases(user_id: str, product_id: str) -> List[Tuple[str, str, Event]]:
+    product = {"name": "Bench Item", "description": "x", "category": "bench", "price_cents": 100}
+    order = {"user_id": user_id, "items": [{"product_id": product_id, "quantity": 1}]}
+    login = {"username": "bench", "password": "password123"}
+    return [
+        (
+            "get_products",
+            "product_management/get_products.py",
+            lambda i: proxy_event("GET", "/products", query={"limit": "20"}),
+        ),
+        (
+            "add_product",
+            "product_management/add_product.py",
+            lambda i: proxy_event("POST", "/products", product),
+        ),
+        (
+            "get_orders",
+            "order_processing/get_orders.py",
+            lambda i: proxy_event("GET", f"/orders/{user_id}"),
+        ),
+        (
+            "create_order",
+            "order_processing/create_order.py",
+            lambda i: proxy_event("POST", "/orders", order),
+        ),
+        (
+            "recommend",
+            "recommendation_system/recommend.py",
+            lambda i: proxy_event("GET", f"/recommendations/{user_id}"),
+        ),
+        (
+            "signup",
+            "authentication/signup.py",
+            lambda i: proxy_event(
+                "POST",
+                "/auth/signup",
+                {"username": f"bench{i}", "password": "password123", "email": f"b{i}@x.io"},
+            ),
+        ),
+        (
+            "login",
+            "authentication/login.py",
+            lambda i: proxy_event("POST", "/auth/login", login),
+        ),
+    ]
+
+
+def _time(handler, event: Dict[str, Any]) -> float:
+    started = time.perf_counter()
+    response = handler(event, None)
+    elapsed = time.perf_counter() - started
+    if response["statusCode"] != 200:
+        raise RuntimeError(f"handler failed: {response}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold", type=int, default=20, help="cold invocations per handler")
+    parser.add_argument("--warm", type=int, default=500, help="warm invocations per handler")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+        os.environ.setdefault("PASSWORD_ITERATIONS", "1000")
+        # Repeated signups and logins from one client would hit the limits.
+        os.environ.setdefault("RATE_LIMITS", "")
+        os.chdir(tmpdir)
+        user_id, product_id = _seed()
+        print(f"{'handler':<14} {'cold p50 ms':>12} {'warm p50 ms':>12} {'warm p99 ms':>12} {'speedup':>8}")
+        counter = 0
+        try:
+            for name, relative, event in _cases(user_id, product_id):
+                handler = _load_handler(relative)
+                cold: List[float] = []
+                for _ in range(args.cold):
+                    lambda_runtime.reset()
+                    counter += 1
+                    cold.append(_time(handler, event(counter)))
+                warm: List[float] = []
+                for _ in range(args.warm):
+                    counter += 1
+                    warm.append(_time(handler, event(counter)))
+                warm.sort()
+                cold_p50 = statistics.median(cold) * 1000
+                warm_p50 = statistics.median(warm) * 1000
+                warm_p99 = warm[min(len(warm) - 1, int(len(warm) * 0.99))] * 1000
+                print(
+                    f"{name:<14} {cold_p50:>12.3f} {warm_p50:>12.3f} {warm_p99:>12.3f}"
+                    f" {cold_p50 / warm_p50:>7.1f}x"
+                )
+        finally:
+            lambda_runtime.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Microbenchmark for API route resolution.
+
+Measures the cost of resolving each registered route (plus an unknown path
+and a wrong-method request) through ``EcommerceAPI.router``. Handlers are not
+invoked, so the numbers isolate dispatch overhead.
+
+    python scripts/bench_routing.py --iterations 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from ecommerce_platform.api import EcommerceAPI
+from ecommerce_platform.config import Settings
+
+USER_ID = str(uuid4())
+
+REQUESTS = [
+    ("GET", "/health"),
+    ("GET", "/metrics"),
+    ("POST", "/auth/signup"),
+    ("POST", "/auth/login"),
+    ("GET", "/products"),
+    ("POST", "/products"),
+    ("POST", "/orders"),
+    ("GET", f"/orders/{USER_ID}"),
+    ("GET", f"/recommendations/{USER_ID}"),
+    ("GET", "/does/not/exist"),
+    ("DELETE", "/products"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        settings = Settings(
+            env="bench",
+            database_url=f"sqlite:///{Path(tmpdir) / 'bench.db'}",
+            log_level="info",
+            token_secret="bench",
+            token_ttl_minutes=15,
+            allow_test_mode=True,
+            recommendations_per_user=3,
+            port=0,
+        )
+        api = EcommerceAPI(settings)
+        try:
+            resolve = api.router.resolve
+            print(f"{'route':<52} {'ns/op':>8}")
+            for method, path in REQUESTS:
+                seconds = timeit.timeit(
+                    lambda: resolve(method, path), number=args.iterations
+                )
+                label = f"{method} {path.replace(USER_ID, '{user_id}')}"
+                print(f"{label:<52} {seconds / args.iterations * 1e9:>8.0f}")
+        finally:
+            api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Cold-start profile of the HTTP server and every Lambda entry point.
+
+Each target runs in a fresh interpreter against an already-initialized,
+seeded SQLite file (the common cold start: code is new, data is not) and
+reports three phases:
+
+* ``import``: importing the server module or loading the Lambda handler file;
+* ``init``: building the API (for Lambda, the per-container runtime, which
+  is also when the API modules are imported);
+* ``first``: the first request / invocation.
+
+Medians over ``--repeat`` runs are printed as a table, or as JSON with
+``--json`` so runs can be compared across commits.
+
+    python scripts/profile_startup.py --repeat 5
+    python scripts/profile_startup.py --json > startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PHASES = ("import", "init", "first")
+
+# Lambda target -> handler file and (method, path, body) of its first request.
+LAMBDAS: Dict[str, tuple] = {
+    "lambda:signup": (
+        "authentication/signup.py",
+        lambda ids: (
+            "POST",
+            "/auth/signup",
+            {
+                "username": f"u{uuid4().hex[:12]}",
+                "email": f"{uuid4().hex}@x.io",
+                "password": "pw123456",
+            },
+        ),
+    ),
+    "lambda:login": (
+        "authentication/login.py",
+        lambda ids: ("POST", "/auth/login", {"username": "profile", "password": "password123"}),
+    ),
+    "lambda:get_products": (
+        "product_management/get_products.py",
+        lambda ids: ("GET", "/products", None),
+    ),
+    "lambda:add_product": (
+        "product_management/add_product.py",
+        lambda ids: (
+            "POST",
+            "/products",
+            {"name": "Mug", "description": "x", "category": "kitchen", "price_cents": 900},
+        ),
+    ),
+    "lambda:create_order": (
+        "order_processing/create_order.py",
+        lambda ids: (
+            "POST",
+            "/orders",
+            {
+                "user_id": ids["user_id"],
+                "items": [{"product_id": ids["product_id"], "quantity": 1}],
+            },
+        ),
+    ),
+    "lambda:get_orders": (
+        "order_processing/get_orders.py",
+        lambda ids: ("GET", f"/orders/{ids['user_id']}", None),
+    ),
+    "lambda:recommend": (
+        "recommendation_system/recommend.py",
+        lambda ids: ("GET", f"/recommendations/{ids['user_id']}", None),
+    ),
+}
+TARGETS = ["server", *LAMBDAS]
+
+
+def _timed(function: Callable[[], Any]) -> tuple:
+    started = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _profile_server() -> Dict[str, float]:
+    def load() -> Any:
+        import ecommerce_platform.server  # noqa: F401
+        from ecommerce_platform.api import EcommerceAPI
+
+        return EcommerceAPI
+
+    api_class, import_ms = _timed(load)
+    from ecommerce_platform.config import load_settings
+
+    api, init_ms = _timed(lambda: api_class(load_settings()))
+    response, first_ms = _timed(lambda: api.handle("GET", "/products?limit=20", None))
+    api.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"first request failed with {response.status_code}")
+    return {"import": import_ms, "init": init_ms, "first": first_ms}
+
+
+def _profile_lambda(target: str, ids: Dict[str, str]) -> Dict[str, float]:
+    import importlib.util
+
+    relative, event = LAMBDAS[target]
+    path = ROOT / "lambda_functions" / relative
+
+    def load() -> Any:
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.lambda_handler
+
+    handler, import_ms = _timed(load)
+    from ecommerce_platform import lambda_runtime
+    from ecommerce_platform.lambda_proxy import proxy_event
+
+    _, init_ms = _timed(lambda_runtime.get_api)
+    request = proxy_event(*event(ids))
+    response, first_ms = _timed(lambda: handler(request, None))
+    if response["statusCode"] != 200:
+        raise RuntimeError(f"first invocation failed: {response}")
+    return {"import": import_ms, "init": init_ms, "first": first_ms}
+
+
+def _child(target: str) -> None:
+    ids = json.loads(os.environ["PROFILE_IDS"])
+    # Lambda gets src/ from PYTHONPATH (see infrastructure/serverless.yml).
+    sys.path.insert(0, str(ROOT / "src"))
+    if target == "server":
+        timings = _profile_server()
+    else:
+        timings = _profile_lambda(target, ids)
+    print(json.dumps(timings))
+
+
+def _seed(env: Dict[str, str]) -> Dict[str, str]:
+    code = """
+import json
+from ecommerce_platform.auth import hash_password
+from ecommerce_platform.config import load_settings
+from ecommerce_platform.db import init_db
+from ecommerce_platform.services import EcommerceService
+settings = load_settings()
+service = EcommerceService(settings=settings, db=init_db(settings))
+digest, salt = hash_password("password123", iterations=settings.password_iterations)
+user = service.create_user("profile@example.com", "profile", digest, salt)
+product = service.create_product("Mug", "Ceramic", "kitchen", 1200, "USD")
+print(json.dumps({"user_id": str(user.id), "product_id": str(product.id)}))
+"""
+    env = dict(env, PYTHONPATH=str(ROOT / "src"))
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def _run(target: str, env: Dict[str, str], cwd: str) -> Dict[str, float]:
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", target],
+        env=env,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{target} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per target")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    parser.add_argument("--child", choices=TARGETS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+        env["DATABASE_URL"] = f"sqlite:///{Path(tmpdir) / 'profile.db'}"
+        env["PROFILE_IDS"] = json.dumps(_seed(env))
+        results: Dict[str, Dict[str, float]] = {}
+        for target in TARGETS:
+            runs: List[Dict[str, float]] = [_run(target, env, tmpdir) for _ in range(args.repeat)]
+            medians = {phase: statistics.median(run[phase] for run in runs) for phase in PHASES}
+            medians["total"] = sum(medians[phase] for phase in PHASES)
+            results[target] = {key: round(value, 3) for key, value in medians.items()}
+
+    if args.json:
+        print(json.dumps({"repeat": args.repeat, "unit": "ms", "targets": results}, indent=2))
+        return
+    print(f"{'target (median ms)':<22} {'import':>9} {'init':>9} {'first':>9} {'total':>9}")
+    for target, timings in results.items():
+        print(
+            f"{target:<22} {timings['import']:>9.2f} {timings['init']:>9.2f}"
+            f" {timings['first']:>9.2f} {timings['total']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,34 @@
-"""Core package for the local serverless e-commerce platform."""
+"""Core package for the local serverless e-commerce platform.
 
-from .api import EcommerceAPI, create_api
-from .config import Settings, load_settings
-from .services import EcommerceService
+The public names below are imported on first use, so importing a submodule
+(for example a Lambda entry point's adapter) does not load the whole API.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .api import EcommerceAPI, create_api
+    from .config import Settings, load_settings
+    from .services import EcommerceService
+
+_EXPORTS = {
+    "EcommerceAPI": ".api",
+    "create_api": ".api",
+    "Settings": ".config",
+    "load_settings": ".config",
+    "EcommerceService": ".services",
+}
 
 __all__ = ["EcommerceAPI", "EcommerceService", "Settings", "create_api", "load_settings"]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
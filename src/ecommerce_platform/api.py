@@ -6,22 +6,109 @@ HTTP server and unit tests without requiring third-party frameworks.
 
 from __future__ import annotations
 
+import gzip
+import hashlib
 import json
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
-from uuid import UUID
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generator, Iterator, List, Mapping, Optional, Tuple, TypeVar
+from urllib.parse import parse_qs, urlsplit
+from uuid import UUID, uuid4
 
-from .auth import hash_password
-from .config import Settings, load_settings
-from .db import init_db
-from .services import AuthenticationError, EcommerceService, ValidationError
+from .auth import HasherBusyError, TokenClaims, verify_token
+from .cache import TTLCache
+from .config import RateLimit, Settings, load_settings
+from .db import PoolTimeoutError, db_session, init_db, is_lock_error
+from .ratelimit import TokenBucketLimiter, retry_after
+from .repositories import OrderItemRecord, OrderRecord, ProductRecord
+from .routing import Router
+from .services import (
+    AuthenticationError,
+    AuthorizationError,
+    EcommerceService,
+    ValidationError,
+)
+
+_T = TypeVar("_T")
+
+
+RESPONSE_CACHE_ENTRIES = 64
+MAX_BATCH_REQUESTS = 50
+# Threads shared by all batches for running read-only sub-requests.
+BATCH_READ_WORKERS = 4
+_READ_METHODS = frozenset({"GET", "HEAD"})
+# Routes that hash a password. A transactional batch would hold the write
+# lock while they run, so other writers would time out on it.
+_PASSWORD_PATHS = frozenset({"/auth/signup", "/auth/login"})
+_GZIP_CODINGS = ("gzip", "x-gzip")
+
+
+@dataclass
+class ApiRequest:
+    method: str
+    path: str
+    query: Dict[str, str]
+    body: Optional[str]
+    headers: Dict[str, str]
+    params: Dict[str, str] = field(default_factory=dict)
+    client_ip: Optional[str] = None
+
+
+class ResponseStream:
+    """Iterator of encoded body chunks.
+
+    ``close`` also runs ``on_close``, which releases whatever feeds the chunks
+    (a batch generator, an inner stream) even if iteration never started.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], on_close: Callable[[], None]) -> None:
+        self._chunks = chunks
+        self._on_close = on_close
+
+    def __iter__(self) -> "ResponseStream":
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._on_close()
 
 
 @dataclass
 class ApiResponse:
+    """Encoded response.
+
+    Large listings set ``stream`` instead of ``body``: chunks without a
+    ``Content-Length``, which the HTTP servers send with chunked transfer
+    encoding. Whoever sends a streamed response must close the stream so
+    the generator feeding it is finalized.
+    """
+
     status_code: int
     body: bytes
     headers: Dict[str, str]
+    stream: Optional[ResponseStream] = None
+
+    def buffered(self) -> "ApiResponse":
+        """Return an equivalent response with the whole body in memory."""
+
+        if self.stream is None:
+            return self
+        try:
+            body = b"".join(self.stream)
+        finally:
+            self.stream.close()
+        headers = dict(self.headers, **{"Content-Length": str(len(body))})
+        return ApiResponse(status_code=self.status_code, body=body, headers=headers)
 
 
 class EcommerceAPI:
@@ -29,169 +116,429 @@ class EcommerceAPI:
         self.settings = settings or load_settings()
         self.db = init_db(self.settings)
         self.service = EcommerceService(settings=self.settings, db=self.db)
+        # Encoded catalog responses keyed by catalog version. The TTL bounds
+        # staleness when another process writes to the same database.
+        self._response_cache: Optional[TTLCache[ApiResponse]] = None
+        if self.settings.catalog_cache_size > 0:
+            self._response_cache = TTLCache(
+                RESPONSE_CACHE_ENTRIES, self.settings.catalog_cache_ttl_seconds
+            )
+        # ETags of streamed catalog listings, keyed like the response cache.
+        # Streams are not cached, but a conditional GET can still get a 304.
+        self._stream_etags: Optional[TTLCache[str]] = None
+        if self.settings.catalog_cache_size > 0:
+            self._stream_etags = TTLCache(
+                RESPONSE_CACHE_ENTRIES, self.settings.catalog_cache_ttl_seconds
+            )
+        # gzip bodies of ETag'd responses, keyed by ETag, so cached listings
+        # are compressed once rather than per request.
+        self._gzip_cache: Optional[TTLCache[ApiResponse]] = None
+        if self.settings.gzip_level > 0 and self.settings.catalog_cache_size > 0:
+            self._gzip_cache = TTLCache(
+                RESPONSE_CACHE_ENTRIES, self.settings.catalog_cache_ttl_seconds
+            )
+        # Verified bearer tokens, so repeat requests skip the HMAC check.
+        self._token_cache: Optional[TTLCache[TokenClaims]] = None
+        if self.settings.auth_cache_size > 0:
+            self._token_cache = TTLCache(
+                self.settings.auth_cache_size, self.settings.token_ttl_minutes * 60
+            )
+        self._limiter: Optional[TokenBucketLimiter] = None
+        if self.settings.rate_limits:
+            self._limiter = TokenBucketLimiter(self.settings.rate_limit_buckets)
+        self._route_limits: Dict[Tuple[str, str], Tuple[RateLimit, ...]] = {}
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=BATCH_READ_WORKERS, thread_name_prefix="batch-read"
+        )
+        self.router = self._build_router()
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        body: Optional[str],
+        headers: Optional[Mapping[str, str]] = None,
+        client_ip: Optional[str] = None,
+    ) -> ApiResponse:
+        """Handle one request; ``path`` may carry a query string.
 
-    def handle(self, method: str, path: str, body: Optional[str]) -> ApiResponse:
+        ``client_ip`` keys per-IP rate limits; without it they are skipped.
+        """
+
+        request = _build_request(method, path, body, headers or {}, client_ip)
+        return self._negotiate_encoding(request, self._respond(request))
+
+    def close(self) -> None:
+        """Stop worker threads and release pooled database connections."""
+
+        self._batch_executor.shutdown(wait=True)
+        self.service.passwords.close()
+        self.db.close()
+
+    def _respond(self, request: ApiRequest) -> ApiResponse:
         try:
-            return self._dispatch(method.upper(), path, body)
+            return self._dispatch(request)
         except ValidationError as exc:
             return self._json_response(400, {"error": str(exc)})
         except AuthenticationError as exc:
             return self._json_response(401, {"error": str(exc)})
+        except AuthorizationError as exc:
+            return self._json_response(403, {"error": str(exc)})
+        except (HasherBusyError, PoolTimeoutError) as exc:
+            response = self._json_response(503, {"error": str(exc)})
+            response.headers["Retry-After"] = "1"
+            return response
+        except sqlite3.OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            response = self._json_response(503, {"error": "database is busy"})
+            response.headers["Retry-After"] = "1"
+            return response
         except ValueError as exc:
             return self._json_response(400, {"error": str(exc)})
         except KeyError as exc:
             return self._json_response(400, {"error": f"missing field {exc}"})
 
-    def _dispatch(self, method: str, path: str, body: Optional[str]) -> ApiResponse:
-        if path == "/health" and method == "GET":
-            return self._json_response(200, {"status": "ok", "environment": self.settings.env})
-
-        if path == "/auth/signup" and method == "POST":
-            payload = self._parse_json(body)
-            password_hash, salt = hash_password(payload["password"])
-            user = self.service.create_user(
-                email=payload["email"],
-                username=payload["username"],
-                password_hash=password_hash,
-                password_salt=salt,
-            )
-            return self._json_response(
-                200,
-                {
-                    "id": str(user.id),
-                    "email": user.email,
-                    "username": user.username,
-                    "created_at": user.created_at.isoformat(),
-                },
-            )
+    def _build_router(self) -> Router[Callable[[ApiRequest], ApiResponse]]:
+        router: Router[Callable[[ApiRequest], ApiResponse]] = Router()
+        router.add("GET", "/health", self._health)
+        router.add("GET", "/metrics", self._metrics)
+        router.add("POST", "/auth/signup", self._signup)
+        router.add("POST", "/auth/login", self._login)
+        router.add("GET", "/products", self._list_products)
+        router.add("POST", "/products", self._create_product)
+        router.add("POST", "/orders", self._create_order)
+        router.add("GET", "/orders/{user_id}", self._list_orders)
+        router.add("GET", "/recommendations/{user_id}", self._recommendations)
+        router.add("POST", "/batch", self._batch)
+        return router
 
-        if path == "/auth/login" and method == "POST":
-            payload = self._parse_json(body)
-            user, token, ttl = self.service.login(payload["username"], payload["password"])
-            return self._json_response(
-                200,
-                {"user_id": str(user.id), "token": token, "expires_in_minutes": ttl},
-            )
+    def _dispatch(self, request: ApiRequest) -> ApiResponse:
+        match = self.router.resolve(request.method, request.path)
+        if match.handler is None:
+            if match.allowed:
+                response = self._json_response(405, {"error": "Method Not Allowed"})
+                response.headers["Allow"] = ", ".join(sorted(match.allowed))
+                return response
+            return self._json_response(404, {"error": "Not Found"})
+        request.params = match.params
+        if self._limiter is not None:
+            wait = self._rate_limit_wait(request, match.template)
+            if wait:
+                response = self._json_response(429, {"error": "rate limit exceeded"})
+                response.headers["Retry-After"] = retry_after(wait)
+                return response
+        return match.handler(request)
 
-        if path == "/products" and method == "POST":
-            payload = self._parse_json(body)
-            product = self.service.create_product(
-                name=payload["name"],
-                description=payload["description"],
-                category=payload["category"],
-                price_cents=int(payload["price_cents"]),
-                currency=payload.get("currency", "USD"),
+    def _rate_limit_wait(self, request: ApiRequest, template: str) -> float:
+        """Charge every matching bucket; return the longest wait, 0.0 if allowed."""
+
+        key = (request.method, template)
+        limits = self._route_limits.get(key)
+        if limits is None:
+            route = f"{request.method} {template}"
+            limits = tuple(
+                limit for limit in self.settings.rate_limits if limit.route in (route, "*")
             )
-            return self._json_response(
-                200,
-                {
-                    "id": str(product.id),
-                    "name": product.name,
-                    "description": product.description,
-                    "category": product.category,
-                    "price_cents": product.price_cents,
-                    "currency": product.currency,
-                    "created_at": product.created_at.isoformat(),
-                },
+            self._route_limits[key] = limits
+        wait = 0.0
+        user: Optional[str] = None
+        for limit in limits:
+            if limit.scope == "ip":
+                identity = request.client_ip
+            else:
+                if user is None:
+                    user = _acting_user(request) or ""
+                identity = user or None
+            if identity is None:
+                continue
+            wait = max(
+                wait,
+                self._limiter.acquire(
+                    (limit, identity), limit.requests, limit.requests / limit.per_seconds
+                ),
             )
+        return wait
 
-        if path == "/products" and method == "GET":
-            products = self.service.list_products()
-            return self._json_response(
-                200,
-                [
-                    {
-                        "id": str(product.id),
-                        "name": product.name,
-                        "description": product.description,
-                        "category": product.category,
-                        "price_cents": product.price_cents,
-                        "currency": product.currency,
-                        "created_at": product.created_at.isoformat(),
-                    }
-                    for product in products
-                ],
-            )
+    def _authorize(self, request: ApiRequest, user_id: UUID) -> None:
+        """Auth guard for routes acting on ``user_id``.
 
-        if path == "/orders" and method == "POST":
-            payload = self._parse_json(body)
-            order = self.service.create_order(
-                user_id=self._parse_uuid(payload["user_id"], "user_id"),
-                items=[
-                    (self._parse_uuid(item["product_id"], "product_id"), int(item["quantity"]))
-                    for item in payload["items"]
-                ],
-            )
-            items = self.service.list_order_items(order.id)
-            return self._json_response(
-                200,
-                {
-                    "id": str(order.id),
-                    "user_id": str(order.user_id),
-                    "status": order.status,
-                    "total_cents": order.total_cents,
-                    "currency": order.currency,
-                    "created_at": order.created_at.isoformat(),
-                    "items": [
-                        {
-                            "product_id": str(item.product_id),
-                            "quantity": item.quantity,
-                            "price_cents": item.price_cents,
-                        }
-                        for item in items
-                    ],
-                },
+        A bearer token, when sent, must be valid and belong to ``user_id``.
+        Requests without one pass unless ``REQUIRE_AUTH`` is set.
+        """
+
+        claims = self._authenticate(request)
+        if claims is None:
+            if self.settings.require_auth:
+                raise AuthenticationError("missing bearer token")
+            return
+        if claims.user_id != str(user_id):
+            raise AuthorizationError("token does not grant access to this user")
+
+    def _authenticate(self, request: ApiRequest) -> Optional[TokenClaims]:
+        header = request.headers.get("authorization")
+        if header is None:
+            return None
+        scheme, _, token = header.partition(" ")
+        token = token.strip()
+        if scheme.lower() != "bearer" or not token:
+            raise AuthenticationError("expected 'Authorization: Bearer <token>'")
+        now = time.time()
+        claims = self._token_cache.get(token) if self._token_cache is not None else None
+        if claims is None:
+            claims = verify_token(token, self.settings.token_secret, now)
+            if claims is None:
+                raise AuthenticationError("invalid or expired token")
+            if self._token_cache is not None:
+                self._token_cache.set(token, claims)
+        elif claims.expires <= now:
+            raise AuthenticationError("invalid or expired token")
+        return claims
+
+    def _health(self, request: ApiRequest) -> ApiResponse:
+        return self._json_response(200, {"status": "ok", "environment": self.settings.env})
+
+    def _metrics(self, request: ApiRequest) -> ApiResponse:
+        caches = self.service.cache_stats()
+        if self._response_cache is not None:
+            caches["responses"] = self._response_cache.stats()
+        if self._gzip_cache is not None:
+            caches["gzip"] = self._gzip_cache.stats()
+        if self._token_cache is not None:
+            caches["tokens"] = self._token_cache.stats()
+        payload: Dict[str, Any] = {"caches": caches}
+        if self._limiter is not None:
+            payload["rate_limits"] = self._limiter.stats()
+        payload["password_hashing"] = self.service.passwords.stats()
+        return self._json_response(200, payload)
+
+    def _signup(self, request: ApiRequest) -> ApiResponse:
+        payload = self._parse_json(request.body)
+        password_hash, salt = self.service.passwords.hash(payload["password"])
+        user = self.service.create_user(
+            email=payload["email"],
+            username=payload["username"],
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        return self._json_response(
+            200,
+            {
+                "id": str(user.id),
+                "email": user.email,
+                "username": user.username,
+                "created_at": user.created_at.isoformat(),
+            },
+        )
+
+    def _login(self, request: ApiRequest) -> ApiResponse:
+        payload = self._parse_json(request.body)
+        user, token, ttl = self.service.login(payload["username"], payload["password"])
+        return self._json_response(
+            200,
+            {"user_id": str(user.id), "token": token, "expires_in_minutes": ttl},
+        )
+
+    def _create_product(self, request: ApiRequest) -> ApiResponse:
+        payload = self._parse_json(request.body)
+        product = self.service.create_product(
+            name=payload["name"],
+            description=payload["description"],
+            category=payload["category"],
+            price_cents=int(payload["price_cents"]),
+            currency=payload.get("currency", "USD"),
+        )
+        return self._json_response(200, _product_payload(product))
+
+    def _create_order(self, request: ApiRequest) -> ApiResponse:
+        payload = self._parse_json(request.body)
+        user_id = self._parse_uuid(payload["user_id"], "user_id")
+        self._authorize(request, user_id)
+        order, items = self.service.create_order_with_items(
+            user_id=user_id,
+            items=[
+                (self._parse_uuid(item["product_id"], "product_id"), int(item["quantity"]))
+                for item in payload["items"]
+            ],
+        )
+        return self._json_response(200, _order_payload(order, items))
+
+    def _list_orders(self, request: ApiRequest) -> ApiResponse:
+        user_id = self._parse_uuid(request.params["user_id"], "user_id")
+        self._authorize(request, user_id)
+        limit = self._parse_limit(request.query)
+        if limit is None:
+            return self._json_listing(
+                self.service.iter_orders_with_items(user_id),
+                lambda pair: _order_payload(*pair),
             )
+        page = self.service.list_orders_page(user_id, limit, request.query.get("cursor"))
+        orders = self.service.attach_order_items(page.items)
+        headers = self._page_headers(page.next_cursor)
+        return self._json_response(
+            200, [_order_payload(order, items) for order, items in orders], headers
+        )
 
-        if path.startswith("/orders/") and method == "GET":
-            user_id = self._parse_uuid(path.split("/", 2)[2], "user_id")
-            orders = self.service.list_orders(user_id)
-            response = []
-            for order in orders:
-                items = self.service.list_order_items(order.id)
-                response.append(
-                    {
-                        "id": str(order.id),
-                        "user_id": str(order.user_id),
-                        "status": order.status,
-                        "total_cents": order.total_cents,
-                        "currency": order.currency,
-                        "created_at": order.created_at.isoformat(),
-                        "items": [
-                            {
-                                "product_id": str(item.product_id),
-                                "quantity": item.quantity,
-                                "price_cents": item.price_cents,
-                            }
-                            for item in items
-                        ],
-                    }
+    def _recommendations(self, request: ApiRequest) -> ApiResponse:
+        user_id = self._parse_uuid(request.params["user_id"], "user_id")
+        self._authorize(request, user_id)
+        products = self.service.recommend_products(user_id)
+        return self._json_response(
+            200,
+            {
+                "user_id": str(user_id),
+                "products": [_product_payload(product) for product in products],
+            },
+        )
+
+    def _list_products(self, request: ApiRequest) -> ApiResponse:
+        limit = self._parse_limit(request.query)
+        cursor = request.query.get("cursor")
+        cache_key: Optional[Tuple[int, Optional[int]]] = None
+        response: Optional[ApiResponse] = None
+        if self._response_cache is not None and not cursor:
+            cache_key = (self.service.products.version, limit)
+            response = self._response_cache.get(cache_key)
+            if response is None and self._stream_etags is not None:
+                streamed = self._stream_etags.get(cache_key)
+                if streamed is not None and _etag_matches(
+                    request.headers.get("if-none-match"), streamed
+                ):
+                    return ApiResponse(status_code=304, body=b"", headers={"ETag": streamed})
+        if response is None:
+            if limit is None:
+                response = self._json_listing(self.service.iter_products(), _product_payload)
+                if response.stream is not None:
+                    if cache_key is not None and self._stream_etags is not None:
+                        etag = self._stream_etags.get(cache_key)
+                        if etag is None:
+                            # Fixed per catalog version until the TTL lapses; the
+                            # random part keeps other processes' tags, and tags
+                            # from before a lapse, from matching.
+                            etag = f'"v{cache_key[0]}-{uuid4().hex}"'
+                            self._stream_etags.set(cache_key, etag)
+                        response.headers["ETag"] = etag
+                    return response
+            else:
+                page = self.service.list_products_page(limit, cursor)
+                response = self._json_response(
+                    200,
+                    [_product_payload(product) for product in page.items],
+                    self._page_headers(page.next_cursor),
                 )
-            return self._json_response(200, response)
-
-        if path.startswith("/recommendations/") and method == "GET":
-            user_id = self._parse_uuid(path.split("/", 2)[2], "user_id")
-            products = self.service.recommend_products(user_id)
-            return self._json_response(
-                200,
-                {
-                    "user_id": str(user_id),
-                    "products": [
-                        {
-                            "id": str(product.id),
-                            "name": product.name,
-                            "description": product.description,
-                            "category": product.category,
-                            "price_cents": product.price_cents,
-                            "currency": product.currency,
-                            "created_at": product.created_at.isoformat(),
-                        }
-                        for product in products
-                    ],
-                },
-            )
+            response.headers["ETag"] = _strong_etag(response.body)
+            if cache_key is not None and self._response_cache is not None:
+                self._response_cache.set(cache_key, response)
+        etag = response.headers["ETag"]
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            not_modified = {"ETag": etag}
+            if "X-Next-Cursor" in response.headers:
+                not_modified["X-Next-Cursor"] = response.headers["X-Next-Cursor"]
+            return ApiResponse(status_code=304, body=b"", headers=not_modified)
+        return response
+
+    def _batch(self, request: ApiRequest) -> ApiResponse:
+        payload = self._parse_json(request.body)
+        items = payload["requests"]
+        if not isinstance(items, list) or not items:
+            raise ValueError("requests must be a non-empty array")
+        if len(items) > MAX_BATCH_REQUESTS:
+            raise ValueError(f"a batch holds at most {MAX_BATCH_REQUESTS} requests")
+        inherited = {}
+        if "authorization" in request.headers:
+            inherited["authorization"] = request.headers["authorization"]
+        subrequests = [
+            _batch_subrequest(index, item, inherited, request.client_ip)
+            for index, item in enumerate(items)
+        ]
+        extra = b""
+        if payload.get("transaction"):
+            for index, subrequest in enumerate(subrequests):
+                if subrequest.path in _PASSWORD_PATHS:
+                    raise ValueError(
+                        f"requests[{index}]: {subrequest.path} cannot run in a transaction"
+                    )
+            responses, committed = self._run_batch_transaction(subrequests)
+            extra = b', "committed": ' + (b"true" if committed else b"false")
+        else:
+            responses = self._run_batch(subrequests)
+        body = (
+            b'{"responses": ['
+            + b", ".join(_encode_batch_item(response) for response in responses)
+            + b"]"
+            + extra
+            + b"}"
+        )
+        return ApiResponse(
+            status_code=200,
+            body=body,
+            headers={"Content-Type": "application/json", "Content-Length": str(len(body))},
+        )
+
+    def _run_batch(self, subrequests: List[ApiRequest]) -> List[ApiResponse]:
+        """Run writes one by one in order; adjacent reads run concurrently.
+
+        A read therefore sees every write listed before it, as if the batch
+        had been sent as separate requests.
+        """
+
+        responses: List[Optional[ApiResponse]] = [None] * len(subrequests)
+        reads: List[int] = []
 
-        return self._json_response(404, {"error": "Not Found"})
+        def run_reads() -> None:
+            if len(reads) == 1:
+                responses[reads[0]] = self._respond_buffered(subrequests[reads[0]])
+            elif reads:
+                futures = [
+                    (index, self._batch_executor.submit(self._respond_buffered, subrequests[index]))
+                    for index in reads
+                ]
+                for index, future in futures:
+                    responses[index] = future.result()
+            reads.clear()
+
+        for index, subrequest in enumerate(subrequests):
+            if subrequest.method in _READ_METHODS:
+                reads.append(index)
+                continue
+            run_reads()
+            responses[index] = self._respond_buffered(subrequest)
+        run_reads()
+        return [response for response in responses if response is not None]
+
+    def _run_batch_transaction(
+        self, subrequests: List[ApiRequest]
+    ) -> Tuple[List[ApiResponse], bool]:
+        """Run every sub-request in order inside one write transaction.
+
+        The first sub-response with a 4xx/5xx status rolls everything back;
+        the sub-requests after it are reported as ``424`` and not executed.
+        """
+
+        responses: List[ApiResponse] = []
+        committed = False
+        try:
+            with db_session(self.db, immediate=True):
+                for subrequest in subrequests:
+                    response = self._respond_buffered(subrequest)
+                    responses.append(response)
+                    if response.status_code >= 400:
+                        raise _BatchRollback
+            committed = True
+        except _BatchRollback:
+            pass
+        finally:
+            # Writes bump the catalog version before the outer transaction
+            # commits, so a concurrent read can cache the pre-commit listing
+            # under the new version; on rollback, reads made inside the
+            # transaction may be cached. Either way, start over.
+            self.service.invalidate_caches()
+        skipped = self._json_response(424, {"error": "not executed: batch rolled back"})
+        responses.extend(skipped for _ in range(len(subrequests) - len(responses)))
+        return responses, committed
+
+    def _respond_buffered(self, request: ApiRequest) -> ApiResponse:
+        return self._respond(request).buffered()
 
     def _parse_uuid(self, value: str, field: str) -> UUID:
         try:
@@ -199,6 +546,22 @@ class EcommerceAPI:
         except ValueError as exc:
             raise ValueError(f"invalid {field}") from exc
 
+    def _parse_limit(self, query: Dict[str, str]) -> Optional[int]:
+        """Return the requested page size, or None for an unpaginated listing.
+
+        A ``cursor`` without ``limit`` pages with the configured maximum size.
+        """
+
+        if "limit" not in query:
+            return self.settings.max_page_size if "cursor" in query else None
+        try:
+            return int(query["limit"])
+        except ValueError as exc:
+            raise ValueError("invalid limit") from exc
+
+    def _page_headers(self, next_cursor: Optional[str]) -> Dict[str, str]:
+        return {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
     def _parse_json(self, body: Optional[str]) -> Dict[str, Any]:
         if not body:
             raise ValueError("request body is required")
@@ -210,14 +573,261 @@ class EcommerceAPI:
             raise ValueError("payload must be a JSON object")
         return payload
 
-    def _json_response(self, status_code: int, payload: Any) -> ApiResponse:
+    def _json_listing(
+        self,
+        batches: Generator[List[_T], None, None],
+        to_payload: Callable[[_T], Any],
+    ) -> ApiResponse:
+        """Encode a listing as a JSON array, streaming it when it is large.
+
+        Up to ``stream_threshold_rows`` rows are buffered into an ordinary
+        response. Past that the rows read so far and the rest of ``batches``
+        become a chunk stream, so memory stays bounded by one batch.
+        """
+
+        head: List[_T] = []
+        try:
+            for batch in batches:
+                head.extend(batch)
+                if len(head) > self.settings.stream_threshold_rows:
+                    return ApiResponse(
+                        status_code=200,
+                        body=b"",
+                        headers={"Content-Type": "application/json"},
+                        stream=ResponseStream(
+                            _json_array_chunks(head, batches, to_payload), batches.close
+                        ),
+                    )
+        except BaseException:
+            batches.close()
+            raise
+        return self._json_response(200, [to_payload(record) for record in head])
+
+    def _negotiate_encoding(self, request: ApiRequest, response: ApiResponse) -> ApiResponse:
+        """gzip the body when the client accepts it and it is worth it.
+
+        Streams are always compressed (they are large by construction);
+        buffered bodies only from ``gzip_min_bytes``. The gzip variant of an
+        ETag'd response gets the weak form of that ETag, which still matches
+        ``If-None-Match`` under weak comparison.
+        """
+
+        level = self.settings.gzip_level
+        if level <= 0 or "Content-Encoding" in response.headers:
+            return response
+        if response.stream is None and len(response.body) < self.settings.gzip_min_bytes:
+            return response
+        headers = dict(response.headers, Vary="Accept-Encoding")
+        if not _accepts_gzip(request.headers.get("accept-encoding")):
+            return ApiResponse(response.status_code, response.body, headers, response.stream)
+        headers["Content-Encoding"] = "gzip"
+        etag = response.headers.get("ETag")
+        if etag is not None:
+            headers["ETag"] = etag if etag.startswith("W/") else f"W/{etag}"
+        if response.stream is not None:
+            inner = response.stream
+            return ApiResponse(
+                response.status_code,
+                b"",
+                headers,
+                ResponseStream(_gzip_chunks(inner, level), inner.close),
+            )
+        if etag is not None and self._gzip_cache is not None:
+            cached = self._gzip_cache.get(etag)
+            if cached is not None:
+                return cached
+        body = gzip.compress(response.body, compresslevel=level, mtime=0)
+        headers["Content-Length"] = str(len(body))
+        compressed = ApiResponse(response.status_code, body, headers)
+        if etag is not None and self._gzip_cache is not None:
+            self._gzip_cache.set(etag, compressed)
+        return compressed
+
+    def _json_response(
+        self, status_code: int, payload: Any, extra_headers: Optional[Dict[str, str]] = None
+    ) -> ApiResponse:
         body = json.dumps(payload).encode("utf-8")
         headers = {
             "Content-Type": "application/json",
             "Content-Length": str(len(body)),
         }
+        if extra_headers:
+            headers.update(extra_headers)
         return ApiResponse(status_code=status_code, body=body, headers=headers)
 
 
+class _BatchRollback(Exception):
+    pass
+
+
+def _build_request(
+    method: str,
+    path: str,
+    body: Optional[str],
+    headers: Mapping[str, str],
+    client_ip: Optional[str] = None,
+) -> ApiRequest:
+    target = urlsplit(path)
+    return ApiRequest(
+        method=method.upper(),
+        path=target.path,
+        query={key: values[-1] for key, values in parse_qs(target.query).items()},
+        body=body,
+        headers={key.lower(): value for key, value in headers.items()},
+        client_ip=client_ip,
+    )
+
+
+def _acting_user(request: ApiRequest) -> Optional[str]:
+    """Best-effort identity for per-user limits: path ``user_id``, else body."""
+
+    if "user_id" in request.params:
+        return request.params["user_id"]
+    if not request.body:
+        return None
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    identity = payload.get("username") or payload.get("user_id")
+    return str(identity) if identity else None
+
+
+def _batch_subrequest(
+    index: int, item: Any, inherited: Dict[str, str], client_ip: Optional[str]
+) -> ApiRequest:
+    if not isinstance(item, dict):
+        raise ValueError(f"requests[{index}] must be an object")
+    method, path = item.get("method"), item.get("path")
+    if not isinstance(method, str) or not isinstance(path, str) or not path.startswith("/"):
+        raise ValueError(f"requests[{index}] needs a method and an absolute path")
+    body = item.get("body")
+    if body is not None and not isinstance(body, str):
+        body = json.dumps(body)
+    headers = item.get("headers") or {}
+    if not isinstance(headers, dict):
+        raise ValueError(f"requests[{index}].headers must be an object")
+    request = _build_request(method, path, body, {**inherited, **headers}, client_ip)
+    if request.path == "/batch":
+        raise ValueError(f"requests[{index}]: batches cannot be nested")
+    return request
+
+
+def _encode_batch_item(response: ApiResponse) -> bytes:
+    """Encode one sub-response, splicing its JSON body in without re-parsing."""
+
+    headers = {key: value for key, value in response.headers.items() if key != "Content-Length"}
+    if not response.body:
+        body = b"null"
+    elif response.headers.get("Content-Type") == "application/json":
+        body = response.body
+    else:
+        body = json.dumps(response.body.decode("utf-8", "replace")).encode("utf-8")
+    return b'{"status": %d, "headers": %s, "body": %s}' % (
+        response.status_code,
+        json.dumps(headers).encode("utf-8"),
+        body,
+    )
+
+
+def _json_array_chunks(
+    head: List[_T],
+    batches: Iterator[List[_T]],
+    to_payload: Callable[[_T], Any],
+) -> Iterator[bytes]:
+    """Yield one chunk per batch; the output matches ``json.dumps(list)``."""
+
+    try:
+        yield ("[" + ", ".join(json.dumps(to_payload(record)) for record in head)).encode("utf-8")
+        del head[:]
+        for batch in batches:
+            yield "".join(", " + json.dumps(to_payload(record)) for record in batch).encode(
+                "utf-8"
+            )
+        yield b"]"
+    finally:
+        batches.close()
+
+
+def _gzip_chunks(stream: Iterator[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in stream:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether ``Accept-Encoding`` allows gzip; an explicit entry beats ``*``."""
+
+    if not accept_encoding:
+        return False
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    for coding in (*_GZIP_CODINGS, "*"):
+        if coding in weights:
+            return weights[coding] > 0
+    return False
+
+
+def _product_payload(product: ProductRecord) -> Dict[str, Any]:
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "description": product.description,
+        "category": product.category,
+        "price_cents": product.price_cents,
+        "currency": product.currency,
+        "created_at": product.created_at.isoformat(),
+    }
+
+
+def _order_payload(order: OrderRecord, items: List[OrderItemRecord]) -> Dict[str, Any]:
+    return {
+        "id": str(order.id),
+        "user_id": str(order.user_id),
+        "status": order.status,
+        "total_cents": order.total_cents,
+        "currency": order.currency,
+        "created_at": order.created_at.isoformat(),
+        "items": [
+            {
+                "product_id": str(item.product_id),
+                "quantity": item.quantity,
+                "price_cents": item.price_cents,
+            }
+            for item in items
+        ],
+    }
+
+
+def _strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for ``If-None-Match`` (RFC 9110 13.1.2)."""
+
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
 def create_api(settings: Settings | None = None) -> EcommerceAPI:
     return EcommerceAPI(settings=settings)
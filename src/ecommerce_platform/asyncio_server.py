@@ -0,0 +1,339 @@
+"""asyncio HTTP front end for the local e-commerce API.
+
+One event loop multiplexes every client connection, so thousands of mostly
+idle keep-alive clients cost a coroutine each rather than an OS thread.
+``EcommerceAPI.handle`` (SQLite queries, PBKDF2 hashing) is blocking, so each
+request runs on a bounded thread pool; at most ``workers * 4`` requests are
+admitted to it at once and the rest wait on their connection. A streamed
+response is iterated by the same executor job that produced it and handed to
+the loop chunk by chunk, so its pooled connection never changes threads.
+
+The server exposes the same ``serve_forever`` / ``shutdown`` /
+``server_close`` / ``server_address`` surface as ``EcommerceHTTPServer`` so
+``create_server`` callers do not care which mode is running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .api import ApiResponse, EcommerceAPI
+
+MAX_HEADER_BYTES = 64 * 1024
+# Chunks an executor job may produce ahead of the socket.
+STREAM_WINDOW = 8
+
+_END = object()
+
+logger = logging.getLogger(__name__)
+
+# (method, target, body, headers, client_ip) as passed to EcommerceAPI.handle.
+_Request = Tuple[str, str, Optional[str], Dict[str, str], Optional[str]]
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class AsyncEcommerceServer:
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        api: EcommerceAPI,
+        workers: Optional[int] = None,
+        reuse_port: bool = False,
+    ) -> None:
+        self.api = api
+        settings = api.settings
+        self.workers = workers or settings.http_workers
+        self._idle_timeout = settings.http_keepalive_timeout_seconds
+        self._max_requests = settings.http_keepalive_max_requests
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="api-worker"
+        )
+        # Bind eagerly so server_address is known before serve_forever runs.
+        self.socket = socket.create_server(address, reuse_port=reuse_port)
+        self.server_address = self.socket.getsockname()[:2]
+        self._slots = asyncio.Semaphore(self.workers * 4)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._shutdown_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._connections: Set[asyncio.Task] = set()
+        # Connections with a request in progress; the rest are waiting for one.
+        self._busy: Set[asyncio.Task] = set()
+        self._grace_seconds = settings.http_shutdown_grace_seconds
+        self.draining = False
+
+    def serve_forever(self) -> None:
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self) -> None:
+        """Stop serving; safe to call from another thread."""
+
+        self._shutdown_requested.set()
+        loop, stop = self._loop, self._stop
+        if loop is None or stop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(stop.set)
+        except RuntimeError:
+            return
+        self._stopped.wait()
+
+    def server_close(self) -> None:
+        self.socket.close()
+        self._executor.shutdown(wait=True)
+        self.api.close()
+
+    async def _serve(self) -> None:
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._shutdown_requested.is_set():
+            return
+        server = await asyncio.start_server(
+            self._serve_connection, sock=self.socket, limit=MAX_HEADER_BYTES
+        )
+        async with server:
+            await self._stop.wait()
+            server.close()
+            await self._drain()
+
+    async def _drain(self) -> None:
+        """Let in-flight requests finish, closing idle connections meanwhile."""
+
+        self.draining = True
+        deadline = self._loop.time() + self._grace_seconds
+        while self._connections:
+            for task in self._connections - self._busy:
+                task.cancel()
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.wait(set(self._connections), timeout=min(remaining, 0.05))
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections.add(task)
+        peer = writer.get_extra_info("peername")
+        client_ip = peer[0] if peer else None
+        served = 0
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), timeout=self._idle_timeout
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, _error_response(431), keep_alive=False)
+                    return
+                if task is not None:
+                    self._busy.add(task)
+                try:
+                    method, target, version, headers = _parse_head(head)
+                    length = int(headers.get("content-length", "0"))
+                    if length < 0:
+                        raise _BadRequest("negative Content-Length")
+                except (_BadRequest, ValueError):
+                    await self._write(writer, _error_response(400), keep_alive=False)
+                    return
+                try:
+                    raw_body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                try:
+                    body = raw_body.decode("utf-8") if raw_body else None
+                except UnicodeDecodeError:
+                    await self._write(writer, _error_response(400), keep_alive=False)
+                    return
+                served += 1
+                keep_alive = _wants_keep_alive(version, headers) and served < self._max_requests
+                async with self._slots:
+                    keep_alive = await self._respond(
+                        writer, (method, target, body, headers, client_ip), version, keep_alive
+                    )
+                if task is not None:
+                    self._busy.discard(task)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancellation only comes from shutdown, which closes the socket.
+            return
+        finally:
+            if task is not None:
+                self._connections.discard(task)
+                self._busy.discard(task)
+            writer.close()
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        request: _Request,
+        version: str,
+        keep_alive: bool,
+    ) -> bool:
+        """Run one request on the executor and write its response.
+
+        Returns whether the connection may serve another request.
+        """
+
+        loop = asyncio.get_running_loop()
+        channel = _Channel(loop)
+        job = loop.run_in_executor(self._executor, self._produce, channel, request, version)
+        try:
+            response = await channel.get()
+            # A shutdown that started meanwhile closes the connection after this response.
+            keep_alive = keep_alive and not self.draining
+            if isinstance(response, BaseException):
+                await self._write(writer, _error_response(500), keep_alive=False)
+                return False
+            if response.stream is None:
+                await self._write(writer, response, keep_alive)
+                return keep_alive
+            writer.write(_encode_head(response, keep_alive, chunked=True))
+            while True:
+                chunk = await channel.get()
+                if chunk is _END:
+                    break
+                if isinstance(chunk, BaseException):
+                    # Headers are out; only an unterminated stream signals failure.
+                    return False
+                writer.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return keep_alive
+        finally:
+            channel.cancel()
+            await job
+
+    def _produce(
+        self,
+        channel: "_Channel",
+        request: _Request,
+        version: str,
+    ) -> None:
+        try:
+            response = self.api.handle(*request)
+            if response.stream is not None and version != "HTTP/1.1":
+                response = response.buffered()
+        except Exception as exc:
+            logger.exception("error handling %s %s", request[0], request[1])
+            channel.put(exc)
+            return
+        stream = response.stream
+        if stream is None:
+            channel.put(response)
+            return
+        try:
+            if not channel.put(response):
+                return
+            for chunk in stream:
+                if chunk and not channel.put(chunk):
+                    return
+            channel.put(_END)
+        except Exception as exc:
+            logger.exception("error streaming %s %s", request[0], request[1])
+            channel.put(exc)
+        finally:
+            stream.close()
+
+    async def _write(
+        self, writer: asyncio.StreamWriter, response: ApiResponse, keep_alive: bool
+    ) -> None:
+        writer.write(_encode_head(response, keep_alive) + response.body)
+        await writer.drain()
+
+
+class _Channel:
+    """Hands a response and its chunks from an executor thread to the loop.
+
+    ``put`` blocks the producer while ``STREAM_WINDOW`` items are unread and
+    returns False once the consumer has gone away.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._credits = threading.Semaphore(STREAM_WINDOW)
+        self._cancelled = threading.Event()
+
+    def put(self, item: Any) -> bool:
+        while not self._credits.acquire(timeout=0.5):
+            if self._cancelled.is_set():
+                return False
+        if self._cancelled.is_set():
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            return False
+        return True
+
+    async def get(self) -> Any:
+        item = await self._queue.get()
+        self._credits.release()
+        return item
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError as exc:
+        raise _BadRequest("malformed request line") from exc
+    if not version.startswith("HTTP/1."):
+        raise _BadRequest("unsupported HTTP version")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            raise _BadRequest("malformed header")
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def _wants_keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def _encode_head(response: ApiResponse, keep_alive: bool, chunked: bool = False) -> bytes:
+    status = HTTPStatus(response.status_code)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Date: {formatdate(usegmt=True)}"]
+    lines.extend(f"{key}: {value}" for key, value in response.headers.items())
+    if chunked:
+        lines.append("Transfer-Encoding: chunked")
+    if not keep_alive:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _error_response(status_code: int) -> ApiResponse:
+    return ApiResponse(status_code=status_code, body=b"", headers={"Content-Length": "0"})
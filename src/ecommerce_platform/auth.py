@@ -2,28 +2,138 @@
 
 from __future__ import annotations
 
+import base64
 import hashlib
+import hmac
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Tuple
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
+_T = TypeVar("_T")
+
+
+DEFAULT_PASSWORD_ITERATIONS = 120_000
+# Hashes stored before the iteration count was recorded are bare hex digests.
+_LEGACY_ITERATIONS = 120_000
+_HASH_PREFIX = "pbkdf2_sha256$"
+
+
+class HasherBusyError(RuntimeError):
+    """Raised when the password hasher has no room for more work."""
+
+
+def hash_password(
+    password: str, salt: str | None = None, iterations: int = DEFAULT_PASSWORD_ITERATIONS
+) -> Tuple[str, str]:
+    """Return ``(digest, salt)``; the digest records its iteration count."""
 
-def hash_password(password: str, salt: str | None = None) -> Tuple[str, str]:
     if salt is None:
         salt = secrets.token_hex(16)
-    digest = hashlib.pbkdf2_hmac(
+    digest = _pbkdf2(password, salt, iterations)
+    return f"{_HASH_PREFIX}{iterations}${digest}", salt
+
+
+def verify_password(password: str, digest: str, salt: str) -> bool:
+    expected = _pbkdf2(password, salt, password_iterations(digest))
+    return secrets.compare_digest(expected, digest.rpartition("$")[2])
+
+
+def password_iterations(digest: str) -> int:
+    """PBKDF2 iteration count a stored digest was produced with."""
+
+    if not digest.startswith(_HASH_PREFIX):
+        return _LEGACY_ITERATIONS
+    return int(digest[len(_HASH_PREFIX) :].partition("$")[0])
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac(
         "sha256",
         password.encode("utf-8"),
         salt.encode("utf-8"),
-        120_000,
+        iterations,
     ).hex()
-    return digest, salt
 
 
-def verify_password(password: str, digest: str, salt: str) -> bool:
-    expected, _ = hash_password(password, salt)
-    return secrets.compare_digest(expected, digest)
+class PasswordHasher:
+    """Runs PBKDF2 on a small dedicated thread pool with admission control.
+
+    ``hashlib`` releases the GIL while deriving keys, so up to ``workers``
+    hashes run in parallel. At most ``workers + max_queued`` calls may be in
+    flight; the next one raises ``HasherBusyError`` immediately instead of
+    waiting, so a login burst cannot tie up every request thread.
+    """
+
+    def __init__(
+        self,
+        iterations: int = DEFAULT_PASSWORD_ITERATIONS,
+        workers: int = 2,
+        max_queued: int = 2,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_queued < 0:
+            raise ValueError("max_queued must not be negative")
+        self.iterations = iterations
+        self.workers = workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_queued)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def hash(self, password: str) -> Tuple[str, str]:
+        return self._run(hash_password, password, None, self.iterations)
+
+    def verify(self, password: str, digest: str, salt: str) -> bool:
+        return self._run(verify_password, password, digest, salt)
+
+    def needs_rehash(self, digest: str) -> bool:
+        return password_iterations(digest) != self.iterations
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_latency_ms": round(self._latency_total / self.completed * 1000, 3)
+                if self.completed
+                else 0.0,
+                "max_latency_ms": round(self._latency_max * 1000, 3),
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _run(self, function: Callable[..., _T], *args: Any) -> _T:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusyError("password hashing is at capacity")
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+            self._slots.release()
 
 
 @dataclass(frozen=True)
@@ -32,7 +142,50 @@ class Token:
     expires_at: datetime
 
 
-def issue_token(user_id: str, secret: str, ttl_minutes: int) -> Token:
-    token_seed = f"{user_id}:{secret}:{secrets.token_hex(8)}"
-    token = hashlib.sha256(token_seed.encode("utf-8")).hexdigest()
-    return Token(value=token, expires_at=datetime.utcnow() + timedelta(minutes=ttl_minutes))
+@dataclass(frozen=True)
+class TokenClaims:
+    user_id: str
+    expires: int  # Unix time, seconds
+
+
+def issue_token(
+    user_id: str, secret: str, ttl_minutes: int, now: Optional[float] = None
+) -> Token:
+    """Issue a signed ``<user_id>.<expires>.<signature>`` token.
+
+    The signature is an HMAC-SHA256 of ``<user_id>.<expires>`` under
+    ``secret``, so ``verify_token`` needs no storage lookup.
+    """
+
+    if "." in user_id:
+        raise ValueError("user_id must not contain '.'")
+    expires = int(time.time() if now is None else now) + ttl_minutes * 60
+    payload = f"{user_id}.{expires}"
+    return Token(
+        value=f"{payload}.{_sign(payload, secret).decode('ascii')}",
+        expires_at=datetime.utcfromtimestamp(expires),
+    )
+
+
+def verify_token(token: str, secret: str, now: Optional[float] = None) -> Optional[TokenClaims]:
+    """Return the claims of a well-signed, unexpired token, else None."""
+
+    payload, _, signature = token.rpartition(".")
+    user_id, _, expires = payload.partition(".")
+    if not user_id or not expires.isdigit():
+        return None
+    try:
+        signature_bytes = signature.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    if not hmac.compare_digest(_sign(payload, secret), signature_bytes):
+        return None
+    claims = TokenClaims(user_id=user_id, expires=int(expires))
+    if claims.expires <= (time.time() if now is None else now):
+        return None
+    return claims
+
+
+def _sign(payload: str, secret: str) -> bytes:
+    digest = hmac.new(secret.encode("utf-8"), payload.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=")
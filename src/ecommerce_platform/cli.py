@@ -3,12 +3,21 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import dataclasses
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Sequence, TextIO
 
 from .auth import hash_password
-from .config import load_settings
+from .config import Settings, load_settings
 from .db import init_db
-from .services import EcommerceService
+from .repositories import BULK_CHUNK_SIZE
+from .services import EcommerceError, EcommerceService
 
 SAMPLE_PRODUCTS = [
     {
@@ -43,7 +52,9 @@ SAMPLE_PRODUCTS = [
 
 
 def _seed_data(service: EcommerceService) -> None:
-    password_hash, salt = hash_password("password123")
+    password_hash, salt = hash_password(
+        "password123", iterations=service.settings.password_iterations
+    )
     service.create_user(
         email="demo@example.com",
         username="demo",
@@ -54,29 +65,228 @@ def _seed_data(service: EcommerceService) -> None:
         service.create_product(**product)
 
 
-def main() -> None:
+@contextmanager
+def _open_source(path: str) -> Iterator[TextIO]:
+    if path == "-":
+        yield sys.stdin
+        return
+    with open(path, encoding="utf-8", newline="") as handle:
+        yield handle
+
+
+def _iter_rows(handle: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield one record at a time so imports run in constant memory."""
+
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+        return
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"line {line_number}: invalid JSON") from exc
+        if not isinstance(row, dict):
+            raise ValueError(f"line {line_number}: expected a JSON object")
+        yield row
+
+
+def _detect_format(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if Path(path).suffix.lower() == ".csv" else "ndjson"
+
+
+def _import(
+    importer: Callable[..., int],
+    path: str,
+    fmt: str | None,
+    batch_size: int,
+) -> None:
+    started = time.perf_counter()
+    committed = 0
+
+    def report(imported: int) -> None:
+        nonlocal committed
+        committed = imported
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"committed {imported} rows ({imported / elapsed:,.0f} rows/s)", flush=True)
+
+    with _open_source(path) as handle:
+        try:
+            imported = importer(
+                _iter_rows(handle, _detect_format(path, fmt)),
+                chunk_size=batch_size,
+                on_commit=report,
+            )
+        except (EcommerceError, KeyError, ValueError) as exc:
+            detail = f"missing field {exc}" if isinstance(exc, KeyError) else str(exc)
+            raise SystemExit(f"Import failed: {detail}") from exc
+        except sqlite3.IntegrityError as exc:
+            raise SystemExit(
+                f"Import failed: the batch after row {committed} was rejected ({exc});"
+                f" {committed} rows stay committed"
+            ) from exc
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"Imported {imported} rows in {elapsed:.2f}s ({imported / elapsed:,.0f} rows/s)")
+
+
+def _serve(settings: Settings, mode: str | None, workers: int | None) -> None:
+    if mode:
+        settings = dataclasses.replace(settings, server_mode=mode)
+    processes = workers or settings.server_processes
+    if processes > 1:
+        from .prefork import PreforkSupervisor
+
+        raise SystemExit(PreforkSupervisor(settings, processes).run())
+
+    from .server import run
+
+    run(settings)
+
+
+def _bench_http(settings: Settings, args: argparse.Namespace) -> None:
+    from . import loadgen
+
+    try:
+        mix = loadgen.parse_mix(args.mix) if args.mix else loadgen.DEFAULT_MIX
+    except ValueError as exc:
+        raise SystemExit(f"Invalid --mix: {exc}") from exc
+
+    def bench(base_url: str) -> Dict[str, Any]:
+        return loadgen.run_benchmark(
+            base_url,
+            clients=args.clients,
+            requests=args.requests,
+            mix=mix,
+            users=args.users,
+            products=args.products,
+            seed=args.seed,
+        )
+
+    try:
+        if args.url:
+            report = bench(args.url)
+        else:
+            if args.mode:
+                settings = dataclasses.replace(settings, server_mode=args.mode)
+            with loadgen.local_server(settings) as base_url:
+                report = bench(base_url)
+            report["server_mode"] = settings.server_mode
+    except (OSError, RuntimeError, ValueError) as exc:
+        raise SystemExit(f"Benchmark failed: {exc}") from exc
+    report["target"] = args.url or "local"
+    print(loadgen.format_json(report) if args.json else loadgen.format_report(report))
+
+
+def main(argv: Sequence[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="Local e-commerce platform utilities")
     parser.add_argument(
         "command",
-        choices=["init-db", "seed"],
+        choices=["init-db", "seed", "import-products", "import-users", "serve", "bench-http"],
         help="Action to run",
     )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="NDJSON or CSV file to import ('-' for stdin)",
+    )
     parser.add_argument(
         "--env-file",
         default=None,
         help="Optional path to .env file",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--format",
+        choices=["ndjson", "csv"],
+        default=None,
+        help="Import file format (defaults to the file extension, then NDJSON)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_CHUNK_SIZE,
+        help="Rows committed per transaction during imports",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["threaded", "asyncio"],
+        default=None,
+        help="Server concurrency model for serve and bench-http (defaults to SERVER_MODE)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for serve sharing the port via SO_REUSEPORT "
+        "(defaults to SERVER_PROCESSES)",
+    )
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="Server for bench-http to load (default: an in-process server on a "
+        "throwaway database); start it with RATE_LIMITS= empty, or seeding waits "
+        "out 429s and the run measures the rate limiter",
+    )
+    parser.add_argument(
+        "--clients", type=int, default=8, help="Concurrent keep-alive clients for bench-http"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Total requests sent by bench-http"
+    )
+    parser.add_argument(
+        "--users", type=int, default=20, help="Users bench-http signs up before the run"
+    )
+    parser.add_argument(
+        "--products", type=int, default=50, help="Products bench-http creates before the run"
+    )
+    parser.add_argument(
+        "--mix",
+        default=None,
+        help="bench-http request weights, e.g. 'signup=5,login=10,products=45,"
+        "orders=25,recommendations=15' (the default)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Random seed for the bench-http request mix"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the bench-http report as JSON"
+    )
+    args = parser.parse_args(argv)
+    if args.command.startswith("import-") and not args.path:
+        parser.error(f"{args.command} requires a path")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    for option in ("clients", "requests", "users", "products"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option} must be at least 1")
 
     settings = load_settings(args.env_file)
+    if args.command == "serve":
+        _serve(settings, args.mode, args.workers)
+        return
+    if args.command == "bench-http":
+        _bench_http(settings, args)
+        return
+
     db = init_db(settings)
     service = EcommerceService(settings=settings, db=db)
 
-    if args.command == "init-db":
-        print(f"Initialized database at {settings.sqlite_path}")
-    elif args.command == "seed":
-        _seed_data(service)
-        print("Seeded demo user and products")
+    try:
+        if args.command == "init-db":
+            print(f"Initialized database at {settings.sqlite_path}")
+        elif args.command == "seed":
+            _seed_data(service)
+            print("Seeded demo user and products")
+        elif args.command == "import-products":
+            _import(service.import_products, args.path, args.format, args.batch_size)
+        elif args.command == "import-users":
+            _import(service.import_users, args.path, args.format, args.batch_size)
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
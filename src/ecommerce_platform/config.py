@@ -10,7 +10,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Tuple
 
 
 def _parse_env_line(line: str) -> tuple[str, str] | None:
@@ -40,6 +40,54 @@ def load_env_file(path: Path) -> Dict[str, str]:
     return values
 
 
+@dataclass(frozen=True)
+class RateLimit:
+    """Allow ``requests`` per ``per_seconds`` (and bursts of that size).
+
+    ``route`` is ``"METHOD /template"`` as registered with the router, or
+    ``"*"`` for every route. ``scope`` picks the bucket key: the client IP or
+    the user the request acts for.
+    """
+
+    route: str
+    scope: str
+    requests: int
+    per_seconds: float
+
+
+RATE_LIMIT_SCOPES = ("ip", "user")
+
+# Logins cost a full PBKDF2 hash each, so throttle them per client and per
+# account; signups hash too.
+DEFAULT_RATE_LIMITS: Tuple[RateLimit, ...] = (
+    RateLimit("POST /auth/login", "ip", 10, 60.0),
+    RateLimit("POST /auth/login", "user", 5, 60.0),
+    RateLimit("POST /auth/signup", "ip", 10, 60.0),
+)
+
+
+def parse_rate_limits(spec: str) -> Tuple[RateLimit, ...]:
+    """Parse ``RATE_LIMITS``: comma-separated ``ROUTE|SCOPE=COUNT/SECONDS``.
+
+    Example: ``POST /auth/login|ip=10/60,*|ip=100/1``. An empty string
+    disables rate limiting.
+    """
+
+    limits = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            target, budget = entry.rsplit("=", 1)
+            route, scope = target.rsplit("|", 1)
+            count, seconds = budget.split("/", 1)
+            limit = RateLimit(route.strip(), scope.strip(), int(count), float(seconds))
+        except ValueError as exc:
+            raise ValueError(f"invalid RATE_LIMITS entry {entry!r}") from exc
+        if limit.scope not in RATE_LIMIT_SCOPES or limit.requests < 1 or limit.per_seconds <= 0:
+            raise ValueError(f"invalid RATE_LIMITS entry {entry!r}")
+        limits.append(limit)
+    return tuple(limits)
+
+
 @dataclass(frozen=True)
 class Settings:
     env: str
@@ -50,6 +98,27 @@ class Settings:
     allow_test_mode: bool
     recommendations_per_user: int
     port: int
+    db_pool_size: int = 16
+    db_busy_timeout_ms: int = 5000
+    max_page_size: int = 500
+    catalog_cache_size: int = 1024
+    catalog_cache_ttl_seconds: float = 30.0
+    stream_threshold_rows: int = 1000
+    gzip_level: int = 6
+    gzip_min_bytes: int = 1024
+    rate_limits: Tuple[RateLimit, ...] = DEFAULT_RATE_LIMITS
+    rate_limit_buckets: int = 10_000
+    require_auth: bool = False
+    auth_cache_size: int = 4096
+    password_iterations: int = 120_000
+    password_hash_workers: int = 2
+    password_hash_queue: int = 2
+    server_mode: str = "threaded"
+    server_processes: int = 1
+    http_workers: int = 16
+    http_keepalive_timeout_seconds: float = 5.0
+    http_keepalive_max_requests: int = 100
+    http_shutdown_grace_seconds: float = 10.0
 
     @property
     def sqlite_path(self) -> Path:
@@ -65,12 +134,29 @@ def _apply_overrides(base: Dict[str, str], overrides: Iterable[Dict[str, str]])
     return merged
 
 
+def _password_hashing(values: Dict[str, str]) -> Tuple[int, int]:
+    """Hashing workers and queue, together capped at half of ``HTTP_WORKERS``.
+
+    Each admitted signup/login blocks an HTTP worker until its hash is done,
+    so more hashing threads or a larger queue would let a login burst starve
+    every other route before any request is turned away with 503. At least
+    one hashing thread is kept.
+    """
+
+    http_workers = int(values.get("HTTP_WORKERS", "16"))
+    budget = http_workers // 2
+    workers = max(1, min(int(values.get("PASSWORD_HASH_WORKERS", "2")), budget))
+    queue = int(values.get("PASSWORD_HASH_QUEUE", "2"))
+    return workers, max(0, min(queue, budget - workers))
+
+
 def load_settings(env_file: str | None = None) -> Settings:
     """Load Settings from the environment or an optional .env file."""
 
     cwd_env = Path(env_file) if env_file else Path(".env")
     file_values = load_env_file(cwd_env)
     values = _apply_overrides(file_values, [os.environ])
+    hash_workers, hash_queue = _password_hashing(values)
     return Settings(
         env=values.get("APP_ENV", "local"),
         database_url=values.get("DATABASE_URL", "sqlite:///./data/ecommerce.db"),
@@ -80,4 +166,30 @@ def load_settings(env_file: str | None = None) -> Settings:
         allow_test_mode=values.get("ALLOW_TEST_MODE", "false").lower() == "true",
         recommendations_per_user=int(values.get("RECOMMENDATIONS_PER_USER", "3")),
         port=int(values.get("PORT", "8000")),
+        # One connection per HTTP worker so workers never wait on the pool.
+        db_pool_size=int(values.get("DB_POOL_SIZE", values.get("HTTP_WORKERS", "16"))),
+        db_busy_timeout_ms=int(values.get("DB_BUSY_TIMEOUT_MS", "5000")),
+        max_page_size=int(values.get("MAX_PAGE_SIZE", "500")),
+        catalog_cache_size=int(values.get("CATALOG_CACHE_SIZE", "1024")),
+        catalog_cache_ttl_seconds=float(values.get("CATALOG_CACHE_TTL_SECONDS", "30")),
+        stream_threshold_rows=int(values.get("STREAM_THRESHOLD_ROWS", "1000")),
+        gzip_level=int(values.get("GZIP_LEVEL", "6")),
+        gzip_min_bytes=int(values.get("GZIP_MIN_BYTES", "1024")),
+        rate_limits=(
+            parse_rate_limits(values["RATE_LIMITS"])
+            if "RATE_LIMITS" in values
+            else DEFAULT_RATE_LIMITS
+        ),
+        rate_limit_buckets=int(values.get("RATE_LIMIT_BUCKETS", "10000")),
+        require_auth=values.get("REQUIRE_AUTH", "false").lower() == "true",
+        auth_cache_size=int(values.get("AUTH_CACHE_SIZE", "4096")),
+        password_iterations=int(values.get("PASSWORD_ITERATIONS", "120000")),
+        password_hash_workers=hash_workers,
+        password_hash_queue=hash_queue,
+        server_mode=values.get("SERVER_MODE", "threaded"),
+        server_processes=int(values.get("SERVER_PROCESSES", "1")),
+        http_workers=int(values.get("HTTP_WORKERS", "16")),
+        http_keepalive_timeout_seconds=float(values.get("HTTP_KEEPALIVE_TIMEOUT_SECONDS", "5")),
+        http_keepalive_max_requests=int(values.get("HTTP_KEEPALIVE_MAX_REQUESTS", "100")),
+        http_shutdown_grace_seconds=float(values.get("HTTP_SHUTDOWN_GRACE_SECONDS", "10")),
     )
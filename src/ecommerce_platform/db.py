@@ -3,38 +3,333 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterator, Sequence
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 
 from .config import Settings
 
-SCHEMA_VERSION = 1
+BASE_SCHEMA_VERSION = 1
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_ACQUIRE_TIMEOUT_SECONDS = 10.0
+HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+CACHE_SIZE_KIB = 16_384
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def _configure_connection(conn: sqlite3.Connection, busy_timeout_ms: int) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived, pre-configured SQLite connections.
+
+    A connection is checked out by one thread at a time. While a thread holds
+    a connection, nested checkouts on that thread return the same connection,
+    so service code can compose several repository calls in one transaction.
+    Idle connections are pinged before reuse once they have been idle longer
+    than ``health_check_interval`` and replaced if the ping fails.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], sqlite3.Connection],
+        max_size: int = DEFAULT_POOL_SIZE,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT_SECONDS,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("pool size must be at least 1")
+        self._factory = factory
+        self.max_size = max_size
+        self._acquire_timeout = acquire_timeout
+        self._health_check_interval = health_check_interval
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or checked out."""
+
+        with self._cond:
+            return self._created
+
+    @property
+    def idle(self) -> int:
+        with self._cond:
+            return len(self._idle)
+
+    def current(self) -> Optional[sqlite3.Connection]:
+        """Return the connection held by the calling thread, if any."""
+
+        return getattr(self._local, "conn", None)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = self.current()
+        if held is not None:
+            yield held
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close(self) -> None:
+        """Close idle connections and refuse further checkouts.
+
+        Connections still checked out are closed when they are released.
+        """
+
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def _acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self._acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    conn, released_at = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"no database connection available after {self._acquire_timeout}s"
+                    )
+                self._cond.wait(remaining)
+        if conn is not None and time.monotonic() - released_at > self._health_check_interval:
+            if not self._is_healthy(conn):
+                conn = None
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+            self._created -= 1
+        conn.close()
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return False
+        return True
 
 
 @dataclass
 class Database:
     path: Path
+    pool_size: int = DEFAULT_POOL_SIZE
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS
+    pool: ConnectionPool = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.pool = ConnectionPool(self.connect, max_size=self.pool_size)
 
     def connect(self) -> sqlite3.Connection:
+        """Open a new configured connection; prefer ``db_session`` for queries."""
+
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        connection = sqlite3.connect(self.path)
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
         connection.row_factory = sqlite3.Row
+        _configure_connection(connection, self.busy_timeout_ms)
         return connection
 
+    def close(self) -> None:
+        self.pool.close()
+
+
+def is_lock_error(exc: sqlite3.Error) -> bool:
+    """Whether ``exc`` means the database stayed locked past ``busy_timeout``."""
+
+    code = getattr(exc, "sqlite_errorcode", None)
+    return code is not None and code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
 
 @contextmanager
-def db_session(db: Database) -> Iterator[sqlite3.Connection]:
-    conn = db.connect()
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+def db_session(db: Database, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """Run a unit of work on a pooled connection.
+
+    The outermost session on a thread owns the transaction and commits or
+    rolls back; nested sessions share it. ``immediate`` takes the write lock
+    up front (``BEGIN IMMEDIATE``) so reads made inside the session cannot be
+    invalidated by a concurrent writer before the session's own writes.
+    """
+
+    held = db.pool.current()
+    if held is not None:
+        yield held
+        return
+    with db.pool.connection() as conn:
+        try:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: Sequence[str]
+
+
+# Ordered schema changes applied on top of the base tables created by
+# ``init_db``. Statements must be idempotent so a partially upgraded file can be
+# migrated again. Never edit a shipped migration; append a new one instead.
+MIGRATIONS: Sequence[Migration] = (
+    Migration(
+        version=2,
+        description="index orders by user and recency",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at)",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="index order items by order",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id)",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="index catalog and user listings by recency",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_products_category_created ON products (category, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_products_created ON products (created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="extend listing indexes with id for keyset pagination",
+        statements=(
+            "DROP INDEX IF EXISTS idx_orders_user_created",
+            "DROP INDEX IF EXISTS idx_products_category_created",
+            "DROP INDEX IF EXISTS idx_products_created",
+            "DROP INDEX IF EXISTS idx_users_created",
+            "CREATE INDEX IF NOT EXISTS idx_orders_user_created_id ON orders (user_id, created_at, id)",
+            "CREATE INDEX IF NOT EXISTS idx_products_category_created_id"
+            " ON products (category, created_at, id)",
+            "CREATE INDEX IF NOT EXISTS idx_products_created_id ON products (created_at, id)",
+            "CREATE INDEX IF NOT EXISTS idx_users_created_id ON users (created_at, id)",
+        ),
+    ),
+    Migration(
+        version=6,
+        description="maintain per-user category affinity for recommendations",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS user_category_affinity (
+                user_id TEXT NOT NULL,
+                category TEXT NOT NULL,
+                item_count INTEGER NOT NULL,
+                last_order_at TEXT NOT NULL,
+                last_order_id TEXT NOT NULL,
+                last_position INTEGER NOT NULL,
+                PRIMARY KEY (user_id, category)
+            ) WITHOUT ROWID
+            """.strip(),
+            # Backfill from existing orders. The "last_*" columns record the
+            # category's first line in the user's newest order containing it,
+            # which is the tie-break the order-walking algorithm used.
+            """
+            INSERT OR REPLACE INTO user_category_affinity
+                (user_id, category, item_count, last_order_at, last_order_id, last_position)
+            SELECT user_id, category, item_count, created_at, order_id, position
+            FROM (
+                SELECT
+                    o.user_id AS user_id,
+                    p.category AS category,
+                    o.created_at AS created_at,
+                    o.id AS order_id,
+                    oi.rowid AS position,
+                    COUNT(*) OVER (PARTITION BY o.user_id, p.category) AS item_count,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY o.user_id, p.category
+                        ORDER BY o.created_at DESC, o.id DESC, oi.rowid ASC
+                    ) AS rank
+                FROM order_items oi
+                JOIN orders o ON o.id = oi.order_id
+                JOIN products p ON p.id = oi.product_id
+            )
+            WHERE rank = 1
+            """.strip(),
+        ),
+    ),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1].version if MIGRATIONS else BASE_SCHEMA_VERSION
 
 
 def _execute_batch(conn: sqlite3.Connection, statements: Sequence[str]) -> None:
@@ -43,65 +338,122 @@ def _execute_batch(conn: sqlite3.Connection, statements: Sequence[str]) -> None:
         cursor.execute(statement)
 
 
+def current_schema_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT version FROM schema_version WHERE id = 1").fetchone()
+    return int(row[0]) if row else 0
+
+
+def migrate(db: Database, migrations: Sequence[Migration] = MIGRATIONS) -> int:
+    """Apply pending migrations in version order and return the new version.
+
+    All pending migrations run in one ``BEGIN IMMEDIATE`` transaction, so
+    concurrent processes starting up serialize here and a failure leaves the
+    schema at its previous version.
+    """
+
+    target = migrations[-1].version if migrations else BASE_SCHEMA_VERSION
+    with db_session(db) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        version = current_schema_version(conn)
+        if version > target:
+            raise RuntimeError(
+                f"database schema version {version} is newer than supported version {target}"
+            )
+        for migration in sorted(migrations, key=lambda item: item.version):
+            if migration.version <= version:
+                continue
+            _execute_batch(conn, migration.statements)
+            conn.execute(
+                "UPDATE schema_version SET version = ? WHERE id = 1",
+                (migration.version,),
+            )
+            version = migration.version
+    return version
+
+
+# Tables created before any migration runs (schema version 1).
+_BASE_TABLES: Sequence[str] = (
+    """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    """.strip(),
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        email TEXT NOT NULL UNIQUE,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        password_salt TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    """.strip(),
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        price_cents INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    """.strip(),
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        total_cents INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    """.strip(),
+    """
+    CREATE TABLE IF NOT EXISTS order_items (
+        id TEXT PRIMARY KEY,
+        order_id TEXT NOT NULL,
+        product_id TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        price_cents INTEGER NOT NULL,
+        FOREIGN KEY(order_id) REFERENCES orders(id),
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    );
+    """.strip(),
+)
+
+
 def init_db(settings: Settings) -> Database:
-    db = Database(settings.sqlite_path)
+    """Open the database, creating and migrating its schema when needed.
+
+    A database already at ``SCHEMA_VERSION`` costs one read of
+    ``schema_version``: no DDL runs and no write lock is taken, which keeps
+    cold starts of the server, CLI and Lambda handlers cheap.
+    """
+
+    db = Database(
+        settings.sqlite_path,
+        pool_size=settings.db_pool_size,
+        busy_timeout_ms=settings.db_busy_timeout_ms,
+    )
+    if _stored_schema_version(db) == SCHEMA_VERSION:
+        return db
     with db_session(db) as conn:
-        _execute_batch(
-            conn,
-            [
-                """
-                CREATE TABLE IF NOT EXISTS schema_version (
-                    id INTEGER PRIMARY KEY CHECK (id = 1),
-                    version INTEGER NOT NULL
-                );
-                """.strip(),
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    id TEXT PRIMARY KEY,
-                    email TEXT NOT NULL UNIQUE,
-                    username TEXT NOT NULL UNIQUE,
-                    password_hash TEXT NOT NULL,
-                    password_salt TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                );
-                """.strip(),
-                """
-                CREATE TABLE IF NOT EXISTS products (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    price_cents INTEGER NOT NULL,
-                    currency TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                );
-                """.strip(),
-                """
-                CREATE TABLE IF NOT EXISTS orders (
-                    id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    total_cents INTEGER NOT NULL,
-                    currency TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY(user_id) REFERENCES users(id)
-                );
-                """.strip(),
-                """
-                CREATE TABLE IF NOT EXISTS order_items (
-                    id TEXT PRIMARY KEY,
-                    order_id TEXT NOT NULL,
-                    product_id TEXT NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    price_cents INTEGER NOT NULL,
-                    FOREIGN KEY(order_id) REFERENCES orders(id),
-                    FOREIGN KEY(product_id) REFERENCES products(id)
-                );
-                """.strip(),
-            ],
-        )
+        _execute_batch(conn, _BASE_TABLES)
         conn.execute(
             "INSERT OR IGNORE INTO schema_version (id, version) VALUES (1, ?)",
-            (SCHEMA_VERSION,),
+            (BASE_SCHEMA_VERSION,),
         )
+    migrate(db)
     return db
+
+
+def _stored_schema_version(db: Database) -> Optional[int]:
+    try:
+        with db_session(db) as conn:
+            return current_schema_version(conn)
+    except sqlite3.OperationalError:
+        # No schema_version table yet: a new database file.
+        return None
@@ -0,0 +1,89 @@
+"""API Gateway (REST, Lambda proxy integration) adapter for ``EcommerceAPI``.
+
+Every Lambda entry point hands its event to ``handle_event``, which turns it
+into one ``EcommerceAPI.handle`` call, so Lambda and the HTTP servers share
+routing, validation, serialization and error handling. The API and its
+database pool come from ``lambda_runtime`` and are built on the first
+invocation; importing this module only loads the standard library.
+
+Compression is left to API Gateway (``minimum-compression-size`` in
+``api_gateway/api.yaml``), and streamed listings are buffered because a
+proxy response carries a single body.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+
+def handle_event(event: Mapping[str, Any], context: Any = None) -> Dict[str, Any]:
+    """Lambda handler for API Gateway proxy events."""
+
+    from .lambda_runtime import get_api
+
+    headers = dict(event.get("headers") or {})
+    for name in [key for key in headers if key.lower() == "accept-encoding"]:
+        del headers[name]
+    identity = (event.get("requestContext") or {}).get("identity") or {}
+    try:
+        response = get_api().handle(
+            event["httpMethod"],
+            _target(event),
+            _body(event),
+            headers,
+            client_ip=identity.get("sourceIp"),
+        ).buffered()
+    except Exception:
+        # Same contract as the HTTP servers: log it and answer 500.
+        import traceback
+
+        traceback.print_exc()
+        return {"statusCode": 500, "headers": {}, "body": "", "isBase64Encoded": False}
+    return {
+        "statusCode": response.status_code,
+        "headers": response.headers,
+        "body": response.body.decode("utf-8"),
+        "isBase64Encoded": False,
+    }
+
+
+def proxy_event(
+    method: str,
+    path: str,
+    body: Any = None,
+    query: Optional[Mapping[str, str]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    source_ip: str = "127.0.0.1",
+) -> Dict[str, Any]:
+    """Build a minimal proxy event for local invocations and tests.
+
+    ``body`` is JSON-encoded unless it is already a string.
+    """
+
+    if body is not None and not isinstance(body, str):
+        body = json.dumps(body)
+    return {
+        "httpMethod": method,
+        "path": path,
+        "queryStringParameters": dict(query) if query else None,
+        "headers": dict(headers or {}),
+        "body": body,
+        "isBase64Encoded": False,
+        "requestContext": {"identity": {"sourceIp": source_ip}},
+    }
+
+
+def _target(event: Mapping[str, Any]) -> str:
+    path = event.get("path") or "/"
+    query = event.get("queryStringParameters")
+    return f"{path}?{urlencode(query)}" if query else path
+
+
+def _body(event: Mapping[str, Any]) -> Optional[str]:
+    body = event.get("body")
+    if body is None or not event.get("isBase64Encoded"):
+        return body
+    return base64.b64decode(body).decode("utf-8")
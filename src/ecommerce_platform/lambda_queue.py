@@ -0,0 +1,113 @@
+"""SQS adapter for batched order ingestion.
+
+``handle_order_batch`` receives an SQS batch whose message bodies use the
+``POST /orders`` payload (``{"user_id": ..., "items": [...]}``) and stores
+the whole batch with one ``EcommerceService.create_orders`` call: one price
+lookup for every product in the batch and grouped write transactions instead
+of a transaction per message.
+
+Messages that cannot be parsed or stored are returned as
+``batchItemFailures`` (the function's event source mapping needs
+``ReportBatchItemFailures``), so SQS deletes the rest of the batch and only
+redelivers those. Each order id is derived from its ``messageId``, which SQS
+keeps across redeliveries, so a redelivered message does not create a second
+order.
+
+Like ``lambda_proxy``, importing this module only loads the standard library.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional
+from uuid import UUID, uuid4, uuid5
+
+if TYPE_CHECKING:
+    from .services import OrderRequest
+
+# Namespace for order ids derived from SQS message ids.
+ORDER_ID_NAMESPACE = UUID("6f1c2b0e-4f7a-5d8e-9b3c-1a2d3e4f5a6b")
+
+
+def handle_order_batch(event: Mapping[str, Any], context: Any = None) -> Dict[str, Any]:
+    """Lambda handler for SQS order events."""
+
+    from .lambda_runtime import get_service
+
+    failures: List[str] = []
+    message_ids: List[str] = []
+    requests: List["OrderRequest"] = []
+    for record in event.get("Records") or []:
+        message_id = record["messageId"]
+        try:
+            requests.append(parse_order_message(record))
+        except (KeyError, TypeError, ValueError) as exc:
+            print(f"rejecting message {message_id}: {exc!r}", file=sys.stderr)
+            failures.append(message_id)
+            continue
+        message_ids.append(message_id)
+    if requests:
+        try:
+            errors = get_service().create_orders(requests)
+        except Exception:
+            # Nothing is known to be stored; let SQS redeliver the batch.
+            import traceback
+
+            traceback.print_exc()
+            failures.extend(message_ids)
+        else:
+            for message_id, error in zip(message_ids, errors):
+                if error is not None:
+                    print(f"rejecting message {message_id}: {error}", file=sys.stderr)
+                    failures.append(message_id)
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]}
+
+
+def parse_order_message(record: Mapping[str, Any]) -> "OrderRequest":
+    """Turn one SQS record into an ``OrderRequest``.
+
+    Raises ``KeyError``, ``TypeError`` or ``ValueError`` for a malformed body.
+    """
+
+    from .services import OrderRequest
+
+    payload = json.loads(record["body"])
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be a JSON object")
+    order_id = payload.get("order_id")
+    return OrderRequest(
+        user_id=UUID(payload["user_id"]),
+        items=[(UUID(item["product_id"]), int(item["quantity"])) for item in payload["items"]],
+        order_id=UUID(order_id) if order_id else uuid5(ORDER_ID_NAMESPACE, record["messageId"]),
+    )
+
+
+def sqs_event(
+    bodies: Iterable[Any],
+    message_ids: Optional[Iterable[str]] = None,
+    queue_arn: str = "arn:aws:sqs:us-east-1:000000000000:orders",
+) -> Dict[str, Any]:
+    """Build a minimal SQS event for local invocations and tests.
+
+    Each body is JSON-encoded unless it is already a string. Message ids are
+    random unless given, e.g. to simulate a redelivery.
+    """
+
+    ids = iter(message_ids) if message_ids is not None else None
+    records = []
+    for body in bodies:
+        message_id = next(ids) if ids is not None else str(uuid4())
+        records.append(
+            {
+                "messageId": message_id,
+                "receiptHandle": f"receipt-{message_id}",
+                "body": body if isinstance(body, str) else json.dumps(body),
+                "attributes": {"ApproximateReceiveCount": "1"},
+                "messageAttributes": {},
+                "eventSource": "aws:sqs",
+                "eventSourceARN": queue_arn,
+                "awsRegion": queue_arn.split(":")[3],
+            }
+        )
+    return {"Records": records}
@@ -0,0 +1,102 @@
+"""Per-container state shared by the Lambda entry points.
+
+A Lambda container serves many invocations in one process. Building the
+settings, database pool and API on every call re-reads ``.env``, re-runs
+``init_db`` and throws away the pooled connection each time. ``get_api``
+builds them on the first (cold) invocation and hands the same objects to every
+later (warm) one.
+
+Configuration is re-checked cheaply on each call: a fingerprint of the
+process environment and the ``.env`` file's mtime and size. Only when it
+changes are settings reloaded, and the API is rebuilt only if the reloaded
+settings differ.
+
+The API module is imported on the first call rather than at import time, so
+loading an entry point stays cheap. The deferral is not per route: the first
+call imports all of ``api`` whichever route it is for.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Hashable, Optional
+
+from .config import Settings, load_settings
+
+if TYPE_CHECKING:
+    from .api import EcommerceAPI
+    from .services import EcommerceService
+
+
+@dataclass
+class Runtime:
+    settings: Settings
+    api: "EcommerceAPI"
+    fingerprint: Hashable
+
+    @property
+    def service(self) -> "EcommerceService":
+        return self.api.service
+
+    def close(self) -> None:
+        self.api.close()
+
+
+_lock = threading.Lock()
+_runtime: Optional[Runtime] = None
+
+
+def get_runtime(env_file: Optional[str] = None) -> Runtime:
+    """Return this container's runtime, building or refreshing it if needed."""
+
+    global _runtime
+    fingerprint = _config_fingerprint(env_file)
+    runtime = _runtime
+    if runtime is not None and runtime.fingerprint == fingerprint:
+        return runtime
+    with _lock:
+        runtime = _runtime
+        if runtime is not None and runtime.fingerprint == fingerprint:
+            return runtime
+        settings = load_settings(env_file)
+        if runtime is not None and runtime.settings == settings:
+            runtime.fingerprint = fingerprint
+            return runtime
+        from .api import EcommerceAPI
+
+        fresh = Runtime(settings=settings, api=EcommerceAPI(settings), fingerprint=fingerprint)
+        _runtime = fresh
+    if runtime is not None:
+        runtime.close()
+    return fresh
+
+
+def get_api(env_file: Optional[str] = None) -> "EcommerceAPI":
+    return get_runtime(env_file).api
+
+
+def get_service(env_file: Optional[str] = None) -> "EcommerceService":
+    return get_runtime(env_file).service
+
+
+def reset() -> None:
+    """Drop the cached runtime so the next call starts cold."""
+
+    global _runtime
+    with _lock:
+        runtime, _runtime = _runtime, None
+    if runtime is not None:
+        runtime.close()
+
+
+def _config_fingerprint(env_file: Optional[str]) -> Hashable:
+    path = Path(env_file) if env_file else Path(".env")
+    try:
+        stat = path.stat()
+        file_state: Hashable = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_state = (os.path.abspath(path), None)
+    return file_state, hash(frozenset(os.environ.items()))
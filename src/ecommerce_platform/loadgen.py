@@ -0,0 +1,427 @@
+"""HTTP load generator behind ``cli bench-http``.
+
+Seeds users and products through the public API, then drives a weighted mix
+of signup, login, product listing, order creation and recommendation calls
+from concurrent keep-alive clients and reports throughput plus p50/p95/p99
+latency per route. Only the standard library is used, so the numbers measure
+the server rather than a client framework.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from .config import Settings
+
+# Operation name -> route template it exercises.
+ROUTES: Dict[str, str] = {
+    "signup": "POST /auth/signup",
+    "login": "POST /auth/login",
+    "products": "GET /products",
+    "orders": "POST /orders",
+    "recommendations": "GET /recommendations/{user_id}",
+}
+# Read-heavy storefront traffic; signup and login are rare but expensive.
+DEFAULT_MIX: Dict[str, int] = {
+    "signup": 5,
+    "login": 10,
+    "products": 45,
+    "orders": 25,
+    "recommendations": 15,
+}
+PERCENTILES = (50, 95, 99)
+PASSWORD = "bench-password"
+CATEGORIES = ("outdoor", "footwear", "kitchen", "books", "garden")
+PAGE_SIZE = 20
+# Longest total wait seeding accepts from a rate-limited target.
+SEED_MAX_THROTTLE_SECONDS = 300.0
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@dataclass(frozen=True)
+class BenchUser:
+    user_id: str
+    username: str
+    token: str
+
+
+@dataclass(frozen=True)
+class Dataset:
+    prefix: str
+    users: List[BenchUser]
+    product_ids: List[str]
+    # Seconds seeding spent waiting out 429 responses.
+    throttled_seconds: float = 0.0
+
+
+# (route, latency in seconds, HTTP status or 0 for a transport error)
+Sample = Tuple[str, float, int]
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse ``name=weight`` pairs, e.g. ``products=60,orders=40``.
+
+    Operations left out get weight 0.
+    """
+
+    mix = dict.fromkeys(ROUTES, 0)
+    for part in spec.split(","):
+        name, sep, weight = part.strip().partition("=")
+        if not sep or name not in ROUTES:
+            raise ValueError(
+                f"invalid mix entry {part.strip()!r}; use one of {', '.join(ROUTES)}"
+            )
+        try:
+            mix[name] = int(weight)
+        except ValueError as exc:
+            raise ValueError(f"invalid weight for {name}: {weight!r}") from exc
+        if mix[name] < 0:
+            raise ValueError(f"weight for {name} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("mix needs at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@contextmanager
+def local_server(settings: Settings) -> Iterator[str]:
+    """Serve ``settings`` in-process on a free port against a throwaway database.
+
+    Rate limits are off: every client shares 127.0.0.1 and would exhaust the
+    per-IP login and signup budgets within seconds.
+    """
+
+    from .server import make_server
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        settings = replace(
+            settings,
+            database_url=f"sqlite:///{Path(tmpdir) / 'bench.db'}",
+            port=0,
+            rate_limits=(),
+        )
+        server = make_server(settings)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+
+
+def run_benchmark(
+    base_url: str,
+    clients: int,
+    requests: int,
+    mix: Mapping[str, int] = DEFAULT_MIX,
+    users: int = 20,
+    products: int = 50,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Seed ``base_url``, send ``requests`` calls from ``clients`` threads, return the report."""
+
+    if clients < 1 or requests < 1 or users < 1 or products < 1:
+        raise ValueError("clients, requests, users and products must be at least 1")
+    dataset = seed_dataset(base_url, users, products)
+    names = [name for name in ROUTES if mix.get(name, 0) > 0]
+    weights = [mix[name] for name in names]
+    results: List[List[Sample]] = [[] for _ in range(clients)]
+    start = threading.Barrier(clients + 1)
+    threads = [
+        threading.Thread(
+            target=_client,
+            args=(
+                base_url,
+                dataset,
+                names,
+                weights,
+                requests // clients + (1 if index < requests % clients else 0),
+                random.Random(seed * 1_000_003 + index),
+                f"{dataset.prefix}c{index}",
+                start,
+                results[index],
+            ),
+            daemon=True,
+        )
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    samples = [sample for client_samples in results for sample in client_samples]
+    return build_report(
+        samples, elapsed, clients, dict(mix), seed, dataset.throttled_seconds
+    )
+
+
+def seed_dataset(
+    base_url: str,
+    users: int,
+    products: int,
+    max_throttle_seconds: float = SEED_MAX_THROTTLE_SECONDS,
+) -> Dataset:
+    """Create products and users (with login tokens) under a fresh name prefix.
+
+    A target with rate limits on answers the signups and logins with 429;
+    seeding then waits for ``Retry-After`` and says so on stderr, giving up
+    once the waits add up to ``max_throttle_seconds``.
+    """
+
+    prefix = f"bench{uuid4().hex[:8]}"
+    client = _SeedClient(base_url, max_throttle_seconds)
+    try:
+        product_ids = [
+            client.call(
+                "POST",
+                "/products",
+                {
+                    "name": f"{prefix} item {index}",
+                    "description": "Load test product",
+                    "category": CATEGORIES[index % len(CATEGORIES)],
+                    "price_cents": 500 + 25 * index,
+                },
+            )["id"]
+            for index in range(products)
+        ]
+        seeded: List[BenchUser] = []
+        for index in range(users):
+            username = f"{prefix}u{index}"
+            credentials = {"username": username, "password": PASSWORD}
+            client.call(
+                "POST",
+                "/auth/signup",
+                {**credentials, "email": f"{username}@bench.example.com"},
+            )
+            login = client.call("POST", "/auth/login", credentials)
+            seeded.append(BenchUser(login["user_id"], username, login["token"]))
+    finally:
+        client.close()
+    return Dataset(
+        prefix=prefix,
+        users=seeded,
+        product_ids=product_ids,
+        throttled_seconds=client.throttled_seconds,
+    )
+
+
+def build_report(
+    samples: List[Sample],
+    elapsed: float,
+    clients: int,
+    mix: Dict[str, int],
+    seed: int,
+    seed_throttled_seconds: float = 0.0,
+) -> Dict[str, Any]:
+    elapsed = max(elapsed, 1e-9)
+    by_route: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_route.setdefault(sample[0], []).append(sample)
+    routes = {
+        route: _summarize(by_route[route], elapsed)
+        for route in ROUTES.values()
+        if route in by_route
+    }
+    overall = _summarize(samples, elapsed)
+    return {
+        "clients": clients,
+        "seed": seed,
+        "mix": mix,
+        "duration_s": round(elapsed, 3),
+        "seed_throttled_s": round(seed_throttled_seconds, 3),
+        **overall,
+        "routes": routes,
+    }
+
+
+def format_report(report: Mapping[str, Any]) -> str:
+    lines = [
+        f"{report['requests']} requests from {report['clients']} clients"
+        f" in {report['duration_s']:.2f}s: {report['rps']:,.1f} req/s,"
+        f" {report['errors']} errors",
+        "",
+        f"{'route':<32} {'count':>7} {'errors':>7} {'req/s':>9}"
+        + "".join(f" {f'p{pct} ms':>9}" for pct in PERCENTILES),
+    ]
+    rows = [*report["routes"].items(), ("all", report)]
+    for route, stats in rows:
+        lines.append(
+            f"{route:<32} {stats['requests']:>7} {stats['errors']:>7} {stats['rps']:>9.1f}"
+            + "".join(f" {stats[f'p{pct}_ms']:>9.2f}" for pct in PERCENTILES)
+        )
+    limited = report["statuses"].get("429", 0)
+    if limited or report.get("seed_throttled_s"):
+        lines.extend(
+            [
+                "",
+                f"rate limited: {limited} requests got 429; seeding waited"
+                f" {report.get('seed_throttled_s', 0):.1f}s. Start the target with"
+                " RATE_LIMITS= for unthrottled numbers.",
+            ]
+        )
+    return "\n".join(lines)
+
+
+def format_json(report: Mapping[str, Any]) -> str:
+    return json.dumps(report, indent=2, sort_keys=True)
+
+
+def _summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latency for _, latency, _ in samples)
+    statuses: Dict[str, int] = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status in samples if not 200 <= status < 400),
+        "rps": round(len(samples) / elapsed, 1),
+        "statuses": statuses,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 3)
+    summary["max_ms"] = round(latencies[-1] * 1000, 3) if latencies else 0.0
+    return summary
+
+
+def _client(
+    base_url: str,
+    dataset: Dataset,
+    names: List[str],
+    weights: List[int],
+    count: int,
+    rng: random.Random,
+    prefix: str,
+    start: threading.Barrier,
+    samples: List[Sample],
+) -> None:
+    connection = _connect(base_url)
+    start.wait()
+    try:
+        for index in range(count):
+            name = rng.choices(names, weights)[0]
+            method, path, body, headers = _build_call(name, dataset, rng, f"{prefix}n{index}")
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 0
+            samples.append((ROUTES[name], time.perf_counter() - started, status))
+    finally:
+        connection.close()
+
+
+def _build_call(
+    name: str, dataset: Dataset, rng: random.Random, unique: str
+) -> Tuple[str, str, Optional[bytes], Dict[str, str]]:
+    user = rng.choice(dataset.users)
+    auth = {"Authorization": f"Bearer {user.token}"}
+    if name == "signup":
+        payload: Any = {
+            "username": unique,
+            "email": f"{unique}@bench.example.com",
+            "password": PASSWORD,
+        }
+        return "POST", "/auth/signup", _json_body(payload), _JSON_HEADERS
+    if name == "login":
+        payload = {"username": user.username, "password": PASSWORD}
+        return "POST", "/auth/login", _json_body(payload), _JSON_HEADERS
+    if name == "products":
+        return "GET", f"/products?limit={PAGE_SIZE}", None, {}
+    if name == "orders":
+        lines = rng.sample(dataset.product_ids, min(len(dataset.product_ids), rng.randint(1, 3)))
+        payload = {
+            "user_id": user.user_id,
+            "items": [
+                {"product_id": product_id, "quantity": rng.randint(1, 3)} for product_id in lines
+            ],
+        }
+        return "POST", "/orders", _json_body(payload), {**_JSON_HEADERS, **auth}
+    return "GET", f"/recommendations/{user.user_id}", None, auth
+
+
+def _json_body(payload: Any) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+
+def _connect(base_url: str) -> http.client.HTTPConnection:
+    parts = urlsplit(base_url)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError(f"expected an http:// URL, got {base_url!r}")
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+
+
+class _SeedClient:
+    """Keep-alive connection for seeding that waits out 429 responses."""
+
+    def __init__(self, base_url: str, max_throttle_seconds: float) -> None:
+        self._connection = _connect(base_url)
+        self._max_throttle_seconds = max_throttle_seconds
+        self.throttled_seconds = 0.0
+
+    def call(self, method: str, path: str, payload: Any) -> Dict[str, Any]:
+        while True:
+            self._connection.request(
+                method, path, body=_json_body(payload), headers=_JSON_HEADERS
+            )
+            response = self._connection.getresponse()
+            body = response.read()
+            if response.status == 200:
+                return json.loads(body)
+            if response.status != 429:
+                raise RuntimeError(
+                    f"seeding {method} {path} failed with {response.status}: {body[:200]!r}"
+                )
+            wait = _retry_after(response.getheader("Retry-After"))
+            if self.throttled_seconds + wait > self._max_throttle_seconds:
+                raise RuntimeError(
+                    f"seeding {method} {path} is rate limited (429) and has waited"
+                    f" {self.throttled_seconds:.0f}s; start the target with RATE_LIMITS="
+                    " or seed fewer users"
+                )
+            print(
+                f"seeding throttled: {method} {path} got 429, retrying in {wait:.0f}s",
+                file=sys.stderr,
+                flush=True,
+            )
+            time.sleep(wait)
+            self.throttled_seconds += wait
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def _retry_after(value: Optional[str]) -> float:
+    try:
+        return max(1.0, float(value)) if value else 1.0
+    except ValueError:
+        return 1.0
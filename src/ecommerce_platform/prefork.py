@@ -0,0 +1,311 @@
+"""Pre-forking supervisor that runs one server per CPU core.
+
+Each worker process builds its own API, database pool and HTTP server and
+binds the listening port with ``SO_REUSEPORT``, so the kernel spreads new
+connections across workers and Python-level work is no longer serialized on
+a single GIL.
+
+The supervisor itself never serves requests. It reacts to signals:
+
+* ``SIGTERM`` / ``SIGINT``: stop all workers gracefully and exit. A stopping
+  worker stops accepting, lets in-flight requests finish and closes idle
+  connections (see ``EcommerceHTTPServer``); it is killed if it is still
+  running ``KILL_MARGIN_SECONDS`` after its drain deadline.
+* ``SIGHUP``: graceful restart. A new generation of workers starts first and
+  the old one is only asked to stop once every new worker reports that it is
+  listening, so the port is never left unserved.
+* A worker exiting on its own is treated as a crash and respawned, backing
+  off exponentially while workers keep dying right after start.
+
+POSIX only (``os.fork`` and ``SO_REUSEPORT``).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+from .config import Settings
+from .db import init_db
+
+# Time a stopping worker gets on top of HTTP_SHUTDOWN_GRACE_SECONDS (its own
+# drain deadline) to close the API and exit before it is killed.
+KILL_MARGIN_SECONDS = 5.0
+MIN_UPTIME_SECONDS = 1.0
+MAX_RESPAWN_DELAY_SECONDS = 30.0
+
+_HANDLED_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD)
+
+
+class PreforkSupervisor:
+    def __init__(
+        self,
+        settings: Settings,
+        processes: int,
+        grace_seconds: Optional[float] = None,
+    ) -> None:
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("prefork mode needs os.fork and SO_REUSEPORT")
+        self.settings = settings
+        self.processes = processes
+        if grace_seconds is None:
+            grace_seconds = settings.http_shutdown_grace_seconds + KILL_MARGIN_SECONDS
+        self.grace_seconds = grace_seconds
+        self._workers: Dict[int, float] = {}
+        self._retiring: Dict[int, float] = {}
+        # Graceful restart: old workers in ``_replaced`` keep serving until
+        # every new worker in ``_starting`` is ready.
+        self._starting: Set[int] = set()
+        self._replaced: List[int] = []
+        self._respawn_at: List[float] = []
+        self._respawn_delay = MIN_UPTIME_SECONDS
+        self._signals: List[int] = []
+        self._stopping = False
+        self._reserved: socket.socket | None = None
+        self._ready_read = -1
+        self._ready_write = -1
+
+    def run(self) -> int:
+        """Supervise workers until asked to stop; returns the exit status."""
+
+        # Migrate once up front so workers do not race on schema changes.
+        init_db(self.settings).close()
+        self.settings = self._reserve_port(self.settings)
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        self._ready_read, self._ready_write = os.pipe()
+        os.set_blocking(self._ready_read, False)
+        previous_wakeup = signal.set_wakeup_fd(wakeup_write)
+        previous = {signum: signal.signal(signum, self._on_signal) for signum in _HANDLED_SIGNALS}
+        try:
+            print(
+                f"Serving API on http://0.0.0.0:{self.settings.port} "
+                f"({self.processes} processes, {self.settings.server_mode} mode)",
+                flush=True,
+            )
+            for _ in range(self.processes):
+                self._spawn()
+            while self._workers or self._retiring or not self._stopping:
+                readable, _, _ = select.select(
+                    [wakeup_read, self._ready_read], [], [], self._next_timeout()
+                )
+                _drain(wakeup_read)
+                if self._ready_read in readable:
+                    self._read_ready()
+                self._handle_signals()
+                self._reap()
+                self._respawn_due()
+                self._kill_overdue()
+            return 0
+        finally:
+            signal.set_wakeup_fd(previous_wakeup)
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            for fd in (wakeup_read, wakeup_write, self._ready_read, self._ready_write):
+                os.close(fd)
+            if self._reserved is not None:
+                self._reserved.close()
+
+    @property
+    def pids(self) -> List[int]:
+        return sorted(self._workers)
+
+    def _reserve_port(self, settings: Settings) -> Settings:
+        # Hold the port for the supervisor's lifetime so workers respawned
+        # later still get the same one when PORT=0. A bound socket that never
+        # listens receives no connections.
+        reserved = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        reserved.bind(("0.0.0.0", int(settings.port)))
+        self._reserved = reserved
+        return dataclasses.replace(settings, port=reserved.getsockname()[1])
+
+    def _on_signal(self, signum: int, frame) -> None:
+        self._signals.append(signum)
+
+    def _handle_signals(self) -> None:
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                self._stop()
+            elif signum == signal.SIGHUP and not self._stopping:
+                self._restart()
+
+    def _stop(self) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        self._respawn_at.clear()
+        self._starting.clear()
+        self._replaced.clear()
+        for pid in list(self._workers):
+            self._retire(pid)
+
+    def _restart(self) -> None:
+        old = [pid for pid in self._workers if pid not in self._starting]
+        print(f"Restarting {len(old)} workers", flush=True)
+        self._replaced.extend(old)
+        for pid in self._starting:
+            self._retire(pid)
+        self._starting.clear()
+        for _ in range(self.processes):
+            self._spawn()
+
+    def _read_ready(self) -> None:
+        data = b""
+        try:
+            while True:
+                chunk = os.read(self._ready_read, 512)
+                if not chunk:
+                    break
+                data += chunk
+        except BlockingIOError:
+            pass
+        for line in data.split():
+            pid = int(line)
+            if pid not in self._workers:
+                continue
+            print(f"worker {pid} ready", flush=True)
+            self._starting.discard(pid)
+        if self._replaced and not self._starting:
+            for pid in self._replaced:
+                self._retire(pid)
+            self._replaced.clear()
+
+    def _spawn(self) -> None:
+        # Block signals across fork so the child never runs our handlers.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _HANDLED_SIGNALS)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(
+                    _worker_main(
+                        self.settings, self._reserved, self._ready_read, self._ready_write
+                    )
+                )
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _HANDLED_SIGNALS)
+        self._workers[pid] = time.monotonic()
+        if self._replaced:
+            self._starting.add(pid)
+        print(f"worker {pid} started", flush=True)
+
+    def _retire(self, pid: int) -> None:
+        self._workers.pop(pid, None)
+        self._retiring[pid] = time.monotonic() + self.grace_seconds
+        _kill(pid, signal.SIGTERM)
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self._retiring.pop(pid, None) is not None:
+                print(f"worker {pid} stopped", flush=True)
+                continue
+            started = self._workers.pop(pid, None)
+            self._starting.discard(pid)
+            if pid in self._replaced:
+                self._replaced.remove(pid)
+            if started is None or self._stopping:
+                continue
+            print(f"worker {pid} exited unexpectedly (status {status}); respawning", flush=True)
+            if time.monotonic() - started < MIN_UPTIME_SECONDS:
+                self._respawn_delay = min(self._respawn_delay * 2, MAX_RESPAWN_DELAY_SECONDS)
+                self._respawn_at.append(time.monotonic() + self._respawn_delay)
+            else:
+                self._respawn_delay = MIN_UPTIME_SECONDS
+                self._respawn_at.append(time.monotonic())
+
+    def _respawn_due(self) -> None:
+        now = time.monotonic()
+        due = [at for at in self._respawn_at if at <= now]
+        self._respawn_at = [at for at in self._respawn_at if at > now]
+        for _ in due:
+            self._spawn()
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in self._retiring.items():
+            if deadline <= now:
+                _kill(pid, signal.SIGKILL)
+                self._retiring[pid] = now + 1.0
+
+    def _next_timeout(self) -> float:
+        deadlines = self._respawn_at + list(self._retiring.values())
+        if not deadlines:
+            return 1.0
+        return min(max(min(deadlines) - time.monotonic(), 0.0), 1.0)
+
+
+def _worker_main(
+    settings: Settings,
+    reserved: socket.socket | None,
+    ready_read: int,
+    ready_write: int,
+) -> int:
+    """Entry point of a forked worker; returns its exit status."""
+
+    try:
+        signal.set_wakeup_fd(-1)
+        if reserved is not None:
+            reserved.close()
+        os.close(ready_read)
+        stop = threading.Event()
+        # Ctrl-C reaches the whole process group; let the supervisor decide.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _HANDLED_SIGNALS)
+
+        from .server import make_server
+
+        supervisor = os.getppid()
+        server = make_server(settings, reuse_port=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        os.write(ready_write, f"{os.getpid()}\n".encode())
+        os.close(ready_write)
+        # Also stop if the supervisor died without telling us (SIGKILL).
+        while not stop.is_set() and thread.is_alive() and os.getppid() == supervisor:
+            stop.wait(0.5)
+        server.shutdown()
+        server.server_close()
+        return 0 if stop.is_set() else 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+def _kill(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _drain(fd: int) -> None:
+    try:
+        while os.read(fd, 512):
+            pass
+    except BlockingIOError:
+        pass
@@ -0,0 +1,78 @@
+"""In-process token-bucket rate limiting."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by caller-chosen keys, refilled lazily.
+
+    A bucket stores only its token count and the time it was last touched;
+    refill is computed on access, so idle buckets cost nothing. At most
+    ``max_buckets`` are kept and the least recently used one is dropped to
+    make room, which at worst hands that key a fresh (full) bucket.
+    """
+
+    def __init__(
+        self,
+        max_buckets: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_buckets < 1:
+            raise ValueError("max_buckets must be at least 1")
+        self.max_buckets = max_buckets
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def acquire(self, key: Hashable, capacity: int, per_second: float) -> float:
+        """Take one token from ``key``'s bucket.
+
+        Returns 0.0 when the request may proceed, otherwise the number of
+        seconds until a token will be available.
+        """
+
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(capacity)
+            else:
+                tokens, updated = bucket
+                tokens = min(float(capacity), tokens + (now - updated) * per_second)
+                self._buckets.move_to_end(key)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                self.allowed += 1
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                wait = (1.0 - tokens) / per_second
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return wait
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "buckets": len(self._buckets),
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+            }
+
+
+def retry_after(wait_seconds: float) -> str:
+    """Format a wait as a ``Retry-After`` delay (whole seconds, at least 1)."""
+
+    return str(max(1, math.ceil(wait_seconds)))
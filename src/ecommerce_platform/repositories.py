@@ -2,13 +2,58 @@
 
 from __future__ import annotations
 
+import base64
+import binascii
+import threading
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, List, Optional
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Generator, Generic, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
 from uuid import UUID
 
+from .cache import TTLCache
 from .db import Database, db_session
 
+BULK_CHUNK_SIZE = 1000
+# Stays under SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds (999).
+IN_CLAUSE_CHUNK_SIZE = 500
+# Rows pulled per ``fetchmany`` when streaming a listing.
+STREAM_BATCH_SIZE = 500
+
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Keyset position in a ``(created_at, id)`` descending listing."""
+
+    created_at: datetime
+    id: UUID
+
+    @classmethod
+    def after(cls, record) -> "Cursor":
+        return cls(created_at=record.created_at, id=record.id)
+
+    def encode(self) -> str:
+        raw = f"{self.created_at.isoformat()}|{self.id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "Cursor":
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("utf-8")
+            created_at, record_id = raw.split("|", 1)
+            return cls(created_at=datetime.fromisoformat(created_at), id=UUID(record_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+            raise ValueError("invalid cursor") from exc
+
+
+@dataclass(frozen=True)
+class Page(Generic[_T]):
+    items: List[_T]
+    next_cursor: Optional[str]
+
 
 @dataclass(frozen=True)
 class UserRecord:
@@ -54,21 +99,30 @@ class UserRepository:
     def __init__(self, db: Database) -> None:
         self._db = db
 
+    _INSERT = """
+        INSERT INTO users (id, email, username, password_hash, password_salt, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
     def create(self, record: UserRecord) -> None:
+        with db_session(self._db) as conn:
+            conn.execute(self._INSERT, _user_params(record))
+
+    def create_many(
+        self,
+        records: Iterable[UserRecord],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Insert users with ``executemany``, committing once per chunk."""
+
+        return _insert_chunked(self._db, self._INSERT, records, _user_params, chunk_size, on_commit)
+
+    def update_password(self, user_id: UUID, password_hash: str, password_salt: str) -> None:
         with db_session(self._db) as conn:
             conn.execute(
-                """
-                INSERT INTO users (id, email, username, password_hash, password_salt, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    str(record.id),
-                    record.email,
-                    record.username,
-                    record.password_hash,
-                    record.password_salt,
-                    record.created_at.isoformat(),
-                ),
+                "UPDATE users SET password_hash = ?, password_salt = ? WHERE id = ?",
+                (password_hash, password_salt, str(user_id)),
             )
 
     def get_by_username(self, username: str) -> Optional[UserRecord]:
@@ -78,44 +132,102 @@ class UserRepository:
             ).fetchone()
         return _row_to_user(row) if row else None
 
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        with db_session(self._db) as conn:
+            row = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+        return _row_to_user(row) if row else None
+
     def get_by_id(self, user_id: UUID) -> Optional[UserRecord]:
         with db_session(self._db) as conn:
             row = conn.execute("SELECT * FROM users WHERE id = ?", (str(user_id),)).fetchone()
         return _row_to_user(row) if row else None
 
-    def list_all(self) -> List[UserRecord]:
+    def existing_ids(self, user_ids: Iterable[UUID]) -> Set[UUID]:
+        """Return the subset of ``user_ids`` that belong to a user."""
+
+        return _existing_ids(self._db, "users", user_ids)
+
+    def list_all(
+        self, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[UserRecord]:
+        clause, params = _keyset_clause("", (), limit, after)
         with db_session(self._db) as conn:
-            rows = conn.execute("SELECT * FROM users ORDER BY created_at DESC").fetchall()
+            rows = conn.execute(f"SELECT * FROM users {clause}", params).fetchall()
         return [_row_to_user(row) for row in rows]
 
 
 class ProductRepository:
     def __init__(self, db: Database) -> None:
         self._db = db
+        self._version = 0
+        self._version_lock = threading.Lock()
+
+    _INSERT = """
+        INSERT INTO products (id, name, description, category, price_cents, currency, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @property
+    def version(self) -> int:
+        """Catalog version, bumped by every write made through this instance."""
+
+        return self._version
+
+    def _bump_version(self) -> None:
+        with self._version_lock:
+            self._version += 1
+
+    def invalidate(self) -> None:
+        """Forget cached reads, e.g. after a rolled-back transaction made some."""
+
+        self._bump_version()
 
     def create(self, record: ProductRecord) -> None:
-        with db_session(self._db) as conn:
-            conn.execute(
-                """
-                INSERT INTO products (id, name, description, category, price_cents, currency, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    str(record.id),
-                    record.name,
-                    record.description,
-                    record.category,
-                    record.price_cents,
-                    record.currency,
-                    record.created_at.isoformat(),
-                ),
+        try:
+            with db_session(self._db) as conn:
+                conn.execute(self._INSERT, _product_params(record))
+        finally:
+            self._bump_version()
+
+    def create_many(
+        self,
+        records: Iterable[ProductRecord],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Insert products with ``executemany``, committing once per chunk."""
+
+        def committed(inserted: int) -> None:
+            self._bump_version()
+            if on_commit is not None:
+                on_commit(inserted)
+
+        try:
+            return _insert_chunked(
+                self._db, self._INSERT, records, _product_params, chunk_size, committed
             )
+        finally:
+            self._bump_version()
 
-    def list_all(self) -> List[ProductRecord]:
+    def list_all(
+        self, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[ProductRecord]:
+        clause, params = _keyset_clause("", (), limit, after)
         with db_session(self._db) as conn:
-            rows = conn.execute("SELECT * FROM products ORDER BY created_at DESC").fetchall()
+            rows = conn.execute(f"SELECT * FROM products {clause}", params).fetchall()
         return [_row_to_product(row) for row in rows]
 
+    def iter_batches(
+        self, batch_size: int = STREAM_BATCH_SIZE
+    ) -> Generator[List[ProductRecord], None, None]:
+        """Yield the whole catalog, newest first, ``batch_size`` rows at a time.
+
+        Each batch is a keyset page read in its own connection checkout, so
+        no pooled connection is held while the consumer handles a batch.
+        """
+
+        yield from _fetch_batches(self._db, "products", "", (), _row_to_product, batch_size)
+
     def get_by_id(self, product_id: UUID) -> Optional[ProductRecord]:
         with db_session(self._db) as conn:
             row = conn.execute(
@@ -123,26 +235,131 @@ class ProductRepository:
             ).fetchone()
         return _row_to_product(row) if row else None
 
-    def list_by_category(self, category: str) -> List[ProductRecord]:
+    def get_many(self, product_ids: Iterable[UUID]) -> Dict[UUID, ProductRecord]:
+        """Fetch products by id; ids that do not exist are absent from the result."""
+
+        keys = list(dict.fromkeys(str(product_id) for product_id in product_ids))
+        products: Dict[UUID, ProductRecord] = {}
+        if not keys:
+            return products
         with db_session(self._db) as conn:
-            rows = conn.execute(
-                "SELECT * FROM products WHERE category = ? ORDER BY created_at DESC",
-                (category,),
-            ).fetchall()
+            for chunk in _chunks(keys, IN_CLAUSE_CHUNK_SIZE):
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT * FROM products WHERE id IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    product = _row_to_product(row)
+                    products[product.id] = product
+        return products
+
+    def list_by_category(
+        self, category: str, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[ProductRecord]:
+        clause, params = _keyset_clause("category = ?", (category,), limit, after)
+        with db_session(self._db) as conn:
+            rows = conn.execute(f"SELECT * FROM products {clause}", params).fetchall()
         return [_row_to_product(row) for row in rows]
 
 
+class CachedProductRepository(ProductRepository):
+    """Read-through catalog cache in front of ``ProductRepository``.
+
+    Products are immutable once written, so records cached by id only expire
+    through TTL or LRU eviction. Listings are cleared whenever this repository
+    writes; writes made by other processes show up once the TTL lapses.
+    Keyset pages after the first are not cached.
+    """
+
+    def __init__(self, db: Database, max_entries: int, ttl_seconds: float) -> None:
+        super().__init__(db)
+        self._records: TTLCache[ProductRecord] = TTLCache(max_entries, ttl_seconds)
+        self._lists: TTLCache[List[ProductRecord]] = TTLCache(max_entries, ttl_seconds)
+
+    def get_by_id(self, product_id: UUID) -> Optional[ProductRecord]:
+        record = self._records.get(product_id)
+        if record is None:
+            record = super().get_by_id(product_id)
+            if record is not None:
+                self._records.set(product_id, record)
+        return record
+
+    def get_many(self, product_ids: Iterable[UUID]) -> Dict[UUID, ProductRecord]:
+        found: Dict[UUID, ProductRecord] = {}
+        missing: List[UUID] = []
+        for product_id in product_ids:
+            if product_id in found:
+                continue
+            record = self._records.get(product_id)
+            if record is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = record
+        if missing:
+            for product_id, record in super().get_many(missing).items():
+                self._records.set(product_id, record)
+                found[product_id] = record
+        return found
+
+    def list_all(
+        self, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[ProductRecord]:
+        if after is not None:
+            return super().list_all(limit=limit, after=after)
+        return self._cached_list(("all", limit), partial(super().list_all, limit=limit))
+
+    def list_by_category(
+        self, category: str, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[ProductRecord]:
+        if after is not None:
+            return super().list_by_category(category, limit=limit, after=after)
+        return self._cached_list(
+            ("category", category, limit),
+            partial(super().list_by_category, category, limit=limit),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        records, lists = self._records.stats(), self._lists.stats()
+        return {key: records[key] + lists[key] for key in records}
+
+    def invalidate(self) -> None:
+        self._records.clear()
+        super().invalidate()
+
+    def _bump_version(self) -> None:
+        super()._bump_version()
+        self._lists.clear()
+
+    def _cached_list(
+        self, key: Tuple[object, ...], load: Callable[[], List[ProductRecord]]
+    ) -> List[ProductRecord]:
+        records = self._lists.get(key)
+        if records is None:
+            version = self.version
+            records = load()
+            # Skip the store if a write landed while we were reading.
+            if version == self.version:
+                self._lists.set(key, records)
+        return list(records)
+
+
 class OrderRepository:
     def __init__(self, db: Database) -> None:
         self._db = db
 
     def create(self, order: OrderRecord, items: Iterable[OrderItemRecord]) -> None:
-        with db_session(self._db) as conn:
-            conn.execute(
-                """
-                INSERT INTO orders (id, user_id, total_cents, currency, status, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
+        self.create_many([(order, items)])
+
+    def create_many(
+        self, orders: Iterable[Tuple[OrderRecord, Iterable[OrderItemRecord]]]
+    ) -> None:
+        """Insert orders and their items with one ``executemany`` per table."""
+
+        order_params: List[Sequence[object]] = []
+        item_params: List[Sequence[object]] = []
+        for order, items in orders:
+            order_params.append(
                 (
                     str(order.id),
                     str(order.user_id),
@@ -150,33 +367,56 @@ class OrderRepository:
                     order.currency,
                     order.status,
                     order.created_at.isoformat(),
-                ),
+                )
+            )
+            item_params.extend(
+                (
+                    str(item.id),
+                    str(item.order_id),
+                    str(item.product_id),
+                    item.quantity,
+                    item.price_cents,
+                )
+                for item in items
+            )
+        with db_session(self._db) as conn:
+            conn.executemany(
+                """
+                INSERT INTO orders (id, user_id, total_cents, currency, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                order_params,
             )
             conn.executemany(
                 """
                 INSERT INTO order_items (id, order_id, product_id, quantity, price_cents)
                 VALUES (?, ?, ?, ?, ?)
                 """,
-                [
-                    (
-                        str(item.id),
-                        str(item.order_id),
-                        str(item.product_id),
-                        item.quantity,
-                        item.price_cents,
-                    )
-                    for item in items
-                ],
+                item_params,
             )
 
-    def list_by_user(self, user_id: UUID) -> List[OrderRecord]:
+    def existing_ids(self, order_ids: Iterable[UUID]) -> Set[UUID]:
+        """Return the subset of ``order_ids`` that are already stored."""
+
+        return _existing_ids(self._db, "orders", order_ids)
+
+    def list_by_user(
+        self, user_id: UUID, limit: Optional[int] = None, after: Optional[Cursor] = None
+    ) -> List[OrderRecord]:
+        clause, params = _keyset_clause("user_id = ?", (str(user_id),), limit, after)
         with db_session(self._db) as conn:
-            rows = conn.execute(
-                "SELECT * FROM orders WHERE user_id = ? ORDER BY created_at DESC",
-                (str(user_id),),
-            ).fetchall()
+            rows = conn.execute(f"SELECT * FROM orders {clause}", params).fetchall()
         return [_row_to_order(row) for row in rows]
 
+    def iter_batches_by_user(
+        self, user_id: UUID, batch_size: int = STREAM_BATCH_SIZE
+    ) -> Generator[List[OrderRecord], None, None]:
+        """Streaming form of ``list_by_user``; see ``ProductRepository.iter_batches``."""
+
+        yield from _fetch_batches(
+            self._db, "orders", "user_id = ?", (str(user_id),), _row_to_order, batch_size
+        )
+
     def list_items(self, order_id: UUID) -> List[OrderItemRecord]:
         with db_session(self._db) as conn:
             rows = conn.execute(
@@ -185,6 +425,222 @@ class OrderRepository:
             ).fetchall()
         return [_row_to_order_item(row) for row in rows]
 
+    def list_items_for_orders(self, order_ids: Iterable[UUID]) -> Dict[UUID, List[OrderItemRecord]]:
+        """Load items for many orders with one ``IN`` query per chunk of ids.
+
+        Every requested order id is present in the result, mapped to an empty
+        list when it has no items.
+        """
+
+        items: Dict[UUID, List[OrderItemRecord]] = {}
+        keys: List[str] = []
+        for order_id in order_ids:
+            if order_id not in items:
+                items[order_id] = []
+                keys.append(str(order_id))
+        if not keys:
+            return items
+        with db_session(self._db) as conn:
+            for chunk in _chunks(keys, IN_CLAUSE_CHUNK_SIZE):
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT * FROM order_items WHERE order_id IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    item = _row_to_order_item(row)
+                    items[item.order_id].append(item)
+        return items
+
+
+class AffinityRepository:
+    """Per-user category line counts, updated in the order write transaction.
+
+    Ranking by ``item_count`` and then by the newest order (and earliest line
+    in it) reproduces picking the most frequent category from a newest-first
+    walk of the user's order lines, ties going to the first one seen.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+
+    def record_order(self, order: OrderRecord, categories: Sequence[str]) -> None:
+        """Add one order's lines; ``categories`` holds each line's category in cart order."""
+
+        self.record_orders([(order, categories)])
+
+    def record_orders(self, orders: Iterable[Tuple[OrderRecord, Sequence[str]]]) -> None:
+        """``record_order`` for many orders with a single ``executemany``."""
+
+        params: List[Sequence[object]] = []
+        for order, categories in orders:
+            counts: Dict[str, int] = {}
+            first_position: Dict[str, int] = {}
+            for position, category in enumerate(categories):
+                counts[category] = counts.get(category, 0) + 1
+                first_position.setdefault(category, position)
+            params.extend(
+                (
+                    str(order.user_id),
+                    category,
+                    count,
+                    order.created_at.isoformat(),
+                    str(order.id),
+                    first_position[category],
+                )
+                for category, count in counts.items()
+            )
+        with db_session(self._db) as conn:
+            conn.executemany(
+                """
+                INSERT INTO user_category_affinity
+                    (user_id, category, item_count, last_order_at, last_order_id, last_position)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, category) DO UPDATE SET
+                    item_count = item_count + excluded.item_count,
+                    last_position = CASE
+                        WHEN (excluded.last_order_at, excluded.last_order_id)
+                            > (last_order_at, last_order_id)
+                        THEN excluded.last_position ELSE last_position END,
+                    last_order_id = CASE
+                        WHEN (excluded.last_order_at, excluded.last_order_id)
+                            > (last_order_at, last_order_id)
+                        THEN excluded.last_order_id ELSE last_order_id END,
+                    last_order_at = MAX(last_order_at, excluded.last_order_at)
+                """,
+                params,
+            )
+
+    def top_category(self, user_id: UUID) -> Optional[str]:
+        with db_session(self._db) as conn:
+            row = conn.execute(
+                """
+                SELECT category FROM user_category_affinity
+                WHERE user_id = ?
+                ORDER BY item_count DESC, last_order_at DESC, last_order_id DESC, last_position ASC
+                LIMIT 1
+                """,
+                (str(user_id),),
+            ).fetchone()
+        return row["category"] if row else None
+
+
+def _keyset_clause(
+    where: str,
+    params: Sequence[object],
+    limit: Optional[int],
+    after: Optional[Cursor],
+) -> Tuple[str, List[object]]:
+    """Build the WHERE/ORDER BY/LIMIT tail for a newest-first keyset listing."""
+
+    conditions = [where] if where else []
+    args = list(params)
+    if after is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        args.extend((after.created_at.isoformat(), str(after.id)))
+    clause = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    clause += "ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        clause += " LIMIT ?"
+        args.append(limit)
+    return clause, args
+
+
+def _fetch_batches(
+    db: Database,
+    table: str,
+    where: str,
+    params: Sequence[object],
+    to_record: Callable[..., _T],
+    batch_size: int,
+) -> Generator[List[_T], None, None]:
+    """Yield matching rows newest first, one keyset page per connection checkout.
+
+    The connection goes back to the pool before each batch is yielded, so a
+    slow consumer never pins it. Rows committed mid-iteration sort ahead of
+    the current position and are not returned.
+    """
+
+    after: Optional[Cursor] = None
+    while True:
+        clause, args = _keyset_clause(where, params, batch_size, after)
+        with db_session(db) as conn:
+            rows = conn.execute(f"SELECT * FROM {table} {clause}", args).fetchall()
+        if not rows:
+            return
+        batch = [to_record(row) for row in rows]
+        yield batch
+        if len(rows) < batch_size:
+            return
+        after = Cursor.after(batch[-1])
+
+
+def _chunks(items: Iterable[_T], size: int) -> Iterator[List[_T]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _existing_ids(db: Database, table: str, ids: Iterable[UUID]) -> Set[UUID]:
+    keys = list(dict.fromkeys(str(value) for value in ids))
+    found: Set[UUID] = set()
+    if not keys:
+        return found
+    with db_session(db) as conn:
+        for chunk in _chunks(keys, IN_CLAUSE_CHUNK_SIZE):
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT id FROM {table} WHERE id IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(UUID(row["id"]) for row in rows)
+    return found
+
+
+def _insert_chunked(
+    db: Database,
+    sql: str,
+    records: Iterable[_T],
+    to_params: Callable[[_T], Sequence[object]],
+    chunk_size: int,
+    on_commit: Optional[Callable[[int], None]] = None,
+) -> int:
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    inserted = 0
+    for chunk in _chunks(records, chunk_size):
+        params = [to_params(record) for record in chunk]
+        with db_session(db) as conn:
+            conn.executemany(sql, params)
+        inserted += len(params)
+        if on_commit is not None:
+            on_commit(inserted)
+    return inserted
+
+
+def _user_params(record: UserRecord) -> Sequence[object]:
+    return (
+        str(record.id),
+        record.email,
+        record.username,
+        record.password_hash,
+        record.password_salt,
+        record.created_at.isoformat(),
+    )
+
+
+def _product_params(record: ProductRecord) -> Sequence[object]:
+    return (
+        str(record.id),
+        record.name,
+        record.description,
+        record.category,
+        record.price_cents,
+        record.currency,
+        record.created_at.isoformat(),
+    )
 
 
 def _row_to_user(row) -> UserRecord:
@@ -0,0 +1,96 @@
+"""Route table used by the HTTP-agnostic API.
+
+Static paths resolve with a single dict lookup on ``(method, path)``.
+Parameterized templates such as ``/orders/{user_id}`` are compiled to regular
+expressions and bucketed by their first path segment, so a request only tries
+the handful of patterns that share its prefix.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Generic, List, Optional, Pattern, Tuple, TypeVar
+
+_H = TypeVar("_H")
+
+_PARAM = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+@dataclass
+class RouteMatch(Generic[_H]):
+    """Result of resolving a request.
+
+    ``handler`` is None when nothing matched. ``allowed`` then lists the
+    methods registered for the path, which is non-empty for a 405.
+    ``template`` is the registered path template that matched.
+    """
+
+    handler: Optional[_H]
+    params: Dict[str, str] = field(default_factory=dict)
+    allowed: FrozenSet[str] = frozenset()
+    template: str = ""
+
+
+@dataclass
+class _PatternRoute(Generic[_H]):
+    template: str
+    pattern: Pattern[str]
+    handlers: Dict[str, _H]
+
+
+class Router(Generic[_H]):
+    def __init__(self) -> None:
+        self._static: Dict[Tuple[str, str], _H] = {}
+        self._static_methods: Dict[str, FrozenSet[str]] = {}
+        self._patterns: Dict[str, List[_PatternRoute[_H]]] = {}
+
+    def add(self, method: str, template: str, handler: _H) -> None:
+        method = method.upper()
+        if "{" not in template:
+            if (method, template) in self._static:
+                raise ValueError(f"duplicate route {method} {template}")
+            self._static[(method, template)] = handler
+            self._static_methods[template] = self._static_methods.get(template, frozenset()) | {method}
+            return
+        bucket = self._patterns.setdefault(_first_segment(template), [])
+        for route in bucket:
+            if route.template == template:
+                if method in route.handlers:
+                    raise ValueError(f"duplicate route {method} {template}")
+                route.handlers[method] = handler
+                return
+        bucket.append(_PatternRoute(template, _compile(template), {method: handler}))
+
+    def resolve(self, method: str, path: str) -> RouteMatch[_H]:
+        handler = self._static.get((method, path))
+        if handler is not None:
+            return RouteMatch(handler, template=path)
+        allowed = self._static_methods.get(path)
+        if allowed is not None:
+            return RouteMatch(None, allowed=allowed)
+        for route in self._patterns.get(_first_segment(path), ()):
+            matched = route.pattern.fullmatch(path)
+            if matched is None:
+                continue
+            handler = route.handlers.get(method)
+            if handler is None:
+                return RouteMatch(None, allowed=frozenset(route.handlers))
+            return RouteMatch(handler, matched.groupdict(), template=route.template)
+        return RouteMatch(None)
+
+
+def _first_segment(path: str) -> str:
+    end = path.find("/", 1)
+    return path if end == -1 else path[:end]
+
+
+def _compile(template: str) -> Pattern[str]:
+    parts = []
+    position = 0
+    for param in _PARAM.finditer(template):
+        parts.append(re.escape(template[position : param.start()]))
+        parts.append(f"(?P<{param.group(1)}>[^/]+)")
+        position = param.end()
+    parts.append(re.escape(template[position:]))
+    return re.compile("".join(parts))
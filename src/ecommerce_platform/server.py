@@ -2,17 +2,44 @@
 
 from __future__ import annotations
 
+import logging
+import queue
+import socket
 import threading
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from typing import Tuple
-from urllib.parse import urlparse
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional, Set, Tuple, Union
 
 from .api import EcommerceAPI, ApiResponse, create_api
+from .asyncio_server import AsyncEcommerceServer
 from .config import Settings, load_settings
 
+SERVER_MODES = ("threaded", "asyncio")
+
+logger = logging.getLogger(__name__)
+
+Server = Union["EcommerceHTTPServer", AsyncEcommerceServer]
+
 
 class EcommerceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler with persistent connections.
+
+    ``timeout`` is the idle timeout between requests on a kept-alive
+    connection; ``max_requests`` caps how many requests one connection serves
+    before the server asks the client to reconnect.
+    """
+
+    protocol_version = "HTTP/1.1"
     api: EcommerceAPI
+    server: "EcommerceHTTPServer"
+    max_requests: int = 100
+
+    def setup(self) -> None:
+        super().setup()
+        # Headers and body are separate writes; with Nagle on, the body waits
+        # for the client's delayed ACK (~40 ms). asyncio transports do the same.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._requests_served = 0
 
     def do_GET(self) -> None:
         self._handle_request()
@@ -20,45 +47,217 @@ class EcommerceRequestHandler(BaseHTTPRequestHandler):
     def do_POST(self) -> None:
         self._handle_request()
 
+    def do_PUT(self) -> None:
+        self._handle_request()
+
+    def do_PATCH(self) -> None:
+        self._handle_request()
+
+    def do_DELETE(self) -> None:
+        self._handle_request()
+
+    def parse_request(self) -> bool:
+        self.server.connection_busy(self.connection)
+        return super().parse_request()
+
+    def handle_one_request(self) -> None:
+        super().handle_one_request()
+        if not self.close_connection:
+            self.server.connection_idle(self.connection)
+
     def _handle_request(self) -> None:
         length = int(self.headers.get("Content-Length", 0))
-        body = self.rfile.read(length).decode("utf-8") if length else None
-        response = self.api.handle(self.command, urlparse(self.path).path, body)
+        try:
+            body = self.rfile.read(length).decode("utf-8") if length else None
+        except UnicodeDecodeError:
+            self.close_connection = True
+            self._send(ApiResponse(status_code=400, body=b"", headers={"Content-Length": "0"}))
+            return
+        response = self.api.handle(
+            self.command, self.path, body, self.headers, self.client_address[0]
+        )
+        self._requests_served += 1
+        if self._requests_served >= self.max_requests or self.server.draining:
+            self.close_connection = True
+        self._send(response)
+
+    def _send(self, response: ApiResponse) -> None:
+        if response.stream is not None and self.request_version != "HTTP/1.1":
+            response = response.buffered()
         self.send_response(response.status_code)
         for key, value in response.headers.items():
             self.send_header(key, value)
+        if response.stream is not None:
+            self.send_header("Transfer-Encoding", "chunked")
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(response.body)
+        if response.stream is None:
+            self.wfile.write(response.body)
+            return
+        try:
+            for chunk in response.stream:
+                if chunk:
+                    self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except BaseException:
+            # The status line is already out, so a failure mid-stream can only
+            # be reported by dropping the connection before the last chunk.
+            self.close_connection = True
+            raise
+        finally:
+            response.stream.close()
 
     def log_message(self, format: str, *args) -> None:
         return
 
 
-def _build_handler(api: EcommerceAPI):
+class EcommerceHTTPServer(HTTPServer):
+    """HTTP server with a fixed pool of worker threads.
+
+    The accept loop hands connections to ``workers`` threads through a bounded
+    queue; when every worker is busy and the queue is full, accepting pauses
+    and new clients wait in the listen backlog instead of spawning threads.
+    The server owns the API and closes it on shutdown.
+
+    ``server_close`` drains: connections already accepted finish their
+    current request (answered with ``Connection: close``), kept-alive
+    connections waiting for their next request are closed, and whatever is
+    still running after ``HTTP_SHUTDOWN_GRACE_SECONDS`` is cut off.
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        api: EcommerceAPI,
+        workers: Optional[int] = None,
+        reuse_port: bool = False,
+    ) -> None:
+        self.api = api
+        settings = api.settings
+        self.workers = workers or settings.http_workers
+        # Lets several processes listen on one port (see prefork.py).
+        self.allow_reuse_port = reuse_port
+        self._pending: "queue.Queue[Optional[Tuple[socket.socket, Tuple[str, int]]]]"
+        self._pending = queue.Queue(maxsize=self.workers * 4)
+        self._active: Set[socket.socket] = set()
+        # Kept-alive connections between requests; safe to close when draining.
+        self._idle: Set[socket.socket] = set()
+        self._active_lock = threading.Lock()
+        self.grace_seconds = settings.http_shutdown_grace_seconds
+        self.draining = False
+        super().__init__(address, _build_handler(api, settings))
+        self._threads = [
+            threading.Thread(target=self._work, name=f"http-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def process_request(self, request, client_address) -> None:
+        self._pending.put((request, client_address))
+
+    def _work(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            with self._active_lock:
+                self._active.add(request)
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                with self._active_lock:
+                    self._active.discard(request)
+                    self._idle.discard(request)
+                self.shutdown_request(request)
+
+    def handle_error(self, request: socket.socket, client_address: Tuple[str, int]) -> None:
+        logger.exception("error serving %s:%s", *client_address[:2])
+
+    def connection_busy(self, request: socket.socket) -> None:
+        with self._active_lock:
+            self._idle.discard(request)
+
+    def connection_idle(self, request: socket.socket) -> None:
+        with self._active_lock:
+            self._idle.add(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.draining = True
+        deadline = time.monotonic() + self.grace_seconds
+        while True:
+            with self._active_lock:
+                idle = list(self._idle)
+                busy = len(self._active) > len(idle) or not self._pending.empty()
+            # Wake workers parked on idle keep-alive connections.
+            for request in idle:
+                _shutdown_socket(request, socket.SHUT_RD)
+            if not busy or time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.shutdown_request(item[0])
+        with self._active_lock:
+            for request in self._active:
+                _shutdown_socket(request, socket.SHUT_RDWR)
+        for _ in self._threads:
+            self._pending.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self.api.close()
+
+
+def _shutdown_socket(request: socket.socket, how: int) -> None:
+    try:
+        request.shutdown(how)
+    except OSError:
+        pass
+
+
+def _build_handler(api: EcommerceAPI, settings: Settings):
     class BoundHandler(EcommerceRequestHandler):
         pass
 
     BoundHandler.api = api
+    BoundHandler.timeout = settings.http_keepalive_timeout_seconds
+    BoundHandler.max_requests = settings.http_keepalive_max_requests
     return BoundHandler
 
 
-def create_server(settings: Settings | None = None) -> Tuple[ThreadingHTTPServer, threading.Thread]:
-    settings = settings or load_settings()
+def make_server(settings: Settings, reuse_port: bool = False) -> Server:
+    if settings.server_mode not in SERVER_MODES:
+        raise ValueError(f"unknown server mode {settings.server_mode!r}")
     api = create_api(settings)
-    handler = _build_handler(api)
+    address = ("0.0.0.0", int(settings.port))
+    if settings.server_mode == "asyncio":
+        return AsyncEcommerceServer(address, api, reuse_port=reuse_port)
+    return EcommerceHTTPServer(address, api, reuse_port=reuse_port)
+
 
-    server = ThreadingHTTPServer(("0.0.0.0", int(settings.port)), handler)
+def create_server(settings: Settings | None = None) -> Tuple[Server, threading.Thread]:
+    settings = settings or load_settings()
+    server = make_server(settings)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     return server, thread
 
 
-def run() -> None:
-    settings = load_settings()
-    api = create_api(settings)
-    handler = _build_handler(api)
-
-    server = ThreadingHTTPServer(("0.0.0.0", int(settings.port)), handler)
-    print(f"Serving API on http://0.0.0.0:{settings.port}")
+def run(settings: Settings | None = None) -> None:
+    settings = settings or load_settings()
+    server = make_server(settings)
+    print(
+        f"Serving API on http://0.0.0.0:{settings.port} "
+        f"({settings.server_mode} mode, {server.workers} workers)"
+    )
     try:
         server.serve_forever()
     except KeyboardInterrupt:
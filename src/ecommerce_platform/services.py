@@ -2,24 +2,33 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import sqlite3
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import List
+from typing import Any, Callable, Dict, Generator, Iterable, List, Mapping, Optional, Sequence, Tuple, TypeVar
 from uuid import UUID, uuid4
 
-from .auth import issue_token, verify_password
+from .auth import HasherBusyError, PasswordHasher, hash_password, issue_token
 from .config import Settings
-from .db import Database
+from .db import Database, db_session
 from .repositories import (
+    BULK_CHUNK_SIZE,
+    STREAM_BATCH_SIZE,
+    AffinityRepository,
+    CachedProductRepository,
+    Cursor,
     OrderItemRecord,
     OrderRecord,
     OrderRepository,
+    Page,
     ProductRecord,
     ProductRepository,
     UserRecord,
     UserRepository,
 )
 
+_T = TypeVar("_T")
+
 
 class EcommerceError(RuntimeError):
     """Base error for domain failures."""
@@ -30,7 +39,40 @@ class ValidationError(EcommerceError):
 
 
 class AuthenticationError(EcommerceError):
-    """Raised for login failures."""
+    """Raised for login failures and missing or invalid tokens."""
+
+
+class AuthorizationError(EcommerceError):
+    """Raised when a valid token may not act on the requested user."""
+
+
+@dataclass(frozen=True)
+class OrderRequest:
+    """One order of a ``create_orders`` batch.
+
+    With an ``order_id`` the request is idempotent: if that order is already
+    stored it is reported as created rather than inserted again.
+    """
+
+    user_id: UUID
+    items: List[Tuple[UUID, int]]
+    order_id: Optional[UUID] = None
+
+
+# Validated order waiting for its write transaction:
+# (request index, order, items, category of each item in cart order).
+_PendingOrder = Tuple[int, OrderRecord, List[OrderItemRecord], List[str]]
+
+
+def _duplicate_user_error(exc: sqlite3.IntegrityError) -> ValidationError:
+    """Translate a users UNIQUE constraint failure into the signup error."""
+
+    message = str(exc)
+    if "users.username" in message:
+        return ValidationError("username already exists")
+    if "users.email" in message:
+        return ValidationError("email already exists")
+    return ValidationError("user already exists")
 
 
 @dataclass
@@ -40,19 +82,66 @@ class EcommerceService:
 
     def __post_init__(self) -> None:
         self.users = UserRepository(self.db)
-        self.products = ProductRepository(self.db)
+        self.products: ProductRepository
+        if self.settings.catalog_cache_size > 0:
+            self.products = CachedProductRepository(
+                self.db,
+                max_entries=self.settings.catalog_cache_size,
+                ttl_seconds=self.settings.catalog_cache_ttl_seconds,
+            )
+        else:
+            self.products = ProductRepository(self.db)
         self.orders = OrderRepository(self.db)
+        self.affinity = AffinityRepository(self.db)
+        self.passwords = PasswordHasher(
+            iterations=self.settings.password_iterations,
+            workers=self.settings.password_hash_workers,
+            max_queued=self.settings.password_hash_queue,
+        )
 
     def create_user(self, email: str, username: str, password_hash: str, password_salt: str) -> UserRecord:
+        record = self._build_user(email, username, password_hash, password_salt)
+        try:
+            self.users.create(record)
+        except sqlite3.IntegrityError as exc:
+            raise _duplicate_user_error(exc) from exc
+        return record
+
+    def import_users(
+        self,
+        rows: Iterable[Mapping[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Validate and bulk insert users, one transaction per chunk.
+
+        Rows carry either ``password`` or a precomputed ``password_hash`` and
+        ``password_salt``. Chunks committed before a failing row are kept.
+        """
+
+        def records() -> Iterable[UserRecord]:
+            for row in rows:
+                if row.get("password_hash"):
+                    password_hash, salt = row["password_hash"], row["password_salt"]
+                else:
+                    # Bulk imports are offline; hash inline rather than
+                    # competing with request traffic for the hasher.
+                    password_hash, salt = hash_password(
+                        row["password"], iterations=self.settings.password_iterations
+                    )
+                yield self._build_user(row["email"], row["username"], password_hash, salt)
+
+        try:
+            return self.users.create_many(records(), chunk_size=chunk_size, on_commit=on_commit)
+        except sqlite3.IntegrityError as exc:
+            raise _duplicate_user_error(exc) from exc
+
+    def _build_user(self, email: str, username: str, password_hash: str, password_salt: str) -> UserRecord:
         if "@" not in email:
             raise ValidationError("email must contain '@'")
         if len(username) < 3:
             raise ValidationError("username must be at least 3 characters")
-        if self.users.get_by_username(username):
-            raise ValidationError("username already exists")
-        if any(user.email == email for user in self.users.list_all()):
-            raise ValidationError("email already exists")
-        record = UserRecord(
+        return UserRecord(
             id=uuid4(),
             email=email,
             username=username,
@@ -60,18 +149,31 @@ class EcommerceService:
             password_salt=password_salt,
             created_at=datetime.utcnow(),
         )
-        self.users.create(record)
-        return record
 
     def login(self, username: str, password: str) -> tuple[UserRecord, str, int]:
         record = self.users.get_by_username(username)
         if record is None:
             raise AuthenticationError("Invalid username or password")
-        if not verify_password(password, record.password_hash, record.password_salt):
+        if not self.passwords.verify(password, record.password_hash, record.password_salt):
             raise AuthenticationError("Invalid username or password")
+        if self.passwords.needs_rehash(record.password_hash):
+            record = self._rehash_password(record, password)
         token = issue_token(str(record.id), self.settings.token_secret, self.settings.token_ttl_minutes)
         return record, token.value, self.settings.token_ttl_minutes
 
+    def _rehash_password(self, record: UserRecord, password: str) -> UserRecord:
+        """Upgrade a stored hash to the configured iteration count.
+
+        Best effort: a busy hasher leaves the old hash for the next login.
+        """
+
+        try:
+            password_hash, salt = self.passwords.hash(password)
+        except HasherBusyError:
+            return record
+        self.users.update_password(record.id, password_hash, salt)
+        return replace(record, password_hash=password_hash, password_salt=salt)
+
     def create_product(
         self,
         name: str,
@@ -79,10 +181,42 @@ class EcommerceService:
         category: str,
         price_cents: int,
         currency: str,
+    ) -> ProductRecord:
+        record = self._build_product(name, description, category, price_cents, currency)
+        self.products.create(record)
+        return record
+
+    def import_products(
+        self,
+        rows: Iterable[Mapping[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Validate and bulk insert catalog rows, one transaction per chunk."""
+
+        records = (
+            self._build_product(
+                name=row["name"],
+                description=row["description"],
+                category=row["category"],
+                price_cents=int(row["price_cents"]),
+                currency=row.get("currency") or "USD",
+            )
+            for row in rows
+        )
+        return self.products.create_many(records, chunk_size=chunk_size, on_commit=on_commit)
+
+    def _build_product(
+        self,
+        name: str,
+        description: str,
+        category: str,
+        price_cents: int,
+        currency: str,
     ) -> ProductRecord:
         if price_cents <= 0:
             raise ValidationError("price must be positive")
-        record = ProductRecord(
+        return ProductRecord(
             id=uuid4(),
             name=name,
             description=description,
@@ -91,45 +225,150 @@ class EcommerceService:
             currency=currency,
             created_at=datetime.utcnow(),
         )
-        self.products.create(record)
-        return record
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        if isinstance(self.products, CachedProductRepository):
+            return {"catalog": self.products.stats()}
+        return {}
+
+    def invalidate_caches(self) -> None:
+        self.products.invalidate()
 
     def list_products(self) -> List[ProductRecord]:
         return self.products.list_all()
 
+    def iter_products(
+        self, batch_size: int = STREAM_BATCH_SIZE
+    ) -> Generator[List[ProductRecord], None, None]:
+        return self.products.iter_batches(batch_size)
+
+    def list_products_page(self, limit: int, cursor: Optional[str] = None) -> Page[ProductRecord]:
+        return self._paginate(self.products.list_all, limit, cursor)
+
     def create_order(self, user_id: UUID, items: List[tuple[UUID, int]]) -> OrderRecord:
+        order, _ = self.create_order_with_items(user_id, items)
+        return order
+
+    def create_order_with_items(
+        self, user_id: UUID, items: List[tuple[UUID, int]]
+    ) -> Tuple[OrderRecord, List[OrderItemRecord]]:
+        """Validate, price and insert an order in one write transaction.
+
+        Prices come from ``products.get_many``: cached records where the
+        catalog cache has them, otherwise a single product query after
+        ``BEGIN IMMEDIATE``. Products are never updated or deleted, so a
+        cached price is the stored one. The user's category affinity for
+        recommendations is updated in the same transaction.
+        """
+
         if not items:
             raise ValidationError("order items cannot be empty")
-        user = self.users.get_by_id(user_id)
-        if user is None:
-            raise ValidationError("user does not exist")
+        with db_session(self.db, immediate=True):
+            if self.users.get_by_id(user_id) is None:
+                raise ValidationError("user does not exist")
+            products = self.products.get_many(product_id for product_id, _ in items)
+            order, order_items = self._build_order(uuid4(), user_id, items, products)
+            self.orders.create(order, order_items)
+            self.affinity.record_order(
+                order, [products[product_id].category for product_id, _ in items]
+            )
+        return order, order_items
+
+    def create_orders(
+        self, requests: Sequence[OrderRequest], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> List[Optional[EcommerceError]]:
+        """Validate, price and insert a batch of orders.
+
+        Users, products and already stored order ids are looked up once for
+        the whole batch, then valid orders are inserted ``chunk_size`` per
+        write transaction. Returns one entry per request, in order: ``None``
+        when the order is stored (or was already), otherwise the error that
+        kept it out. A chunk that hits a constraint is retried one order at a
+        time so a single bad order does not fail its neighbours.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        errors: List[Optional[EcommerceError]] = [None] * len(requests)
+        known_users = self.users.existing_ids(request.user_id for request in requests)
+        products = self.products.get_many(
+            product_id for request in requests for product_id, _ in request.items
+        )
+        stored = self.orders.existing_ids(
+            request.order_id for request in requests if request.order_id is not None
+        )
+        first_index: Dict[UUID, int] = {}
+        duplicates: List[Tuple[int, int]] = []
+        pending: List[_PendingOrder] = []
+        for index, request in enumerate(requests):
+            if request.order_id is not None:
+                if request.order_id in stored:
+                    continue
+                if request.order_id in first_index:
+                    duplicates.append((index, first_index[request.order_id]))
+                    continue
+                first_index[request.order_id] = index
+            try:
+                if not request.items:
+                    raise ValidationError("order items cannot be empty")
+                if request.user_id not in known_users:
+                    raise ValidationError("user does not exist")
+                order, order_items = self._build_order(
+                    request.order_id or uuid4(), request.user_id, request.items, products
+                )
+            except ValidationError as exc:
+                errors[index] = exc
+                continue
+            categories = [products[product_id].category for product_id, _ in request.items]
+            pending.append((index, order, order_items, categories))
+        for start in range(0, len(pending), chunk_size):
+            self._store_orders(pending[start : start + chunk_size], errors)
+        for index, original in duplicates:
+            errors[index] = errors[original]
+        return errors
+
+    def _store_orders(
+        self, group: Sequence[_PendingOrder], errors: List[Optional[EcommerceError]]
+    ) -> None:
+        try:
+            with db_session(self.db, immediate=True):
+                self.orders.create_many((order, items) for _, order, items, _ in group)
+                self.affinity.record_orders(
+                    (order, categories) for _, order, _, categories in group
+                )
+        except sqlite3.IntegrityError as exc:
+            if len(group) > 1:
+                for entry in group:
+                    self._store_orders([entry], errors)
+                return
+            errors[group[0][0]] = EcommerceError(f"order could not be stored: {exc}")
+        except sqlite3.Error as exc:
+            for index, *_ in group:
+                errors[index] = EcommerceError(f"order could not be stored: {exc}")
+
+    def _build_order(
+        self,
+        order_id: UUID,
+        user_id: UUID,
+        items: Sequence[Tuple[UUID, int]],
+        products: Mapping[UUID, ProductRecord],
+    ) -> Tuple[OrderRecord, List[OrderItemRecord]]:
         total_cents = 0
-        pending_items: List[OrderItemRecord] = []
+        order_items: List[OrderItemRecord] = []
         for product_id, quantity in items:
-            product = self.products.get_by_id(product_id)
+            product = products.get(product_id)
             if product is None:
                 raise ValidationError(f"product {product_id} does not exist")
             total_cents += product.price_cents * quantity
-            pending_items.append(
+            order_items.append(
                 OrderItemRecord(
                     id=uuid4(),
-                    order_id=uuid4(),
+                    order_id=order_id,
                     product_id=product_id,
                     quantity=quantity,
                     price_cents=product.price_cents,
                 )
             )
-        order_id = uuid4()
-        order_items = [
-            OrderItemRecord(
-                id=item.id,
-                order_id=order_id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price_cents=item.price_cents,
-            )
-            for item in pending_items
-        ]
         order = OrderRecord(
             id=order_id,
             user_id=user_id,
@@ -138,26 +377,67 @@ class EcommerceService:
             status="created",
             created_at=datetime.utcnow(),
         )
-        self.orders.create(order, order_items)
-        return order
+        return order, order_items
 
     def list_orders(self, user_id: UUID) -> List[OrderRecord]:
         return self.orders.list_by_user(user_id)
 
+    def list_orders_page(
+        self, user_id: UUID, limit: int, cursor: Optional[str] = None
+    ) -> Page[OrderRecord]:
+        return self._paginate(
+            lambda limit, after: self.orders.list_by_user(user_id, limit=limit, after=after),
+            limit,
+            cursor,
+        )
+
     def list_order_items(self, order_id: UUID) -> List[OrderItemRecord]:
         return self.orders.list_items(order_id)
 
+    def iter_orders_with_items(
+        self, user_id: UUID, batch_size: int = STREAM_BATCH_SIZE
+    ) -> Generator[List[Tuple[OrderRecord, List[OrderItemRecord]]], None, None]:
+        """Stream a user's orders with items, one batch of orders at a time.
+
+        Like the order batches, each item lookup checks out its own
+        connection, so none is held between batches.
+        """
+
+        for batch in self.orders.iter_batches_by_user(user_id, batch_size):
+            yield self.attach_order_items(batch)
+
+    def attach_order_items(
+        self, orders: Sequence[OrderRecord]
+    ) -> List[Tuple[OrderRecord, List[OrderItemRecord]]]:
+        items = self.orders.list_items_for_orders(order.id for order in orders)
+        return [(order, items[order.id]) for order in orders]
+
     def recommend_products(self, user_id: UUID) -> List[ProductRecord]:
-        orders = self.list_orders(user_id)
-        if not orders:
-            products = self.products.list_all()
-        else:
-            categories = []
-            for order in orders:
-                for item in self.list_order_items(order.id):
-                    product = self.products.get_by_id(item.product_id)
-                    if product:
-                        categories.append(product.category)
-            category = max(categories, key=categories.count) if categories else None
-            products = self.products.list_by_category(category) if category else self.products.list_all()
-        return products[: self.settings.recommendations_per_user]
+        """Newest products in the user's most purchased category, else newest overall."""
+
+        limit = self.settings.recommendations_per_user
+        category = self.affinity.top_category(user_id)
+        if category is None:
+            return self.products.list_all(limit=limit)
+        return self.products.list_by_category(category, limit=limit)
+
+    def _paginate(
+        self,
+        fetch: Callable[..., List[_T]],
+        limit: int,
+        cursor: Optional[str],
+    ) -> Page[_T]:
+        """Fetch one keyset page, reading a single extra row to detect the end."""
+
+        if limit < 1:
+            raise ValidationError("limit must be positive")
+        limit = min(limit, self.settings.max_page_size)
+        try:
+            after = Cursor.decode(cursor) if cursor else None
+        except ValueError as exc:
+            raise ValidationError(str(exc)) from exc
+        rows = fetch(limit=limit + 1, after=after)
+        if len(rows) <= limit:
+            return Page(items=rows, next_cursor=None)
+        items = rows[:limit]
+        return Page(items=items, next_cursor=Cursor.after(items[-1]).encode())
@@ -21,6 +21,7 @@ class TestEnvironment:
     service: EcommerceService
 
     def cleanup(self) -> None:
+        self.service.db.close()
         self.temp_dir.cleanup()
 
 
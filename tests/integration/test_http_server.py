@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import http.client
+import json
+import threading
+import time
+import unittest
+from contextlib import closing
+from typing import List
+
+from ecommerce_platform.auth import hash_password
+from ecommerce_platform.server import create_server, make_server
+from tests.helpers import build_test_environment, run_test_server
+
+
+class HttpServerTests(unittest.TestCase):
+    mode = "threaded"
+
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.env.settings = dataclasses.replace(
+            self.env.settings,
+            server_mode=self.mode,
+            http_workers=2,
+            http_keepalive_timeout_seconds=0.5,
+            http_keepalive_max_requests=3,
+            stream_threshold_rows=2,
+        )
+
+    def tearDown(self) -> None:
+        self.env.cleanup()
+
+    def _connect(self, base_url: str) -> http.client.HTTPConnection:
+        host, port = base_url.removeprefix("http://").split(":")
+        return http.client.HTTPConnection(host, int(port), timeout=5)
+
+    def test_keep_alive_reuses_connection_until_limit(self) -> None:
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                sockets = []
+                for expected_close in (False, False, True):
+                    conn.request("GET", "/health")
+                    sockets.append(conn.sock)
+                    response = conn.getresponse()
+                    self.assertEqual(response.version, 11)
+                    self.assertEqual(json.loads(response.read())["status"], "ok")
+                    self.assertEqual(response.will_close, expected_close)
+                self.assertIs(sockets[0], sockets[1])
+                self.assertIs(sockets[1], sockets[2])
+
+    def test_large_listing_is_sent_chunked(self) -> None:
+        for index in range(5):
+            self.env.service.create_product(
+                name=f"Item {index}",
+                description="Streamed",
+                category="bulk",
+                price_cents=100 + index,
+                currency="USD",
+            )
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                conn.request("GET", "/products")
+                response = conn.getresponse()
+                self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+                self.assertEqual(len(json.loads(response.read())), 5)
+                conn.request("GET", "/health")
+                self.assertEqual(conn.getresponse().status, 200)
+
+            with closing(self._connect(base_url)) as conn:
+                conn.request("GET", "/products", headers={"Accept-Encoding": "gzip"})
+                response = conn.getresponse()
+                self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+                self.assertEqual(len(json.loads(gzip.decompress(response.read()))), 5)
+
+    def test_idle_connection_times_out(self) -> None:
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                conn.request("GET", "/health")
+                conn.getresponse().read()
+                time.sleep(1.0)
+                self.assertEqual(conn.sock.recv(1), b"")
+
+    def test_idle_clients_do_not_block_new_ones_forever(self) -> None:
+        with run_test_server(self.env) as base_url:
+            idle = [self._connect(base_url) for _ in range(self.env.settings.http_workers)]
+            try:
+                for conn in idle:
+                    conn.request("GET", "/health")
+                    conn.getresponse().read()
+                with closing(self._connect(base_url)) as conn:
+                    conn.request("GET", "/health")
+                    self.assertEqual(conn.getresponse().status, 200)
+            finally:
+                for conn in idle:
+                    conn.close()
+
+    def test_shutdown_finishes_in_flight_requests_and_closes_idle_ones(self) -> None:
+        server = make_server(self.env.settings)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_address[1]
+        idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        busy = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            idle.request("GET", "/health")
+            idle.getresponse().read()
+            handle, entered = server.api.handle, threading.Event()
+
+            def slow_handle(*args, **kwargs):
+                entered.set()
+                # Still running once shutdown has begun draining.
+                deadline = time.monotonic() + 5
+                while not server.draining and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.1)
+                return handle(*args, **kwargs)
+
+            server.api.handle = slow_handle
+            result = {}
+
+            def in_flight() -> None:
+                busy.request("GET", "/health")
+                response = busy.getresponse()
+                result["status"] = response.status
+                result["connection"] = response.getheader("Connection")
+                response.read()
+
+            client = threading.Thread(target=in_flight)
+            client.start()
+            self.assertTrue(entered.wait(5))
+            started = time.monotonic()
+            server.shutdown()
+            server.server_close()
+            client.join(timeout=5)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(result, {"status": 200, "connection": "close"})
+            self.assertEqual(idle.sock.recv(1), b"")
+        finally:
+            idle.close()
+            busy.close()
+            thread.join(timeout=5)
+
+    def test_non_utf8_body_gets_400(self) -> None:
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                conn.request(
+                    "POST", "/auth/login", b"\xff\xfe{}", {"Content-Type": "application/json"}
+                )
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 400)
+                self.assertEqual(response.getheader("Connection"), "close")
+
+    def test_login_burst_leaves_workers_for_other_routes(self) -> None:
+        settings = dataclasses.replace(
+            self.env.settings, http_workers=8, password_iterations=400_000, rate_limits=()
+        )
+        digest, salt = hash_password("password123", iterations=settings.password_iterations)
+        self.env.service.create_user("burst@example.com", "burst", digest, salt)
+        server = make_server(settings)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_address[1]
+        statuses: List[int] = []
+
+        def login() -> None:
+            with closing(http.client.HTTPConnection("127.0.0.1", port, timeout=30)) as conn:
+                body = json.dumps({"username": "burst", "password": "password123"})
+                conn.request("POST", "/auth/login", body, {"Content-Type": "application/json"})
+                statuses.append(conn.getresponse().status)
+
+        try:
+            burst = [threading.Thread(target=login) for _ in range(24)]
+            for client in burst:
+                client.start()
+            time.sleep(0.1)
+            with closing(http.client.HTTPConnection("127.0.0.1", port, timeout=30)) as conn:
+                started = time.monotonic()
+                conn.request("GET", "/products?limit=5")
+                self.assertEqual(conn.getresponse().status, 200)
+                elapsed = time.monotonic() - started
+            for client in burst:
+                client.join(timeout=30)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+        self.assertLess(elapsed, 0.3)
+        self.assertIn(200, statuses)
+        self.assertIn(503, statuses)
+        self.assertEqual(len(statuses), 24)
+
+
+class AsyncHttpServerTests(HttpServerTests):
+    mode = "asyncio"
+
+    def test_malformed_request_line_gets_400(self) -> None:
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                conn.connect()
+                conn.sock.sendall(b"NONSENSE\r\n\r\n")
+                self.assertTrue(conn.sock.recv(64).startswith(b"HTTP/1.1 400"))
+
+    def test_post_body_is_read_by_content_length(self) -> None:
+        with run_test_server(self.env) as base_url:
+            with closing(self._connect(base_url)) as conn:
+                body = json.dumps({"username": "nobody", "password": "x"})
+                conn.request(
+                    "POST", "/auth/login", body, {"Content-Type": "application/json"}
+                )
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 401)
+                conn.request("GET", "/health")
+                self.assertEqual(conn.getresponse().status, 200)
+
+
+class ServerModeTests(unittest.TestCase):
+    def test_unknown_mode_is_rejected(self) -> None:
+        env = build_test_environment()
+        try:
+            env.settings = dataclasses.replace(env.settings, server_mode="forking")
+            with self.assertRaises(ValueError):
+                create_server(env.settings)
+        finally:
+            env.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
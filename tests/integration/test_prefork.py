@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import List
+from urllib import request
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@unittest.skipUnless(hasattr(os, "fork") and hasattr(signal, "SIGHUP"), "prefork needs POSIX")
+class PreforkServerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        env = dict(os.environ)
+        env.update(
+            PYTHONPATH=str(ROOT / "src"),
+            DATABASE_URL=f"sqlite:///{Path(self.temp_dir.name) / 'ecommerce.db'}",
+            PORT="0",
+            DB_BUSY_TIMEOUT_MS="5000",
+            # Makes a signup take long enough to still be running when signalled.
+            PASSWORD_ITERATIONS="2000000",
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "ecommerce_platform.cli", "serve", "--workers", "2"],
+            cwd=self.temp_dir.name,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        self.lines: "queue.Queue[str]" = queue.Queue()
+        self.backlog: List[str] = []
+        self.pump = threading.Thread(target=self._pump, daemon=True)
+        self.pump.start()
+        banner = self._wait_for(r"Serving API on http://0\.0\.0\.0:(\d+)")
+        self.base_url = f"http://127.0.0.1:{banner.group(1)}"
+        self.workers = self._ready(2)
+
+    def tearDown(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.pump.join(timeout=5)
+        self.process.stdout.close()
+        self.temp_dir.cleanup()
+
+    def _pump(self) -> None:
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip("\n"))
+
+    def _wait_for(self, pattern: str, timeout: float = 10.0) -> re.Match:
+        """Return the first unconsumed output line matching ``pattern``."""
+
+        for index, line in enumerate(self.backlog):
+            matched = re.search(pattern, line)
+            if matched:
+                del self.backlog[index]
+                return matched
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.fail(f"timed out waiting for {pattern!r}")
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            matched = re.search(pattern, line)
+            if matched:
+                return matched
+            self.backlog.append(line)
+
+    def _health(self) -> str:
+        with request.urlopen(f"{self.base_url}/health", timeout=5) as response:
+            return json.loads(response.read())["status"]
+
+    def _ready(self, count: int) -> List[int]:
+        return [int(self._wait_for(r"worker (\d+) ready").group(1)) for _ in range(count)]
+
+    def test_crashed_worker_is_respawned(self) -> None:
+        self.assertEqual(self._health(), "ok")
+        os.kill(self.workers[0], signal.SIGKILL)
+        self._wait_for(rf"worker {self.workers[0]} exited unexpectedly")
+        (replacement,) = self._ready(1)
+        self.assertNotIn(replacement, self.workers)
+        for _ in range(4):
+            self.assertEqual(self._health(), "ok")
+
+    def test_sighup_replaces_workers_and_sigterm_exits(self) -> None:
+        self.process.send_signal(signal.SIGHUP)
+        replacements = self._ready(2)
+        self.assertFalse(set(replacements) & set(self.workers))
+        stopped = {int(self._wait_for(r"worker (\d+) stopped").group(1)) for _ in range(2)}
+        self.assertEqual(stopped, set(self.workers))
+        self.assertEqual(self._health(), "ok")
+
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(timeout=15), 0)
+
+    def _slow_signup(self, name: str) -> "queue.Queue[object]":
+        """Start a signup in the background; its status or error lands in the queue."""
+
+        outcome: "queue.Queue[object]" = queue.Queue()
+        body = json.dumps(
+            {"username": name, "email": f"{name}@example.com", "password": "password123"}
+        ).encode()
+
+        def send() -> None:
+            req = request.Request(
+                f"{self.base_url}/auth/signup",
+                data=body,
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with request.urlopen(req, timeout=15) as response:
+                    outcome.put(response.status)
+            except Exception as exc:  # surfaced by the assertion below
+                outcome.put(exc)
+
+        threading.Thread(target=send, daemon=True).start()
+        time.sleep(0.3)
+        return outcome
+
+    def test_in_flight_request_survives_sighup_and_sigterm(self) -> None:
+        outcome = self._slow_signup("restart")
+        self.process.send_signal(signal.SIGHUP)
+        self.assertEqual(outcome.get(timeout=15), 200)
+        self._ready(2)
+        for _ in range(2):
+            self._wait_for(r"worker (\d+) stopped")
+
+        outcome = self._slow_signup("stop")
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(outcome.get(timeout=15), 200)
+        self.assertEqual(self.process.wait(timeout=15), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
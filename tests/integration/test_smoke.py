@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import dataclasses
 import unittest
+from urllib import error, request
 
 from tests.helpers import build_test_environment, json_request, run_test_server
 
@@ -13,6 +15,13 @@ class SmokeTests(unittest.TestCase):
         self.env.cleanup()
 
     def test_smoke_flow(self) -> None:
+        self._run_smoke_flow()
+
+    def test_smoke_flow_asyncio(self) -> None:
+        self.env.settings = dataclasses.replace(self.env.settings, server_mode="asyncio")
+        self._run_smoke_flow()
+
+    def _run_smoke_flow(self) -> None:
         with run_test_server(self.env) as base_url:
             status, payload = json_request("GET", f"{base_url}/health")
             self.assertEqual(status, 200)
@@ -56,6 +65,19 @@ class SmokeTests(unittest.TestCase):
             self.assertEqual(status, 200)
             self.assertTrue(any(item["id"] == product_id for item in payload))
 
+            with request.urlopen(f"{base_url}/products") as response:
+                etag = response.headers["ETag"]
+            conditional = request.Request(
+                f"{base_url}/products", headers={"If-None-Match": etag}
+            )
+            with self.assertRaises(error.HTTPError) as ctx:
+                request.urlopen(conditional)
+            self.assertEqual(ctx.exception.code, 304)
+
+            status, payload = json_request("GET", f"{base_url}/products?limit=1")
+            self.assertEqual(status, 200)
+            self.assertEqual([item["id"] for item in payload], [product_id])
+
             status, payload = json_request(
                 "POST",
                 f"{base_url}/orders",
@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import json
+import threading
+import unittest
+import unittest.mock
+from uuid import UUID, uuid4
+
+from ecommerce_platform.api import EcommerceAPI
+from ecommerce_platform.auth import HasherBusyError
+from ecommerce_platform.config import parse_rate_limits
+from tests.helpers import build_test_environment
+
+
+class ApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.api = EcommerceAPI(self.env.settings)
+
+    def tearDown(self) -> None:
+        self.api.close()
+        self.env.cleanup()
+
+    def _create_product(self, name: str) -> None:
+        response = self.api.handle(
+            "POST",
+            "/products",
+            json.dumps(
+                {
+                    "name": name,
+                    "description": name,
+                    "category": "kitchen",
+                    "price_cents": 1000,
+                }
+            ),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_route_and_wrong_method(self) -> None:
+        missing = self.api.handle("GET", "/missing", None)
+        self.assertEqual(missing.status_code, 404)
+        wrong = self.api.handle("DELETE", "/products", None)
+        self.assertEqual(wrong.status_code, 405)
+        self.assertEqual(wrong.headers["Allow"], "GET, POST")
+        wrong = self.api.handle("POST", f"/orders/{'0' * 32}", None)
+        self.assertEqual(wrong.status_code, 405)
+        self.assertEqual(wrong.headers["Allow"], "GET")
+
+    def test_path_parameter_is_validated(self) -> None:
+        response = self.api.handle("GET", "/recommendations/not-a-uuid", None)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.body), {"error": "invalid user_id"})
+
+    def test_products_etag_and_not_modified(self) -> None:
+        self._create_product("Mug")
+        first = self.api.handle("GET", "/products", None)
+        etag = first.headers["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        again = self.api.handle("GET", "/products", None)
+        self.assertIs(again, first)
+
+        cached = self.api.handle("GET", "/products", None, {"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.body, b"")
+        self.assertEqual(cached.headers["ETag"], etag)
+
+        weak = self.api.handle("GET", "/products", None, {"if-none-match": f'"x", W/{etag}'})
+        self.assertEqual(weak.status_code, 304)
+
+    def test_create_product_changes_etag(self) -> None:
+        self._create_product("Mug")
+        etag = self.api.handle("GET", "/products", None).headers["ETag"]
+        self._create_product("Pan")
+        response = self.api.handle("GET", "/products", None, {"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(json.loads(response.body)), 2)
+
+    def test_paginated_products_have_etag(self) -> None:
+        for name in ("Mug", "Pan", "Pot"):
+            self._create_product(name)
+        first = self.api.handle("GET", "/products?limit=2", None)
+        cursor = first.headers["X-Next-Cursor"]
+        second = self.api.handle("GET", f"/products?limit=2&cursor={cursor}", None)
+        self.assertEqual(len(json.loads(second.body)), 1)
+        repeat = self.api.handle(
+            "GET",
+            f"/products?limit=2&cursor={cursor}",
+            None,
+            {"If-None-Match": second.headers["ETag"]},
+        )
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_gzip_negotiation(self) -> None:
+        for index in range(10):
+            self._create_product(f"Product number {index}")
+        plain = self.api.handle("GET", "/products", None)
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.headers["Vary"], "Accept-Encoding")
+
+        accept = {"Accept-Encoding": "br;q=1.0, gzip;q=0.8"}
+        compressed = self.api.handle("GET", "/products", None, accept)
+        self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+        self.assertEqual(compressed.headers["Content-Length"], str(len(compressed.body)))
+        self.assertEqual(gzip.decompress(compressed.body), plain.body)
+        self.assertEqual(compressed.headers["ETag"], "W/" + plain.headers["ETag"])
+        self.assertLess(len(compressed.body), len(plain.body))
+
+        self.assertIs(self.api.handle("GET", "/products", None, accept), compressed)
+        refused = self.api.handle("GET", "/products", None, {"Accept-Encoding": "gzip;q=0, *"})
+        self.assertNotIn("Content-Encoding", refused.headers)
+
+        revalidated = self.api.handle(
+            "GET", "/products", None, dict(accept, **{"If-None-Match": compressed.headers["ETag"]})
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_small_bodies_are_not_compressed(self) -> None:
+        response = self.api.handle("GET", "/health", None, {"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertNotIn("Vary", response.headers)
+
+    def test_saturated_password_hasher_returns_503(self) -> None:
+        signup = json.dumps({"email": "a@example.com", "username": "alice", "password": "pw"})
+        with unittest.mock.patch.object(
+            self.api.service.passwords, "hash", side_effect=HasherBusyError("busy")
+        ):
+            response = self.api.handle("POST", "/auth/signup", signup)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        metrics = json.loads(self.api.handle("GET", "/metrics", None).body)
+        self.assertEqual(metrics["password_hashing"]["workers"], 2)
+
+    def test_exhausted_connection_pool_returns_503(self) -> None:
+        pool = self.api.db.pool
+        pool.max_size, pool._acquire_timeout = 1, 0.05
+        held, release = threading.Event(), threading.Event()
+
+        def hold_connection() -> None:
+            with pool.connection():
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_connection)
+        holder.start()
+        held.wait(5)
+        try:
+            response = self.api.handle("GET", "/products", None)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.api.handle("GET", "/products", None).status_code, 200)
+
+    def test_login_is_rate_limited_per_ip_and_per_user(self) -> None:
+        self.api.close()
+        self.env.settings = dataclasses.replace(
+            self.env.settings,
+            rate_limits=parse_rate_limits("POST /auth/login|ip=3/60,POST /auth/login|user=2/60"),
+        )
+        self.api = EcommerceAPI(self.env.settings)
+
+        def login(username: str, client_ip: str):
+            body = json.dumps({"username": username, "password": "wrong"})
+            return self.api.handle("POST", "/auth/login", body, client_ip=client_ip)
+
+        self.assertEqual(login("alice", "10.0.0.1").status_code, 401)
+        self.assertEqual(login("alice", "10.0.0.2").status_code, 401)
+        blocked = login("alice", "10.0.0.3")
+        self.assertEqual(blocked.status_code, 429)
+        self.assertEqual(blocked.headers["Retry-After"], "30")
+
+        self.assertEqual(login("bob", "10.0.0.1").status_code, 401)
+        self.assertEqual(login("carol", "10.0.0.1").status_code, 401)
+        self.assertEqual(login("dave", "10.0.0.1").status_code, 429)
+        health = self.api.handle("GET", "/health", None, client_ip="10.0.0.1")
+        self.assertEqual(health.status_code, 200)
+        metrics = json.loads(self.api.handle("GET", "/metrics", None).body)
+        self.assertEqual(metrics["rate_limits"]["rejected"], 2)
+
+
+class AuthApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.env.settings = dataclasses.replace(self.env.settings, require_auth=True)
+        self.api = EcommerceAPI(self.env.settings)
+        signup = {"email": "auth@example.com", "username": "auth", "password": "password123"}
+        self.assertEqual(self.api.handle("POST", "/auth/signup", json.dumps(signup)).status_code, 200)
+        login = self.api.handle(
+            "POST", "/auth/login", json.dumps({"username": "auth", "password": "password123"})
+        )
+        payload = json.loads(login.body)
+        self.user_id = payload["user_id"]
+        self.bearer = {"Authorization": f"Bearer {payload['token']}"}
+
+    def tearDown(self) -> None:
+        self.api.close()
+        self.env.cleanup()
+
+    def test_user_routes_require_the_owners_token(self) -> None:
+        path = f"/recommendations/{self.user_id}"
+        self.assertEqual(self.api.handle("GET", path, None).status_code, 401)
+        self.assertEqual(self.api.handle("GET", path, None, self.bearer).status_code, 200)
+        self.assertEqual(
+            self.api.handle("GET", f"/orders/{self.user_id}", None, self.bearer).status_code, 200
+        )
+        other = self.api.handle("GET", f"/orders/{uuid4()}", None, self.bearer)
+        self.assertEqual(other.status_code, 403)
+        order = json.dumps({"user_id": str(uuid4()), "items": []})
+        self.assertEqual(self.api.handle("POST", "/orders", order, self.bearer).status_code, 403)
+
+    def test_invalid_tokens_are_rejected_and_valid_ones_cached(self) -> None:
+        path = f"/orders/{self.user_id}"
+        forged = {"Authorization": self.bearer["Authorization"][:-2] + "xx"}
+        for headers in (forged, {"Authorization": "Basic abc"}):
+            self.assertEqual(self.api.handle("GET", path, None, headers).status_code, 401)
+        for _ in range(3):
+            self.assertEqual(self.api.handle("GET", path, None, self.bearer).status_code, 200)
+        tokens = json.loads(self.api.handle("GET", "/metrics", None).body)["caches"]["tokens"]
+        self.assertEqual((tokens["entries"], tokens["hits"]), (1, 2))
+
+    def test_batch_items_inherit_the_token(self) -> None:
+        batch = {"requests": [{"method": "GET", "path": f"/orders/{self.user_id}"}]}
+        response = self.api.handle("POST", "/batch", json.dumps(batch), self.bearer)
+        self.assertEqual(json.loads(response.body)["responses"][0]["status"], 200)
+
+
+class BatchApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.api = EcommerceAPI(self.env.settings)
+
+    def tearDown(self) -> None:
+        self.api.close()
+        self.env.cleanup()
+
+    def _batch(self, requests, **options):
+        response = self.api.handle("POST", "/batch", json.dumps({"requests": requests, **options}))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.body)
+
+    def _product(self, name: str):
+        return {
+            "method": "POST",
+            "path": "/products",
+            "body": {"name": name, "description": name, "category": "kitchen", "price_cents": 500},
+        }
+
+    def test_reads_see_earlier_writes_and_report_per_item_status(self) -> None:
+        result = self._batch(
+            [
+                {"method": "GET", "path": "/health"},
+                self._product("Mug"),
+                {"method": "GET", "path": "/products?limit=1"},
+                {"method": "GET", "path": "/recommendations/not-a-uuid"},
+                {"method": "GET", "path": "/missing"},
+            ]
+        )
+        self.assertNotIn("committed", result)
+        statuses = [item["status"] for item in result["responses"]]
+        self.assertEqual(statuses, [200, 200, 200, 400, 404])
+        created = result["responses"][1]["body"]
+        self.assertEqual([item["id"] for item in result["responses"][2]["body"]], [created["id"]])
+        self.assertIn("ETag", result["responses"][2]["headers"])
+
+    def test_transaction_rolls_back_on_first_failure(self) -> None:
+        self.assertEqual(json.loads(self.api.handle("GET", "/products", None).body), [])
+        result = self._batch(
+            [
+                self._product("Mug"),
+                {"method": "GET", "path": "/products"},
+                {"method": "POST", "path": "/orders", "body": {"user_id": str(uuid4()), "items": []}},
+                self._product("Pan"),
+            ],
+            transaction=True,
+        )
+        self.assertFalse(result["committed"])
+        statuses = [item["status"] for item in result["responses"]]
+        self.assertEqual(statuses, [200, 200, 400, 424])
+        self.assertEqual(len(result["responses"][1]["body"]), 1)
+        self.assertEqual(json.loads(self.api.handle("GET", "/products", None).body), [])
+
+    def test_transaction_commits_when_every_item_succeeds(self) -> None:
+        result = self._batch([self._product("Mug"), self._product("Pan")], transaction=True)
+        self.assertTrue(result["committed"])
+        self.assertEqual(len(json.loads(self.api.handle("GET", "/products", None).body)), 2)
+
+    def test_read_during_transaction_does_not_cache_stale_listing(self) -> None:
+        self.api.handle("POST", "/batch", json.dumps({"requests": [self._product("Mug")]}))
+        create = self.api.service.products.create
+        concurrent = []
+
+        def create_then_read(record):
+            create(record)
+            # Another client lists the catalog before the batch commits.
+            reader = threading.Thread(
+                target=lambda: concurrent.append(self.api.handle("GET", "/products", None))
+            )
+            reader.start()
+            reader.join()
+
+        with unittest.mock.patch.object(
+            self.api.service.products, "create", side_effect=create_then_read
+        ):
+            result = self._batch([self._product("Pan")], transaction=True)
+        self.assertTrue(result["committed"])
+        self.assertEqual(len(json.loads(concurrent[0].body)), 1)
+        self.assertEqual(len(json.loads(self.api.handle("GET", "/products", None).body)), 2)
+
+    def test_writer_blocked_by_transaction_gets_503(self) -> None:
+        self.api.close()
+        self.env.settings = dataclasses.replace(self.env.settings, db_busy_timeout_ms=50)
+        self.api = EcommerceAPI(self.env.settings)
+        create = self.api.service.products.create
+        blocked = []
+        signup = json.dumps({"email": "w@example.com", "username": "writer", "password": "pw"})
+
+        def create_then_write(record):
+            create(record)
+            writer = threading.Thread(
+                target=lambda: blocked.append(self.api.handle("POST", "/auth/signup", signup))
+            )
+            writer.start()
+            writer.join()
+
+        with unittest.mock.patch.object(
+            self.api.service.products, "create", side_effect=create_then_write
+        ):
+            result = self._batch([self._product("Pan")], transaction=True)
+        self.assertTrue(result["committed"])
+        self.assertEqual(blocked[0].status_code, 503)
+        self.assertEqual(blocked[0].headers["Retry-After"], "1")
+        self.assertEqual(self.api.handle("POST", "/auth/signup", signup).status_code, 200)
+
+    def test_transaction_rejects_password_routes(self) -> None:
+        login = {"method": "POST", "path": "/auth/login", "body": {"username": "a", "password": "b"}}
+        response = self.api.handle(
+            "POST",
+            "/batch",
+            json.dumps({"requests": [self._product("Mug"), login], "transaction": True}),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("/auth/login", json.loads(response.body)["error"])
+        self.assertEqual(json.loads(self.api.handle("GET", "/products", None).body), [])
+        self.assertEqual(self._batch([login])["responses"][0]["status"], 401)
+
+    def test_invalid_batches_are_rejected(self) -> None:
+        for payload in (
+            {"requests": []},
+            {"requests": [{"method": "GET"}]},
+            {"requests": [{"method": "POST", "path": "/batch", "body": {"requests": []}}]},
+            {"requests": [{"method": "GET", "path": "/health"}] * 51},
+        ):
+            response = self.api.handle("POST", "/batch", json.dumps(payload))
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class StreamingApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.env.settings = dataclasses.replace(self.env.settings, stream_threshold_rows=2)
+        self.api = EcommerceAPI(self.env.settings)
+        self.products = [
+            self.env.service.create_product(
+                name=f"Item {index}",
+                description="Streamed",
+                category="bulk",
+                price_cents=100 + index,
+                currency="USD",
+            )
+            for index in range(5)
+        ]
+
+    def tearDown(self) -> None:
+        self.api.close()
+        self.env.cleanup()
+
+    def test_large_product_listing_is_streamed(self) -> None:
+        response = self.api.handle("GET", "/products", None)
+        self.assertIsNotNone(response.stream)
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertIn("ETag", response.headers)
+        body = response.buffered().body
+        paged = self.api.handle("GET", "/products?limit=10", None).body
+        self.assertEqual(body, paged)
+        self.assertEqual(len(json.loads(body)), 5)
+
+    def test_streamed_listing_answers_conditional_get(self) -> None:
+        etag = self.api.handle("GET", "/products", None).headers["ETag"]
+        with unittest.mock.patch.object(self.api.service, "iter_products") as iter_products:
+            response = self.api.handle("GET", "/products", None, {"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        iter_products.assert_not_called()
+
+        gzipped = self.api.handle("GET", "/products", None, {"Accept-Encoding": "gzip"})
+        self.assertEqual(gzipped.headers["ETag"], f"W/{etag}")
+        gzipped.stream.close()
+
+        created = self.api.handle(
+            "POST",
+            "/products",
+            json.dumps(
+                {"name": "New", "description": "Streamed", "category": "bulk", "price_cents": 999}
+            ),
+        )
+        self.assertEqual(created.status_code, 200)
+        response = self.api.handle("GET", "/products", None, {"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(json.loads(response.buffered().body)), 6)
+
+    def test_small_listing_stays_buffered(self) -> None:
+        response = self.api.handle("GET", "/products?limit=2", None)
+        self.assertIsNone(response.stream)
+        self.assertIn("ETag", response.headers)
+
+    def test_order_history_is_streamed(self) -> None:
+        user = self.env.service.create_user(
+            email="stream@example.com",
+            username="stream",
+            password_hash="hash",
+            password_salt="salt",
+        )
+        for product in self.products:
+            self.env.service.create_order(user.id, [(product.id, 1)])
+        response = self.api.handle("GET", f"/orders/{user.id}", None)
+        self.assertIsNotNone(response.stream)
+        orders = json.loads(response.buffered().body)
+        self.assertEqual(len(orders), 5)
+        self.assertEqual(
+            {UUID(order["items"][0]["product_id"]) for order in orders},
+            {product.id for product in self.products},
+        )
+
+    def test_streamed_listing_is_gzipped_incrementally(self) -> None:
+        plain = self.api.handle("GET", "/products", None).buffered().body
+        response = self.api.handle("GET", "/products", None, {"Accept-Encoding": "gzip"})
+        self.assertIsNotNone(response.stream)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.buffered().body), plain)
+
+    def test_stream_holds_no_connection_between_batches(self) -> None:
+        pool = self.api.db.pool
+        for path in ("/products", f"/orders/{self._user_with_orders().id}"):
+            response = self.api.handle("GET", path, None)
+            self.assertIsNone(pool.current(), path)
+            next(response.stream)
+            self.assertIsNone(pool.current(), path)
+            self.assertEqual(pool.idle, pool.size, path)
+            response.stream.close()
+
+    def _user_with_orders(self):
+        user = self.env.service.create_user(
+            email="pool@example.com",
+            username="pool",
+            password_hash="hash",
+            password_salt="salt",
+        )
+        for product in self.products:
+            self.env.service.create_order(user.id, [(product.id, 1)])
+        return user
+
+
+if __name__ == "__main__":
+    unittest.main()
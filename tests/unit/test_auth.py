@@ -1,9 +1,20 @@
 from __future__ import annotations
 
+import hashlib
+import threading
 import unittest
+import unittest.mock
 from datetime import datetime, timedelta
 
-from ecommerce_platform.auth import hash_password, issue_token, verify_password
+from ecommerce_platform.auth import (
+    HasherBusyError,
+    PasswordHasher,
+    hash_password,
+    issue_token,
+    password_iterations,
+    verify_password,
+    verify_token,
+)
 
 
 class AuthTests(unittest.TestCase):
@@ -14,12 +25,63 @@ class AuthTests(unittest.TestCase):
         self.assertTrue(verify_password("supersecret", digest, salt))
         self.assertFalse(verify_password("wrong", digest, salt))
 
+    def test_digest_records_iterations_and_legacy_digests_verify(self) -> None:
+        digest, salt = hash_password("supersecret", iterations=1_000)
+        self.assertEqual(password_iterations(digest), 1_000)
+        self.assertTrue(verify_password("supersecret", digest, salt))
+        legacy = hashlib.pbkdf2_hmac("sha256", b"supersecret", salt.encode(), 120_000).hex()
+        self.assertEqual(password_iterations(legacy), 120_000)
+        self.assertTrue(verify_password("supersecret", legacy, salt))
+
+    def test_hasher_rejects_work_beyond_its_queue(self) -> None:
+        hasher = PasswordHasher(iterations=1_000, workers=1, max_queued=0)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash(*args):
+            started.set()
+            release.wait(5)
+            return "digest", "salt"
+
+        try:
+            with unittest.mock.patch("ecommerce_platform.auth.hash_password", slow_hash):
+                worker = threading.Thread(target=hasher.hash, args=("first",))
+                worker.start()
+                started.wait(5)
+                with self.assertRaises(HasherBusyError):
+                    hasher.hash("second")
+                self.assertEqual(hasher.stats()["in_flight"], 1)
+                release.set()
+                worker.join(5)
+            digest, salt = hasher.hash("third")
+            self.assertTrue(hasher.verify("third", digest, salt))
+            stats = hasher.stats()
+            self.assertEqual((stats["completed"], stats["rejected"]), (3, 1))
+            self.assertFalse(hasher.needs_rehash(digest))
+        finally:
+            hasher.close()
+
     def test_issue_token_has_ttl(self) -> None:
         token = issue_token("user-1", "secret", 10)
         self.assertTrue(token.value)
         self.assertGreater(token.expires_at, datetime.utcnow())
         self.assertLessEqual(token.expires_at, datetime.utcnow() + timedelta(minutes=10, seconds=5))
 
+    def test_token_verifies_without_storage(self) -> None:
+        token = issue_token("user-1", "secret", 10, now=1_000)
+        claims = verify_token(token.value, "secret", now=1_001)
+        self.assertIsNotNone(claims)
+        self.assertEqual((claims.user_id, claims.expires), ("user-1", 1_600))
+
+    def test_tampered_expired_or_foreign_tokens_are_rejected(self) -> None:
+        token = issue_token("user-1", "secret", 10, now=1_000).value
+        user_id, expires, signature = token.split(".")
+        self.assertIsNone(verify_token(token, "other-secret", now=1_001))
+        self.assertIsNone(verify_token(token, "secret", now=1_600))
+        self.assertIsNone(verify_token(f"user-2.{expires}.{signature}", "secret", now=1_001))
+        self.assertIsNone(verify_token(f"{user_id}.9999999.{signature}", "secret", now=1_001))
+        for garbage in ("", "abc", "a.b.c", f"{user_id}.{expires}.\u00e9"):
+            self.assertIsNone(verify_token(garbage, "secret", now=1_001))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import unittest
+
+from ecommerce_platform.cache import TTLCache
+from ecommerce_platform.repositories import CachedProductRepository
+from tests.helpers import build_test_environment
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_lru_eviction(self) -> None:
+        cache: TTLCache[int] = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats(), {"entries": 2, "hits": 2, "misses": 1, "evictions": 1})
+
+    def test_entries_expire(self) -> None:
+        clock = FakeClock()
+        cache: TTLCache[int] = TTLCache(max_entries=4, ttl_seconds=5, clock=clock)
+        cache.set("a", 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 5.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class CatalogCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.service = self.env.service
+
+    def tearDown(self) -> None:
+        self.env.cleanup()
+
+    def _create(self, name: str, category: str = "kitchen"):
+        return self.service.create_product(
+            name=name,
+            description=name,
+            category=category,
+            price_cents=1000,
+            currency="USD",
+        )
+
+    def test_service_uses_cached_catalog(self) -> None:
+        self.assertIsInstance(self.service.products, CachedProductRepository)
+        product = self._create("Mug")
+        self.assertEqual([p.id for p in self.service.list_products()], [product.id])
+        self.assertEqual([p.id for p in self.service.list_products()], [product.id])
+        self.assertEqual(self.service.products.get_by_id(product.id), product)
+        self.assertEqual(self.service.products.get_many([product.id]), {product.id: product})
+        stats = self.service.cache_stats()["catalog"]
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_create_product_invalidates_listings(self) -> None:
+        first = self._create("Mug")
+        self.assertEqual(len(self.service.products.list_by_category("kitchen")), 1)
+        second = self._create("Pan")
+        listed = self.service.products.list_by_category("kitchen")
+        self.assertEqual({p.id for p in listed}, {first.id, second.id})
+
+    def test_cached_listing_is_not_shared(self) -> None:
+        self._create("Mug")
+        self.service.list_products().clear()
+        self.assertEqual(len(self.service.list_products()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
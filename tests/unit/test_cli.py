@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from ecommerce_platform.cli import main
+from tests.helpers import build_test_environment
+
+
+class CliImportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.workdir = Path(self.env.temp_dir.name)
+        patcher = unittest.mock.patch.dict(
+            "os.environ", {"DATABASE_URL": self.env.settings.database_url}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.env.cleanup()
+
+    def _run(self, *argv: str) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(["--env-file", str(self.workdir / "missing.env"), *argv])
+        return output.getvalue()
+
+    def test_import_products_from_ndjson(self) -> None:
+        source = self.workdir / "catalog.ndjson"
+        lines = [
+            json.dumps(
+                {
+                    "name": f"Item {index}",
+                    "description": "Imported",
+                    "category": "bulk",
+                    "price_cents": 500 + index,
+                }
+            )
+            for index in range(5)
+        ]
+        source.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+        output = self._run("import-products", str(source), "--batch-size", "2")
+        self.assertIn("Imported 5 rows", output)
+        self.assertEqual(output.count("committed"), 3)
+        self.assertEqual(len(self.env.service.list_products()), 5)
+
+    def test_import_users_from_csv(self) -> None:
+        source = self.workdir / "users.csv"
+        source.write_text(
+            "email,username,password_hash,password_salt\n"
+            "a@example.com,alpha,hash,salt\n"
+            "b@example.com,bravo,hash,salt\n",
+            encoding="utf-8",
+        )
+        output = self._run("import-users", str(source))
+        self.assertIn("Imported 2 rows", output)
+        self.assertIsNotNone(self.env.service.users.get_by_username("bravo"))
+
+    def test_import_reports_invalid_rows(self) -> None:
+        source = self.workdir / "catalog.ndjson"
+        source.write_text('{"name": "Only a name"}\n', encoding="utf-8")
+        with self.assertRaises(SystemExit) as ctx:
+            self._run("import-products", str(source))
+        self.assertIn("missing field", str(ctx.exception.code))
+
+    def test_import_reports_constraint_violations(self) -> None:
+        source = self.workdir / "catalog.csv"
+        source.write_text(
+            "name,category,price_cents,description\n"
+            "Mug,kitchen,500,Ceramic\n"
+            "Pan,kitchen,900\n",
+            encoding="utf-8",
+        )
+        with self.assertRaises(SystemExit) as ctx:
+            self._run("import-products", str(source), "--batch-size", "1")
+        message = str(ctx.exception.code)
+        self.assertIn("after row 1 was rejected", message)
+        self.assertIn("NOT NULL constraint failed: products.description", message)
+        self.assertEqual(len(self.env.service.list_products()), 1)
+
+
+class CliBenchTests(unittest.TestCase):
+    def test_bench_http_reports_every_route(self) -> None:
+        output = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir, unittest.mock.patch.dict(
+            "os.environ", {"PASSWORD_ITERATIONS": "1000"}
+        ), contextlib.redirect_stdout(output):
+            main(
+                [
+                    "bench-http",
+                    "--env-file",
+                    str(Path(tmpdir) / "missing.env"),
+                    "--clients",
+                    "3",
+                    "--requests",
+                    "60",
+                    "--users",
+                    "2",
+                    "--products",
+                    "3",
+                    "--mix",
+                    "signup=1,login=1,products=1,orders=1,recommendations=1",
+                    "--json",
+                ]
+            )
+        report = json.loads(output.getvalue())
+        self.assertEqual(report["requests"], 60)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(report["target"], "local")
+        self.assertEqual(sum(route["requests"] for route in report["routes"].values()), 60)
+        self.assertEqual(len(report["routes"]), 5)
+        for route in report["routes"].values():
+            self.assertLessEqual(route["p50_ms"], route["p95_ms"])
+            self.assertLessEqual(route["p95_ms"], route["p99_ms"])
+
+    def test_bench_http_rejects_bad_mix(self) -> None:
+        with self.assertRaises(SystemExit) as ctx:
+            main(["bench-http", "--mix", "checkout=5"])
+        self.assertIn("Invalid --mix", str(ctx.exception.code))
+
+
+if __name__ == "__main__":
+    unittest.main()
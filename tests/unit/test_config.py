@@ -5,7 +5,7 @@ import unittest
 import unittest.mock
 from pathlib import Path
 
-from ecommerce_platform.config import load_env_file, load_settings
+from ecommerce_platform.config import RateLimit, load_env_file, load_settings, parse_rate_limits
 
 
 class ConfigTests(unittest.TestCase):
@@ -26,6 +26,60 @@ class ConfigTests(unittest.TestCase):
                 self.assertEqual(settings.env, "test")
                 self.assertTrue(settings.database_url.endswith("override.db"))
 
+    def test_parse_rate_limits(self) -> None:
+        limits = parse_rate_limits("POST /auth/login|user=5/60, *|ip=100/1")
+        self.assertEqual(
+            limits,
+            (RateLimit("POST /auth/login", "user", 5, 60.0), RateLimit("*", "ip", 100, 1.0)),
+        )
+        self.assertEqual(parse_rate_limits(""), ())
+        for spec in ("POST /auth/login=5/60", "*|device=1/1", "*|ip=0/1", "*|ip=5"):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_rate_limits(spec)
+
+    def test_password_hash_queue_leaves_http_workers_free(self) -> None:
+        missing = str(Path(tempfile.gettempdir()) / "missing.env")
+        cases = [
+            ({}, 2),
+            ({"PASSWORD_HASH_QUEUE": "16"}, 6),
+            ({"PASSWORD_HASH_QUEUE": "16", "HTTP_WORKERS": "4"}, 0),
+            ({"PASSWORD_HASH_QUEUE": "1", "HTTP_WORKERS": "64"}, 1),
+        ]
+        for env, expected in cases:
+            with unittest.mock.patch.dict("os.environ", env):
+                settings = load_settings(missing)
+            self.assertEqual(settings.password_hash_queue, expected, env)
+            self.assertLessEqual(
+                settings.password_hash_workers + settings.password_hash_queue,
+                max(settings.http_workers // 2, settings.password_hash_workers),
+            )
+
+    def test_password_hash_workers_are_capped_at_half_the_http_workers(self) -> None:
+        missing = str(Path(tempfile.gettempdir()) / "missing.env")
+        cases = [
+            ({"PASSWORD_HASH_WORKERS": "16"}, (8, 0)),
+            ({"PASSWORD_HASH_WORKERS": "64", "HTTP_WORKERS": "32"}, (16, 0)),
+            ({"PASSWORD_HASH_WORKERS": "4", "HTTP_WORKERS": "1"}, (1, 0)),
+            ({"PASSWORD_HASH_WORKERS": "0"}, (1, 2)),
+        ]
+        for env, expected in cases:
+            with unittest.mock.patch.dict("os.environ", env):
+                settings = load_settings(missing)
+            self.assertEqual(
+                (settings.password_hash_workers, settings.password_hash_queue), expected, env
+            )
+
+    def test_db_pool_size_defaults_to_http_workers(self) -> None:
+        missing = str(Path(tempfile.gettempdir()) / "missing.env")
+        cases = [
+            ({}, 16),
+            ({"HTTP_WORKERS": "32"}, 32),
+            ({"HTTP_WORKERS": "32", "DB_POOL_SIZE": "4"}, 4),
+        ]
+        for env, expected in cases:
+            with unittest.mock.patch.dict("os.environ", env):
+                self.assertEqual(load_settings(missing).db_pool_size, expected, env)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import threading
+import unittest
+import unittest.mock
+
+from ecommerce_platform.db import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    ConnectionPool,
+    Migration,
+    PoolTimeoutError,
+    current_schema_version,
+    db_session,
+    init_db,
+    migrate,
+)
+from tests.helpers import build_test_environment
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.db = self.env.service.db
+
+    def tearDown(self) -> None:
+        self.env.cleanup()
+
+    def test_sessions_reuse_pooled_connection(self) -> None:
+        with db_session(self.db) as first:
+            pass
+        with db_session(self.db) as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(self.db.pool.size, 1)
+
+    def test_connections_are_configured(self) -> None:
+        with db_session(self.db) as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(busy_timeout, self.env.settings.db_busy_timeout_ms)
+
+    def test_nested_sessions_share_transaction(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with db_session(self.db) as outer:
+                outer.execute("UPDATE schema_version SET version = version + 100")
+                with db_session(self.db) as inner:
+                    self.assertIs(inner, outer)
+                    inner.execute("UPDATE schema_version SET version = version + 100")
+                raise RuntimeError("abort")
+        with db_session(self.db) as conn:
+            version = conn.execute("SELECT version FROM schema_version").fetchone()[0]
+        self.assertLess(version, 100)
+
+    def test_pool_is_bounded(self) -> None:
+        pool = ConnectionPool(self.db.connect, max_size=1, acquire_timeout=0.05)
+        self.addCleanup(pool.close)
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold() -> None:
+            with pool.connection():
+                acquired.set()
+                release.wait(timeout=1)
+
+        worker = threading.Thread(target=hold)
+        worker.start()
+        acquired.wait(timeout=1)
+        try:
+            with self.assertRaises(PoolTimeoutError):
+                with pool.connection():
+                    pass
+        finally:
+            release.set()
+            worker.join(timeout=1)
+        with pool.connection() as conn:
+            self.assertIsNotNone(conn)
+        self.assertEqual(pool.size, 1)
+
+    def test_unhealthy_connection_is_replaced(self) -> None:
+        pool = ConnectionPool(self.db.connect, max_size=1, health_check_interval=0)
+        self.addCleanup(pool.close)
+        with pool.connection() as conn:
+            broken = conn
+        broken.close()
+        with pool.connection() as conn:
+            self.assertIsNot(conn, broken)
+            self.assertEqual(conn.execute("SELECT 1").fetchone()[0], 1)
+
+    def test_close_rejects_checkout(self) -> None:
+        with db_session(self.db):
+            pass
+        self.db.close()
+        self.assertEqual(self.db.pool.size, 0)
+        with self.assertRaises(RuntimeError):
+            with db_session(self.db):
+                pass
+
+
+class MigrationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.db = self.env.service.db
+
+    def tearDown(self) -> None:
+        self.env.cleanup()
+
+    def _version(self) -> int:
+        with db_session(self.db) as conn:
+            return current_schema_version(conn)
+
+    def _plan(self, sql: str, params: tuple) -> str:
+        with db_session(self.db) as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " | ".join(row["detail"] for row in rows)
+
+    def test_init_db_applies_all_migrations(self) -> None:
+        versions = [migration.version for migration in MIGRATIONS]
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertEqual(self._version(), SCHEMA_VERSION)
+
+    def test_init_db_skips_ddl_when_schema_is_current(self) -> None:
+        with unittest.mock.patch("ecommerce_platform.db._execute_batch") as execute_batch:
+            init_db(self.env.settings).close()
+        execute_batch.assert_not_called()
+        with db_session(self.db) as conn:
+            conn.execute("UPDATE schema_version SET version = ?", (SCHEMA_VERSION - 1,))
+        init_db(self.env.settings).close()
+        self.assertEqual(self._version(), SCHEMA_VERSION)
+
+    def test_migrate_is_idempotent(self) -> None:
+        self.assertEqual(migrate(self.db), SCHEMA_VERSION)
+        self.assertEqual(self._version(), SCHEMA_VERSION)
+
+    def test_migrate_upgrades_legacy_database(self) -> None:
+        with db_session(self.db) as conn:
+            conn.execute("DROP INDEX idx_orders_user_created_id")
+            conn.execute("UPDATE schema_version SET version = 1")
+        self.assertEqual(migrate(self.db), SCHEMA_VERSION)
+        plan = self._plan("SELECT * FROM orders WHERE user_id = ? ORDER BY created_at DESC", ("u",))
+        self.assertIn("idx_orders_user_created_id", plan)
+
+    def test_failed_migration_rolls_back(self) -> None:
+        broken = tuple(MIGRATIONS) + (
+            Migration(SCHEMA_VERSION + 1, "broken", ("CREATE INDEX idx_x ON missing (id)",)),
+        )
+        with self.assertRaises(Exception):
+            migrate(self.db, broken)
+        self.assertEqual(self._version(), SCHEMA_VERSION)
+
+    def test_newer_database_is_rejected(self) -> None:
+        with db_session(self.db) as conn:
+            conn.execute("UPDATE schema_version SET version = ?", (SCHEMA_VERSION + 1,))
+        with self.assertRaises(RuntimeError):
+            migrate(self.db)
+
+    def test_hot_queries_use_indexes(self) -> None:
+        queries = [
+            (
+                "SELECT * FROM orders WHERE user_id = ? ORDER BY created_at DESC, id DESC",
+                ("u",),
+            ),
+            ("SELECT * FROM order_items WHERE order_id = ?", ("o",)),
+            (
+                "SELECT * FROM products WHERE category = ? AND (created_at, id) < (?, ?)"
+                " ORDER BY created_at DESC, id DESC LIMIT 10",
+                ("c", "2024-01-01", "id"),
+            ),
+            ("SELECT * FROM products ORDER BY created_at DESC, id DESC", ()),
+            ("SELECT * FROM users ORDER BY created_at DESC, id DESC", ()),
+        ]
+        for sql, params in queries:
+            plan = self._plan(sql, params)
+            self.assertIn("USING INDEX", plan, sql)
+            self.assertNotIn("TEMP B-TREE", plan, sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
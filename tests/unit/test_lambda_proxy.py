@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import base64
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from ecommerce_platform import lambda_runtime
+from ecommerce_platform.lambda_proxy import handle_event, proxy_event
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _load_entry_point(relative: str):
+    path = ROOT / "lambda_functions" / relative
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+class LambdaProxyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.environ = unittest.mock.patch.dict(
+            "os.environ",
+            {
+                "DATABASE_URL": f"sqlite:///{Path(self.temp_dir.name) / 'lambda.db'}",
+                "STREAM_THRESHOLD_ROWS": "1",
+            },
+        )
+        self.environ.start()
+
+    def tearDown(self) -> None:
+        lambda_runtime.reset()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def _call(self, *args, **kwargs):
+        response = handle_event(proxy_event(*args, **kwargs))
+        return response["statusCode"], response
+
+    def test_entry_points_share_the_http_contract(self) -> None:
+        signup = _load_entry_point("authentication/signup.py")
+        login = _load_entry_point("authentication/login.py")
+        body = {"email": "l@example.com", "username": "lambda", "password": "password123"}
+        created = signup(proxy_event("POST", "/auth/signup", body), None)
+        self.assertEqual(created["statusCode"], 200)
+        user_id = json.loads(created["body"])["id"]
+        logged_in = login(proxy_event("POST", "/auth/login", body), None)
+        self.assertEqual(json.loads(logged_in["body"])["user_id"], user_id)
+
+        self.assertEqual(self._call("GET", f"/recommendations/{user_id}")[0], 200)
+        self.assertEqual(self._call("GET", "/orders/not-a-uuid")[0], 400)
+        self.assertEqual(self._call("GET", "/missing")[0], 404)
+
+    def test_query_base64_body_and_buffered_streams(self) -> None:
+        for name in ("Mug", "Pan"):
+            product = {"name": name, "description": "x", "category": "kitchen", "price_cents": 500}
+            event = proxy_event("POST", "/products", product)
+            event["body"] = base64.b64encode(event["body"].encode()).decode()
+            event["isBase64Encoded"] = True
+            self.assertEqual(handle_event(event)["statusCode"], 200)
+
+        _, page = self._call("GET", "/products", query={"limit": "1"})
+        self.assertEqual(len(json.loads(page["body"])), 1)
+        self.assertIn("X-Next-Cursor", page["headers"])
+
+        # Over STREAM_THRESHOLD_ROWS and asking for gzip: still one plain body.
+        status, listing = self._call("GET", "/products", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(status, 200)
+        self.assertNotIn("Content-Encoding", listing["headers"])
+        self.assertEqual(len(json.loads(listing["body"])), 2)
+
+    def test_importing_the_adapter_does_not_load_the_api(self) -> None:
+        code = (
+            "import sys, ecommerce_platform.lambda_proxy;"
+            "print('ecommerce_platform.api' in sys.modules)"
+        )
+        env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+        ).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
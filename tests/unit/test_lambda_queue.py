@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import contextlib
+import importlib.util
+import io
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from ecommerce_platform import lambda_runtime
+from ecommerce_platform.auth import hash_password
+from ecommerce_platform.lambda_queue import handle_order_batch, sqs_event
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class LambdaQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.environ = unittest.mock.patch.dict(
+            "os.environ",
+            {"DATABASE_URL": f"sqlite:///{Path(self.temp_dir.name) / 'queue.db'}"},
+        )
+        self.environ.start()
+        self.service = lambda_runtime.get_service()
+        password_hash, salt = hash_password("password123")
+        self.user = self.service.create_user("q@example.com", "queue", password_hash, salt)
+        self.product = self.service.create_product("Mug", "Ceramic", "kitchen", 900, "USD")
+
+    def tearDown(self) -> None:
+        lambda_runtime.reset()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def _order(self, product_id=None, quantity=1):
+        return {
+            "user_id": str(self.user.id),
+            "items": [{"product_id": str(product_id or self.product.id), "quantity": quantity}],
+        }
+
+    def test_only_bad_messages_are_reported(self) -> None:
+        event = sqs_event(
+            [
+                self._order(quantity=2),
+                "not json",
+                {"user_id": str(self.user.id)},
+                self._order(product_id="00000000-0000-0000-0000-000000000001"),
+                self._order(quantity=3),
+            ],
+            message_ids=["ok-1", "bad-json", "no-items", "no-product", "ok-2"],
+        )
+        with contextlib.redirect_stderr(io.StringIO()):
+            result = handle_order_batch(event)
+        self.assertEqual(
+            result,
+            {
+                "batchItemFailures": [
+                    {"itemIdentifier": "bad-json"},
+                    {"itemIdentifier": "no-items"},
+                    {"itemIdentifier": "no-product"},
+                ]
+            },
+        )
+        totals = sorted(order.total_cents for order in self.service.list_orders(self.user.id))
+        self.assertEqual(totals, [1800, 2700])
+
+    def test_redelivered_message_creates_one_order(self) -> None:
+        event = sqs_event([self._order()], message_ids=["message-1"])
+        self.assertEqual(handle_order_batch(event), {"batchItemFailures": []})
+        self.assertEqual(handle_order_batch(event), {"batchItemFailures": []})
+        self.assertEqual(len(self.service.list_orders(self.user.id)), 1)
+
+    def test_storage_failure_reports_the_whole_batch(self) -> None:
+        event = sqs_event([self._order(), self._order()], message_ids=["a", "b"])
+        with unittest.mock.patch.object(
+            self.service, "create_orders", side_effect=RuntimeError("boom")
+        ), unittest.mock.patch("traceback.print_exc"):
+            result = handle_order_batch(event)
+        self.assertEqual(
+            result, {"batchItemFailures": [{"itemIdentifier": "a"}, {"itemIdentifier": "b"}]}
+        )
+
+    def test_entry_point(self) -> None:
+        path = ROOT / "lambda_functions" / "order_processing" / "ingest_orders.py"
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        result = module.lambda_handler(sqs_event([self._order()]), None)
+        self.assertEqual(result, {"batchItemFailures": []})
+        self.assertEqual(len(self.service.list_orders(self.user.id)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from ecommerce_platform import lambda_runtime
+
+
+class LambdaRuntimeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env_file = Path(self.temp_dir.name) / ".env"
+        self.env_file.write_text(
+            f"DATABASE_URL=sqlite:///{Path(self.temp_dir.name) / 'a.db'}\n", encoding="utf-8"
+        )
+        self.environ = unittest.mock.patch.dict("os.environ")
+        self.environ.start()
+        os.environ.pop("DATABASE_URL", None)
+
+    def tearDown(self) -> None:
+        lambda_runtime.reset()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+
+    def test_warm_calls_reuse_the_service(self) -> None:
+        service = lambda_runtime.get_service(str(self.env_file))
+        with unittest.mock.patch("ecommerce_platform.api.init_db") as init_db:
+            self.assertIs(lambda_runtime.get_service(str(self.env_file)), service)
+            init_db.assert_not_called()
+
+    def test_rebuilds_only_when_settings_change(self) -> None:
+        first = lambda_runtime.get_runtime(str(self.env_file))
+        with unittest.mock.patch.dict("os.environ", {"UNRELATED_VARIABLE": "1"}):
+            self.assertIs(lambda_runtime.get_runtime(str(self.env_file)).service, first.service)
+        other_db = Path(self.temp_dir.name) / "b.db"
+        with unittest.mock.patch.dict("os.environ", {"DATABASE_URL": f"sqlite:///{other_db}"}):
+            second = lambda_runtime.get_runtime(str(self.env_file))
+        self.assertIsNot(second.service, first.service)
+        self.assertEqual(second.settings.sqlite_path, other_db)
+        self.assertTrue(other_db.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import io
+import unittest
+
+from ecommerce_platform.config import RateLimit
+from ecommerce_platform.loadgen import (
+    build_report,
+    format_report,
+    parse_mix,
+    percentile,
+    seed_dataset,
+)
+from tests.helpers import build_test_environment, run_test_server
+
+
+class LoadgenTests(unittest.TestCase):
+    def test_parse_mix(self) -> None:
+        mix = parse_mix("products=3, orders=1")
+        self.assertEqual(mix["products"], 3)
+        self.assertEqual(mix["orders"], 1)
+        self.assertEqual(mix["signup"], 0)
+        for spec in ("products", "checkout=1", "orders=-1", "orders=x", "orders=0"):
+            with self.assertRaises(ValueError):
+                parse_mix(spec)
+
+    def test_percentile_is_nearest_rank(self) -> None:
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([7.0], 95), 7.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_report_counts_errors_per_route(self) -> None:
+        samples = [
+            ("GET /products", 0.002, 200),
+            ("GET /products", 0.004, 200),
+            ("POST /orders", 0.010, 400),
+            ("POST /orders", 0.030, 0),
+        ]
+        report = build_report(samples, elapsed=2.0, clients=2, mix={"products": 1}, seed=0)
+        self.assertEqual(report["requests"], 4)
+        self.assertEqual(report["errors"], 2)
+        self.assertEqual(report["rps"], 2.0)
+        orders = report["routes"]["POST /orders"]
+        self.assertEqual(orders["statuses"], {"400": 1, "0": 1})
+        self.assertEqual(orders["p99_ms"], 30.0)
+        self.assertEqual(list(report["routes"]), ["GET /products", "POST /orders"])
+        self.assertIn("GET /products", format_report(report))
+        self.assertNotIn("rate limited", format_report(report))
+
+    def test_report_flags_rate_limiting(self) -> None:
+        samples = [("POST /auth/login", 0.001, 429), ("POST /auth/login", 0.002, 200)]
+        report = build_report(
+            samples, elapsed=1.0, clients=1, mix={"login": 1}, seed=0, seed_throttled_seconds=2.0
+        )
+        self.assertEqual(report["seed_throttled_s"], 2.0)
+        self.assertIn("rate limited: 1 requests got 429", format_report(report))
+
+
+class SeedDatasetTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = build_test_environment()
+        self.env.settings = dataclasses.replace(
+            self.env.settings,
+            password_iterations=1000,
+            rate_limits=(RateLimit("POST /auth/signup", "ip", 1, 1.0),),
+        )
+        self.addCleanup(self.env.cleanup)
+
+    def test_seeding_waits_out_rate_limits(self) -> None:
+        stderr = io.StringIO()
+        with run_test_server(self.env) as base_url, contextlib.redirect_stderr(stderr):
+            dataset = seed_dataset(base_url, users=2, products=1)
+        self.assertEqual(len(dataset.users), 2)
+        self.assertGreater(dataset.throttled_seconds, 0)
+        self.assertIn("seeding throttled: POST /auth/signup got 429", stderr.getvalue())
+
+    def test_seeding_gives_up_after_the_throttle_budget(self) -> None:
+        with run_test_server(self.env) as base_url, self.assertRaises(RuntimeError) as ctx:
+            seed_dataset(base_url, users=2, products=1, max_throttle_seconds=0)
+        self.assertIn("RATE_LIMITS=", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import unittest
+
+from ecommerce_platform.ratelimit import TokenBucketLimiter, retry_after
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TokenBucketLimiterTests(unittest.TestCase):
+    def test_burst_then_refill(self) -> None:
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(max_buckets=4, clock=clock)
+        for _ in range(3):
+            self.assertEqual(limiter.acquire("k", capacity=3, per_second=0.5), 0.0)
+        self.assertAlmostEqual(limiter.acquire("k", capacity=3, per_second=0.5), 2.0)
+        clock.now = 1.0
+        self.assertAlmostEqual(limiter.acquire("k", capacity=3, per_second=0.5), 1.0)
+        clock.now = 2.0
+        self.assertEqual(limiter.acquire("k", capacity=3, per_second=0.5), 0.0)
+        self.assertEqual(limiter.stats()["allowed"], 4)
+        self.assertEqual(limiter.stats()["rejected"], 2)
+
+    def test_least_recently_used_bucket_is_evicted(self) -> None:
+        limiter = TokenBucketLimiter(max_buckets=2, clock=FakeClock())
+        limiter.acquire("a", capacity=1, per_second=1.0)
+        limiter.acquire("b", capacity=1, per_second=1.0)
+        self.assertGreater(limiter.acquire("a", capacity=1, per_second=1.0), 0.0)
+        limiter.acquire("c", capacity=1, per_second=1.0)
+        self.assertEqual(limiter.stats()["buckets"], 2)
+        self.assertEqual(limiter.stats()["evictions"], 1)
+        # "b" was dropped, so it starts over with a full bucket; "a" was kept.
+        self.assertEqual(limiter.acquire("b", capacity=1, per_second=1.0), 0.0)
+
+    def test_retry_after_rounds_up(self) -> None:
+        self.assertEqual(retry_after(0.01), "1")
+        self.assertEqual(retry_after(2.2), "3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ from datetime import datetime
 from uuid import uuid4
 
 from ecommerce_platform.repositories import (
+    Cursor,
     OrderItemRecord,
     OrderRecord,
     OrderRepository,
@@ -35,6 +36,8 @@ class RepositoryTests(unittest.TestCase):
         )
         repo.create(record)
         self.assertIsNotNone(repo.get_by_username("alpha"))
+        self.assertEqual(repo.get_by_email("a@example.com"), record)
+        self.assertIsNone(repo.get_by_email("missing@example.com"))
         self.assertIsNotNone(repo.get_by_id(record.id))
         self.assertTrue(repo.list_all())
 
@@ -54,6 +57,113 @@ class RepositoryTests(unittest.TestCase):
         self.assertTrue(repo.list_all())
         self.assertTrue(repo.list_by_category("outdoor"))
 
+    def test_product_repository_create_many_commits_in_chunks(self) -> None:
+        repo = ProductRepository(self.env.service.db)
+        records = (
+            ProductRecord(
+                id=uuid4(),
+                name=f"Item {index}",
+                description="Bulk item",
+                category="bulk",
+                price_cents=100 + index,
+                currency="USD",
+                created_at=datetime.utcnow(),
+            )
+            for index in range(25)
+        )
+        commits = []
+        inserted = repo.create_many(records, chunk_size=10, on_commit=commits.append)
+        self.assertEqual(inserted, 25)
+        self.assertEqual(commits, [10, 20, 25])
+        self.assertEqual(len(repo.list_by_category("bulk")), 25)
+
+    def test_product_repository_iter_batches_streams_newest_first(self) -> None:
+        repo = ProductRepository(self.env.service.db)
+        repo.create_many(
+            ProductRecord(
+                id=uuid4(),
+                name=f"Item {index}",
+                description="Bulk item",
+                category="bulk",
+                price_cents=100 + index,
+                currency="USD",
+                created_at=datetime.utcnow(),
+            )
+            for index in range(7)
+        )
+        batches = list(repo.iter_batches(batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual([item for batch in batches for item in batch], repo.list_all())
+
+        pool = self.env.service.db.pool
+        stream = repo.iter_batches(batch_size=3)
+        next(stream)
+        self.assertIsNone(pool.current())
+        self.assertEqual(pool.idle, pool.size)
+        stream.close()
+
+    def test_product_repository_get_many(self) -> None:
+        repo = ProductRepository(self.env.service.db)
+        records = [
+            ProductRecord(
+                id=uuid4(),
+                name=f"Item {index}",
+                description="Lookup",
+                category="lookup",
+                price_cents=100,
+                currency="USD",
+                created_at=datetime.utcnow(),
+            )
+            for index in range(3)
+        ]
+        repo.create_many(records)
+        missing = uuid4()
+        found = repo.get_many([records[0].id, records[2].id, records[0].id, missing])
+        self.assertEqual(set(found), {records[0].id, records[2].id})
+        self.assertEqual(found[records[2].id], records[2])
+        self.assertEqual(repo.get_many([]), {})
+
+    def test_product_repository_keyset_breaks_timestamp_ties(self) -> None:
+        repo = ProductRepository(self.env.service.db)
+        created_at = datetime(2024, 1, 1, 12, 0, 0)
+        records = [
+            ProductRecord(
+                id=uuid4(),
+                name=f"Tie {index}",
+                description="Same timestamp",
+                category="ties",
+                price_cents=100,
+                currency="USD",
+                created_at=created_at,
+            )
+            for index in range(4)
+        ]
+        repo.create_many(records)
+        first = repo.list_by_category("ties", limit=2)
+        rest = repo.list_by_category("ties", limit=10, after=Cursor.after(first[-1]))
+        self.assertEqual(
+            [record.id for record in first + rest],
+            sorted((record.id for record in records), key=str, reverse=True),
+        )
+        cursor = Cursor.after(first[-1])
+        self.assertEqual(Cursor.decode(cursor.encode()), cursor)
+
+    def test_user_repository_create_many(self) -> None:
+        repo = UserRepository(self.env.service.db)
+        records = [
+            UserRecord(
+                id=uuid4(),
+                email=f"user{index}@example.com",
+                username=f"user{index}",
+                password_hash="hash",
+                password_salt="salt",
+                created_at=datetime.utcnow(),
+            )
+            for index in range(3)
+        ]
+        self.assertEqual(repo.create_many(records), 3)
+        self.assertEqual(len(repo.list_all()), 3)
+
     def test_order_repository_round_trip(self) -> None:
         order_repo = OrderRepository(self.env.service.db)
         order = OrderRecord(
@@ -77,6 +187,39 @@ class RepositoryTests(unittest.TestCase):
         self.assertTrue(order_repo.list_by_user(order.user_id))
         self.assertTrue(order_repo.list_items(order.id))
 
+    def test_order_repository_list_items_for_orders(self) -> None:
+        order_repo = OrderRepository(self.env.service.db)
+        user_id = uuid4()
+        orders = []
+        for quantity in (1, 2, 3):
+            order = OrderRecord(
+                id=uuid4(),
+                user_id=user_id,
+                total_cents=100 * quantity,
+                currency="USD",
+                status="created",
+                created_at=datetime.utcnow(),
+            )
+            order_repo.create(
+                order,
+                [
+                    OrderItemRecord(
+                        id=uuid4(),
+                        order_id=order.id,
+                        product_id=uuid4(),
+                        quantity=quantity,
+                        price_cents=100,
+                    )
+                    for _ in range(quantity)
+                ],
+            )
+            orders.append(order)
+        missing = uuid4()
+        items = order_repo.list_items_for_orders([order.id for order in orders] + [missing])
+        self.assertEqual([len(items[order.id]) for order in orders], [1, 2, 3])
+        self.assertEqual(items[missing], [])
+        self.assertEqual(order_repo.list_items_for_orders([]), {})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import unittest
+
+from ecommerce_platform.routing import Router
+
+
+class RouterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.router: Router[str] = Router()
+        self.router.add("GET", "/products", "list-products")
+        self.router.add("POST", "/products", "create-product")
+        self.router.add("GET", "/orders/{user_id}", "list-orders")
+        self.router.add("DELETE", "/orders/{user_id}", "delete-orders")
+        self.router.add("GET", "/orders/{user_id}/items/{item_id}", "get-item")
+
+    def test_static_routes(self) -> None:
+        self.assertEqual(self.router.resolve("GET", "/products").handler, "list-products")
+        self.assertEqual(self.router.resolve("POST", "/products").handler, "create-product")
+
+    def test_parameterized_routes(self) -> None:
+        match = self.router.resolve("GET", "/orders/abc")
+        self.assertEqual(match.handler, "list-orders")
+        self.assertEqual(match.params, {"user_id": "abc"})
+        match = self.router.resolve("GET", "/orders/abc/items/7")
+        self.assertEqual(match.params, {"user_id": "abc", "item_id": "7"})
+
+    def test_wrong_method_lists_allowed(self) -> None:
+        self.assertEqual(self.router.resolve("PUT", "/products").allowed, {"GET", "POST"})
+        match = self.router.resolve("POST", "/orders/abc")
+        self.assertIsNone(match.handler)
+        self.assertEqual(match.allowed, {"GET", "DELETE"})
+
+    def test_unknown_paths(self) -> None:
+        for path in ("/missing", "/orders/", "/orders/a/b", "/productsx"):
+            match = self.router.resolve("GET", path)
+            self.assertIsNone(match.handler, path)
+            self.assertFalse(match.allowed, path)
+
+    def test_duplicate_routes_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.router.add("GET", "/products", "again")
+        with self.assertRaises(ValueError):
+            self.router.add("get", "/orders/{user_id}", "again")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,9 @@ from __future__ import annotations
 import unittest
 from uuid import UUID
 
-from ecommerce_platform.auth import hash_password
-from ecommerce_platform.services import AuthenticationError, ValidationError
+from ecommerce_platform.auth import hash_password, password_iterations
+from ecommerce_platform.db import db_session, migrate
+from ecommerce_platform.services import AuthenticationError, OrderRequest, ValidationError
 from tests.helpers import build_test_environment
 
 
@@ -33,7 +34,7 @@ class ServiceTests(unittest.TestCase):
             password_hash=password_hash,
             password_salt=salt,
         )
-        with self.assertRaises(ValidationError):
+        with self.assertRaisesRegex(ValidationError, "username already exists"):
             self.env.service.create_user(
                 email="another@example.com",
                 username="user",
@@ -41,6 +42,23 @@ class ServiceTests(unittest.TestCase):
                 password_salt=salt,
             )
 
+    def test_create_user_duplicate_email(self) -> None:
+        password_hash, salt = hash_password("password123")
+        self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        with self.assertRaisesRegex(ValidationError, "email already exists"):
+            self.env.service.create_user(
+                email="user@example.com",
+                username="another",
+                password_hash=password_hash,
+                password_salt=salt,
+            )
+        self.assertEqual(len(self.env.service.users.list_all()), 1)
+
     def test_login(self) -> None:
         password_hash, salt = hash_password("password123")
         self.env.service.create_user(
@@ -54,14 +72,291 @@ class ServiceTests(unittest.TestCase):
         self.assertTrue(token)
         self.assertEqual(ttl, 15)
 
+    def test_login_rehashes_when_iterations_change(self) -> None:
+        password_hash, salt = hash_password("password123", iterations=1_000)
+        self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        self.env.service.passwords.iterations = 2_000
+        user, _, _ = self.env.service.login("user", "password123")
+        self.assertEqual(password_iterations(user.password_hash), 2_000)
+        stored = self.env.service.users.get_by_username("user")
+        self.assertEqual(stored.password_hash, user.password_hash)
+        self.env.service.login("user", "password123")
+        with self.assertRaises(AuthenticationError):
+            self.env.service.login("user", "wrong")
+
     def test_login_invalid(self) -> None:
         with self.assertRaises(AuthenticationError):
             self.env.service.login("missing", "password")
 
+    def test_import_products_keeps_committed_chunks(self) -> None:
+        rows = [
+            {"name": "Cup", "description": "Cup", "category": "kitchen", "price_cents": "900"},
+            {"name": "Pan", "description": "Pan", "category": "kitchen", "price_cents": 2500},
+            {"name": "Bad", "description": "Bad", "category": "kitchen", "price_cents": 0},
+        ]
+        with self.assertRaises(ValidationError):
+            self.env.service.import_products(iter(rows), chunk_size=2)
+        products = self.env.service.list_products()
+        self.assertEqual(sorted(product.name for product in products), ["Cup", "Pan"])
+        self.assertTrue(all(product.currency == "USD" for product in products))
+
+    def test_import_users_rejects_duplicates(self) -> None:
+        password_hash, salt = hash_password("password123")
+        row = {
+            "email": "user@example.com",
+            "username": "user",
+            "password_hash": password_hash,
+            "password_salt": salt,
+        }
+        self.assertEqual(self.env.service.import_users([row]), 1)
+        with self.assertRaises(ValidationError):
+            self.env.service.import_users([row])
+
+    def test_list_products_page_walks_catalog(self) -> None:
+        created = [
+            self.env.service.create_product(
+                name=f"Item {index}",
+                description="Paged",
+                category="paged",
+                price_cents=100,
+                currency="USD",
+            )
+            for index in range(5)
+        ]
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            page = self.env.service.list_products_page(2, cursor)
+            seen.extend(product.id for product in page.items)
+            pages += 1
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, [product.id for product in self.env.service.list_products()])
+        self.assertEqual(sorted(seen), sorted(product.id for product in created))
+
+    def test_list_products_page_rejects_bad_input(self) -> None:
+        with self.assertRaises(ValidationError):
+            self.env.service.list_products_page(0)
+        with self.assertRaises(ValidationError):
+            self.env.service.list_products_page(10, "not-a-cursor")
+
+    def test_iter_orders_with_items_batches_queries(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        product = self.env.service.create_product(
+            name="Bottle",
+            description="Steel bottle",
+            category="kitchen",
+            price_cents=1200,
+            currency="USD",
+        )
+        for quantity in (1, 2, 3):
+            self.env.service.create_order(user.id, [(product.id, quantity)])
+        statements = []
+        with db_session(self.env.service.db) as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                orders = [
+                    pair
+                    for batch in self.env.service.iter_orders_with_items(user.id)
+                    for pair in batch
+                ]
+            finally:
+                conn.set_trace_callback(None)
+        self.assertEqual(
+            sorted(items[0].quantity for _, items in orders), [1, 2, 3]
+        )
+        self.assertEqual(len([sql for sql in statements if sql.startswith("SELECT")]), 2)
+
+    def test_create_order_prices_large_cart_with_one_product_query(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        products = [
+            self.env.service.create_product(
+                name=f"Item {index}",
+                description="Cart item",
+                category="cart",
+                price_cents=100 + index,
+                currency="USD",
+            )
+            for index in range(300)
+        ]
+        lines = [(product.id, 2) for product in products]
+        statements = []
+        with db_session(self.env.service.db) as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            order, items = self.env.service.create_order_with_items(user.id, lines)
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(order.total_cents, sum(2 * product.price_cents for product in products))
+        self.assertEqual(len(items), 300)
+        self.assertTrue(all(item.order_id == order.id for item in items))
+        self.assertEqual(len([sql for sql in statements if "FROM products" in sql]), 1)
+        self.assertEqual(statements[0], "BEGIN IMMEDIATE")
+
+    def test_create_order_unknown_product_writes_nothing(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        product = self.env.service.create_product(
+            name="Bottle",
+            description="Steel bottle",
+            category="kitchen",
+            price_cents=1200,
+            currency="USD",
+        )
+        with self.assertRaises(ValidationError):
+            self.env.service.create_order(user.id, [(product.id, 1), (UUID(int=1), 1)])
+        self.assertEqual(self.env.service.list_orders(user.id), [])
+
+    def test_create_orders_batches_lookups_and_reports_failures(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        mug, boot = (
+            self.env.service.create_product(name, "x", category, price, "USD")
+            for name, category, price in (("Mug", "kitchen", 900), ("Boot", "outdoor", 5000))
+        )
+        stored_id = UUID(int=7)
+        requests = [
+            OrderRequest(user.id, [(mug.id, 2)], order_id=stored_id),
+            OrderRequest(user.id, [(boot.id, 1), (UUID(int=1), 1)]),
+            OrderRequest(UUID(int=2), [(mug.id, 1)]),
+            OrderRequest(user.id, []),
+            OrderRequest(user.id, [(boot.id, 1), (mug.id, 1)]),
+            OrderRequest(user.id, [(mug.id, 2)], order_id=stored_id),
+        ]
+        statements = []
+        with db_session(self.env.service.db) as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            errors = self.env.service.create_orders(requests, chunk_size=1)
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual([error is None for error in errors], [True, False, False, False, True, True])
+        self.assertIn("does not exist", str(errors[1]))
+        self.assertEqual(len([sql for sql in statements if "FROM products" in sql]), 1)
+        self.assertEqual(statements.count("BEGIN IMMEDIATE"), 2)
+        orders = self.env.service.list_orders(user.id)
+        self.assertEqual(sorted(order.total_cents for order in orders), [1800, 5900])
+        self.assertIn(stored_id, {order.id for order in orders})
+        self.assertEqual(self.env.service.affinity.top_category(user.id), "kitchen")
+
+        # Redelivering the batch does not store the idempotent order twice.
+        self.assertIsNone(self.env.service.create_orders(requests[:1])[0])
+        self.assertEqual(len(self.env.service.list_orders(user.id)), 2)
+
     def test_create_order_validation(self) -> None:
         with self.assertRaises(ValidationError):
             self.env.service.create_order(UUID(int=0), [])
 
+    def _reference_recommendations(self, user_id: UUID):
+        """The original order-walking recommendation algorithm."""
+
+        service = self.env.service
+        categories = []
+        for order in service.list_orders(user_id):
+            for item in service.list_order_items(order.id):
+                product = service.products.get_by_id(item.product_id)
+                if product:
+                    categories.append(product.category)
+        category = max(categories, key=categories.count) if categories else None
+        products = (
+            service.products.list_by_category(category) if category else service.products.list_all()
+        )
+        return products[: self.env.settings.recommendations_per_user]
+
+    def test_recommendations_match_order_history(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        catalog = {
+            category: [
+                self.env.service.create_product(
+                    name=f"{category} {index}",
+                    description=category,
+                    category=category,
+                    price_cents=100,
+                    currency="USD",
+                )
+                for index in range(4)
+            ]
+            for category in ("kitchen", "outdoor", "footwear")
+        }
+        carts = [
+            [("kitchen", 0), ("outdoor", 1)],
+            [("outdoor", 0), ("kitchen", 2), ("footwear", 1)],
+            [("footwear", 3), ("footwear", 2), ("kitchen", 1)],
+            [("outdoor", 2), ("footwear", 0)],
+            [("kitchen", 3), ("outdoor", 3)],
+        ]
+        for cart in carts:
+            self.env.service.create_order(
+                user.id, [(catalog[category][index].id, 1) for category, index in cart]
+            )
+            self.assertEqual(
+                [p.id for p in self.env.service.recommend_products(user.id)],
+                [p.id for p in self._reference_recommendations(user.id)],
+            )
+
+    def test_affinity_backfill_matches_incremental_updates(self) -> None:
+        password_hash, salt = hash_password("password123")
+        user = self.env.service.create_user(
+            email="user@example.com",
+            username="user",
+            password_hash=password_hash,
+            password_salt=salt,
+        )
+        mug = self.env.service.create_product(
+            name="Mug", description="Mug", category="kitchen", price_cents=100, currency="USD"
+        )
+        boot = self.env.service.create_product(
+            name="Boot", description="Boot", category="footwear", price_cents=100, currency="USD"
+        )
+        self.env.service.create_order(user.id, [(mug.id, 1), (boot.id, 1)])
+        self.env.service.create_order(user.id, [(boot.id, 3), (mug.id, 1)])
+        query = "SELECT * FROM user_category_affinity ORDER BY category"
+        with db_session(self.env.service.db) as conn:
+            incremental = [tuple(row) for row in conn.execute(query)]
+            conn.execute("DELETE FROM user_category_affinity")
+            conn.execute("UPDATE schema_version SET version = 5")
+        migrate(self.env.service.db)
+        with db_session(self.env.service.db) as conn:
+            backfilled = [tuple(row) for row in conn.execute(query)]
+        self.assertEqual([row[:5] for row in backfilled], [row[:5] for row in incremental])
+        self.assertEqual(self.env.service.affinity.top_category(user.id), "footwear")
+
     def test_recommendations_without_orders(self) -> None:
         password_hash, salt = hash_password("password123")
         user = self.env.service.create_user(